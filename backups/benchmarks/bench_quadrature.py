@@ -0,0 +1,93 @@
+"""
+Compare the vectorized quadrature engine with the previous scalar path
+(scipy.integrate.quad calling a try/except wrapped lambdified function).
+
+    cd backups && python benchmarks/bench_quadrature.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import sympy as sp
+from scipy import integrate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import quadrature  # noqa: E402
+
+CASES = [
+    ('x**2', 0, 3),
+    ('sin(x)', 0, np.pi),
+    ('exp(-x**2)*log(x + 2)', 0, 3),
+    ('sin(50*x)', 0, 2),
+    # Narrow features on a wide interval
+    ('exp(-x)', 0, 10000),
+    ('1/(1 + (x - 300)**2)', 0, 10000),
+    # Integrable endpoint singularities: the engine must converge on these
+    ('1/sqrt(x)', 0, 1),
+    ('x**(-0.9)', 0, 1),
+    ('log(x)', 0, 1),
+    ('sqrt(1 - x**2)', -1, 1),
+    ('pi*(x**3 + 2*x)**2', 0, 2),
+]
+
+
+class Counter:
+    """Wraps a compiled function and counts the points it is called on"""
+
+    def __init__(self, func):
+        self.func = func
+        self.points = 0
+
+    def __call__(self, x):
+        self.points += np.size(x)
+        return self.func(x)
+
+
+def scalar_quad(func, a, b):
+    def integrand_func(x):
+        try:
+            return func(x)
+        except Exception:
+            return 0
+    return integrate.quad(integrand_func, a, b)[0]
+
+
+def vectorized(func, a, b):
+    outcome = quadrature.integrate(func, a, b)
+    if not outcome['converged']:
+        raise RuntimeError(quadrature.failure_message(outcome))
+    return outcome['value']
+
+
+def measure(method, func, a, b, repeat):
+    counter = Counter(func)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        value = method(counter, a, b)
+    elapsed = time.perf_counter() - start
+    return value, elapsed / repeat, counter.points / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    x = sp.Symbol('x')
+    header = f"{'function':<26}{'quad ms':>10}{'engine ms':>11}{'quad evals/s':>15}{'engine evals/s':>16}{'|diff|':>11}"
+    print(header)
+    print('-' * len(header))
+    for expr, a, b in CASES:
+        func = sp.lambdify(x, sp.sympify(expr), 'numpy')
+        with np.errstate(all='ignore'):
+            q_value, q_time, q_rate = measure(scalar_quad, func, a, b, args.repeat)
+            v_value, v_time, v_rate = measure(vectorized, func, a, b, args.repeat)
+        print(f"{expr:<26}{q_time * 1e3:>10.3f}{v_time * 1e3:>11.3f}"
+              f"{q_rate:>15,.0f}{v_rate:>16,.0f}{abs(q_value - v_value):>11.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files written by run.py.
+
+    python benchmarks/compare.py base.json head.json [--threshold 1.25]
+
+Prints the median ratio (head / base) for every case present in both
+files and exits with status 1 if any case got slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark JSON files')
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median ratio above which a case counts as a regression')
+    parser.add_argument('--metric', default='median', choices=['min', 'median', 'mean'])
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    print(f"base: {base['environment'].get('commit')}  head: {head['environment'].get('commit')}")
+
+    regressions = []
+    rows = []
+    for name in sorted(set(base['results']) | set(head['results'])):
+        old, new = base['results'].get(name), head['results'].get(name)
+        if old is None or new is None:
+            rows.append((name, 'only in ' + ('head' if old is None else 'base'), None))
+            continue
+        if 'error' in old or 'error' in new:
+            rows.append((name, 'error', None))
+            continue
+        ratio = new[args.metric] / old[args.metric] if old[args.metric] else float('inf')
+        if ratio > args.threshold:
+            regressions.append(name)
+        rows.append((name, f"{old[args.metric] * 1e3:.3f} -> {new[args.metric] * 1e3:.3f} ms", ratio))
+
+    for name, detail, ratio in rows:
+        flag = '  REGRESSION' if name in regressions else ''
+        ratio_text = f"x{ratio:.2f}" if ratio is not None else ''
+        print(f"{name:<70} {detail:>28} {ratio_text:>8}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than x{args.threshold}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Benchmark suite for the service hot paths.
+
+    cd backups && python benchmarks/run.py -o bench.json
+    python benchmarks/run.py --group linear_algebra --sizes 2,10,100
+    python benchmarks/compare.py old.json bench.json
+
+Every case is warmed up once, then timed for at least --min-time seconds
+(and --min-rounds calls). Results are keyed by a stable case name so two
+JSON files from different commits can be diffed with compare.py.
+Cases whose names end in [cold] clear the expression and integration
+caches before every call; [warm] cases measure the cached path.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import sympy as sp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from services.algebra_service import AlgebraService  # noqa: E402
+from services.expression_cache import expression_cache  # noqa: E402
+from services.expression_parser import canonical_expression, compile_numpy, parse_expression, to_sympy  # noqa: E402
+from services.figure_cache import figure_cache  # noqa: E402
+from services.integral_service import IntegralService  # noqa: E402
+from services.integral_visualization import IntegralVisualization  # noqa: E402
+from services.integration_cache import integration_cache  # noqa: E402
+from services.linear_algebra_service import LinearAlgebraService  # noqa: E402
+from services.math_service import MathService  # noqa: E402
+from services.revolution_mesh import LEVELS_OF_DETAIL, revolve  # noqa: E402
+from services.serialization import dumps, pack_arrays  # noqa: E402
+
+DEFAULT_SIZES = [2, 3, 4, 10, 50, 100, 250, 500, 1000]
+DEFAULT_DEGREES = [1, 2, 3, 4, 5, 6, 8]
+
+FUNCTIONS = ['x**2', 'sin(x)*exp(-x)', 'sqrt(1 + x**3)', 'x**3 - 2*x + 1']
+# Composites whose derivative repeats most of f's subterms
+NESTED_FUNCTIONS = ['sin(exp(cos(x)))*exp(sin(x)**2)', 'exp(sin(x**2))*cos(exp(x/3))',
+                    'tanh(sin(x))*log(1 + exp(cos(x)))']
+
+
+class Case:
+    """One benchmark: fn is timed, setup (if any) runs untimed before each call"""
+
+    def __init__(self, name: str, group: str, fn: Callable, setup: Optional[Callable] = None,
+                 params: Optional[Dict] = None):
+        self.name = name
+        self.group = group
+        self.fn = fn
+        self.setup = setup
+        self.params = params or {}
+
+
+def clear_caches():
+    canonical_expression.cache_clear()
+    expression_cache.clear()
+    integration_cache.clear()
+
+
+def clear_figures():
+    figure_cache.clear()
+
+
+# ============ CASES ============
+def parsing_cases() -> List[Case]:
+    math_service = MathService()
+    integral_service = IntegralService()
+    cases = []
+    for func in FUNCTIONS:
+        for label, setup in (('cold', clear_caches), ('warm', None)):
+            cases.append(Case(f"math.parse_function[{func}][{label}]", 'parsing',
+                              lambda f=func: math_service.parse_function(f), setup, {'function': func}))
+            cases.append(Case(f"integral.parse_function[{func}][{label}]", 'parsing',
+                              lambda f=func: integral_service.parse_function(f), setup, {'function': func}))
+
+    # Expression grammar against the sympify + lambdify path it replaced
+    x = sp.Symbol('x')
+    points = np.linspace(0.1, 10.0, 10000)
+    for func in FUNCTIONS:
+        tree = parse_expression(func)
+        compiled, lambdified = compile_numpy(tree), sp.lambdify(x, sp.sympify(func), 'numpy')
+        cases.extend([
+            Case(f"expression_parser.parse_compile[{func}]", 'parsing',
+                 lambda f=func: compile_numpy(parse_expression(f)), params={'function': func}),
+            Case(f"expression_parser.canonical_expression[{func}]", 'parsing',
+                 lambda f=func: canonical_expression.__wrapped__(f), params={'function': func}),
+            Case(f"sympy.sympify_lambdify[{func}]", 'parsing',
+                 lambda f=func: sp.lambdify(x, sp.sympify(f), 'numpy'), params={'function': func}),
+            Case(f"expression_parser.to_sympy[{func}]", 'parsing',
+                 lambda t=tree: to_sympy(t, x), params={'function': func}),
+            Case(f"expression_parser.evaluate[{func}][n={len(points)}]", 'parsing',
+                 lambda c=compiled: c(points), params={'function': func, 'points': len(points)}),
+            Case(f"sympy.lambdify_evaluate[{func}][n={len(points)}]", 'parsing',
+                 lambda l=lambdified: l(points), params={'function': func, 'points': len(points)})
+        ])
+    return cases
+
+
+def integral_cases() -> List[Case]:
+    integral_service = IntegralService()
+    math_service = MathService()
+    cases = []
+    for func in FUNCTIONS:
+        for label, setup in (('cold', clear_caches), ('warm', None)):
+            cases.append(Case(
+                f"integral.calculate_definite_integral[{func}][{label}]", 'integral',
+                lambda f=func: integral_service.calculate_definite_integral(f, 0.0, 2.0),
+                setup, {'function': func, 'lower': 0.0, 'upper': 2.0}
+            ))
+            for axis in ('x-axis', 'y-axis'):
+                cases.append(Case(
+                    f"math.calculate_volume[{func}][{axis}][{label}]", 'integral',
+                    lambda f=func, ax=axis: math_service.calculate_volume(f, 0.0, 2.0, ax),
+                    setup, {'function': func, 'lower': 0.0, 'upper': 2.0, 'axis': axis}
+                ))
+            # mode='numeric' skips SymPy integration
+            cases.append(Case(
+                f"integral.calculate_definite_integral[{func}][numeric][{label}]", 'integral',
+                lambda f=func: integral_service.calculate_definite_integral(f, 0.0, 2.0, mode='numeric'),
+                setup, {'function': func, 'lower': 0.0, 'upper': 2.0, 'mode': 'numeric'}
+            ))
+            cases.append(Case(
+                f"math.calculate_volume[{func}][x-axis][numeric][{label}]", 'integral',
+                lambda f=func: math_service.calculate_volume(f, 0.0, 2.0, 'x-axis', mode='numeric'),
+                setup, {'function': func, 'lower': 0.0, 'upper': 2.0, 'axis': 'x-axis', 'mode': 'numeric'}
+            ))
+
+    # Surface area integrand: lambdified SymPy tree against the fused f, f' kernel
+    x = integral_service.x
+    points = np.linspace(0.5, 2.0, 10000)
+    for func in NESTED_FUNCTIONS + FUNCTIONS[:2]:
+        compiled = integral_service.compile_function(func)
+        integrand = 2 * sp.pi * compiled.expr * sp.sqrt(1 + compiled.derivative**2)
+        lambdified = sp.lambdify(x, integrand, 'numpy')
+        with_slope = compiled.with_slope
+
+        def fused(t, with_slope=with_slope):
+            value, slope = with_slope(t)
+            return 2 * np.pi * value * np.sqrt(1.0 + np.square(slope))
+        params = {'function': func, 'points': len(points)}
+        cases.extend([
+            Case(f"surface_integrand.lambdify[{func}][n={len(points)}]", 'integral',
+                 lambda l=lambdified: l(points), params=params),
+            Case(f"surface_integrand.fused[{func}][n={len(points)}]", 'integral',
+                 lambda k=fused: k(points), params=params),
+            Case(f"integral.calculate_surface_area_revolution[{func}][warm]", 'integral',
+                 lambda f=func: integral_service.calculate_surface_area_revolution(f, 0.5, 2.0),
+                 params={'function': func, 'lower': 0.5, 'upper': 2.0})
+        ])
+    return cases
+
+
+def visualization_cases() -> List[Case]:
+    viz = IntegralVisualization()
+    func, lower, upper = 'sin(x)*exp(-x/3)', 0.0, 6.0
+    renderers = {
+        'visualize_function': lambda: viz.visualize_function(func, lower, upper),
+        'visualize_area_under_curve': lambda: viz.visualize_area_under_curve(func, lower, upper, 1.0),
+        'visualize_riemann_sum': lambda: viz.visualize_riemann_sum(func, lower, upper, 10),
+        'visualize_3d_integral': lambda: viz.visualize_3d_integral(func, lower, upper),
+        'visualize_antiderivative': lambda: viz.visualize_antiderivative(func, lower, upper),
+        'create_comparison_plot': lambda: viz.create_comparison_plot(func, lower, upper),
+    }
+    cases = [
+        # Rendering is what is measured here, not figure cache hits
+        Case(f"integral_visualization.{name}", 'visualization', fn, clear_figures,
+             {'function': func, 'lower': lower, 'upper': upper})
+        for name, fn in renderers.items()
+    ]
+    # Adaptive curve sampling: smooth, oscillatory and singular inputs
+    for f in ['x**2', 'sin(50*x)', '1/x', 'tan(x)']:
+        cases.append(Case(
+            f"integral.sample_function[{f}]", 'visualization',
+            lambda f=f: viz.integral_service.sample_function(f, -2.0, 3.0),
+            None, {'function': f, 'lower': -2.0, 'upper': 3.0}
+        ))
+    # Surface of revolution meshes per level of detail
+    evaluate = lambda x: viz.integral_service.evaluate_function(func, x)
+    for lod in LEVELS_OF_DETAIL:
+        cases.append(Case(
+            f"revolution_mesh.revolve[{lod}]", 'visualization',
+            lambda lod=lod: revolve(evaluate, lower, upper, 'x-axis', base=(100, 50), lod=lod),
+            None, {'function': func, 'lower': lower, 'upper': upper, 'lod': lod}
+        ))
+    return cases
+
+
+def linear_algebra_cases(sizes: List[int]) -> List[Case]:
+    service = LinearAlgebraService()
+    cases = []
+    for n in sizes:
+        rng = np.random.default_rng(n)
+        # Scaled so determinants stay finite at n=1000
+        A = rng.standard_normal((n, n)) / np.sqrt(n) + np.eye(n)
+        spd = (A @ A.T + n * np.eye(n)).tolist()
+        matrix = A.tolist()
+        b = rng.standard_normal(n).tolist()
+        operations = {
+            'matrix_determinant': lambda m=matrix: service.matrix_determinant(m),
+            'matrix_inverse': lambda m=matrix: service.matrix_inverse(m),
+            'matrix_eigenvalues': lambda m=matrix: service.matrix_eigenvalues(m),
+            'matrix_decomposition[lu]': lambda m=matrix: service.matrix_decomposition(m, 'lu'),
+            'matrix_decomposition[qr]': lambda m=matrix: service.matrix_decomposition(m, 'qr'),
+            'matrix_decomposition[svd]': lambda m=matrix: service.matrix_decomposition(m, 'svd'),
+            'matrix_decomposition[cholesky]': lambda m=spd: service.matrix_decomposition(m, 'cholesky'),
+            'solve_linear_system': lambda m=matrix, v=b: service.solve_linear_system(m, v),
+            'matrix_operations[multiply]': lambda m=matrix: service.matrix_operations('multiply', m, m),
+            'matrix_rank': lambda m=matrix: service.matrix_rank(m),
+        }
+        for name, fn in operations.items():
+            cases.append(Case(f"linear_algebra.{name}[n={n}]", 'linear_algebra', fn, None, {'size': n}))
+
+        # Response encoding of an SVD result: lists through FastAPI's encoder and
+        # json.dumps (as before orjson) against orjson and the binary format
+        svd = service.matrix_decomposition(matrix, 'svd')
+        as_lists = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in svd.items()}
+        encoders = {
+            'tolist_jsonable_encoder': lambda r=as_lists: json.dumps(jsonable_encoder(r)).encode(),
+            'orjson': lambda r=svd: dumps(r),
+            'ndarrays': lambda r=svd: pack_arrays(r),
+        }
+        for name, fn in encoders.items():
+            cases.append(Case(f"response.{name}[svd][n={n}]", 'linear_algebra', fn, None, {'size': n}))
+    return cases
+
+
+def algebra_cases(degrees: List[int]) -> List[Case]:
+    service = AlgebraService()
+    cases = []
+    for degree in degrees:
+        rng = np.random.default_rng(degree)
+        # Integer coefficients keep SymPy on its exact (and slowest) path
+        coefficients = [float(c) for c in rng.integers(1, 10, degree + 1)]
+        cases.append(Case(
+            f"algebra.solve_polynomial[degree={degree}]", 'algebra',
+            lambda c=coefficients: service.solve_polynomial(list(c)), None,
+            {'degree': degree, 'coefficients': coefficients}
+        ))
+    return cases
+
+
+def build_cases(sizes: List[int], degrees: List[int]) -> List[Case]:
+    return (parsing_cases() + integral_cases() + visualization_cases()
+            + linear_algebra_cases(sizes) + algebra_cases(degrees))
+
+
+# ============ RUNNER ============
+def measure(case: Case, min_time: float, min_rounds: int, max_rounds: int) -> Dict:
+    if case.setup:
+        case.setup()
+    case.fn()  # warmup: imports, lambdify, first-call costs
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+        if case.setup:
+            case.setup()
+        t0 = time.perf_counter()
+        case.fn()
+        timings.append(time.perf_counter() - t0)
+
+    return {
+        'group': case.group,
+        'params': case.params,
+        'rounds': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'max': max(timings)
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    import scipy
+    import sympy
+    return {
+        'commit': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'sympy': sympy.__version__,
+        'matplotlib': matplotlib.__version__
+    }
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the service benchmark suite')
+    parser.add_argument('-o', '--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('-g', '--group', action='append',
+                        help='only run these groups: parsing, integral, visualization, linear_algebra, algebra')
+    parser.add_argument('-k', '--filter', help='only run cases whose name contains this text')
+    parser.add_argument('--sizes', type=int_list, default=DEFAULT_SIZES, help='matrix sizes, e.g. 2,10,100')
+    parser.add_argument('--degrees', type=int_list, default=DEFAULT_DEGREES, help='polynomial degrees')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to spend per case')
+    parser.add_argument('--min-rounds', type=int, default=3)
+    parser.add_argument('--max-rounds', type=int, default=1000)
+    args = parser.parse_args()
+
+    cases = build_cases(args.sizes, args.degrees)
+    if args.group:
+        cases = [c for c in cases if c.group in args.group]
+    if args.filter:
+        cases = [c for c in cases if args.filter in c.name]
+
+    results = {}
+    for case in cases:
+        try:
+            results[case.name] = measure(case, args.min_time, args.min_rounds, args.max_rounds)
+            print(f"{case.name:<70} {results[case.name]['median'] * 1e3:>10.3f} ms", file=sys.stderr)
+        except Exception as e:
+            results[case.name] = {'group': case.group, 'params': case.params, 'error': str(e)}
+            print(f"{case.name:<70} {'ERROR':>10}  {e}", file=sys.stderr)
+
+    report = json.dumps({'environment': environment(), 'results': results}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,92 @@
-from fastapi import FastAPI, HTTPException
+import time
+# Taken before the heavy imports below so startup stats include them
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, validator
 import uvicorn
-from typing import Optional, Literal, List
-import re
+from typing import Any, AsyncIterator, Optional, Literal, List, Dict, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import functools
+import logging
+import json
+import os
+import numpy as np
+
+from services import metrics
+from services.dependencies import (
+    MODULE_GROUPS, SERVICES, algebra_service, integral_service, integral_visualization, linear_algebra_service,
+    loaded_groups, math_service, service_handle
+)
+from services.executor import ExecutorError, executor
+from services.expression_parser import canonical_expression
+from services.figure_cache import etag, figure_cache, figure_key, if_none_match
+from services.image_encoding import (
+    DEFAULT_IMAGE_FORMAT, IMAGE_MEDIA_TYPES, check_image_format, negotiate_image_format
+)
+from services.job_queue import TERMINAL_STATES, job_queue
+from services.plot_data import MAX_PLOT_WIDTH, MIN_PLOT_WIDTH
+from services.prewarm import prewarm, prewarm_enabled
+from services.result_store import result_store
+from services.revolution_mesh import DEFAULT_LOD, check_lod
+from services.serialization import ARRAYS_MEDIA_TYPE, dumps, pack_arrays, wants_arrays
+from services.single_flight import request_key, single_flight
+
+logger = logging.getLogger("uvicorn.error")
+
+# Filled in by lifespan, reported by /api/startup/stats
+startup_stats: Dict = {}
+
+async def warm_in_background():
+    """Spawn workers (and prewarm if enabled) without delaying readiness"""
+    try:
+        started = time.perf_counter()
+        startup_stats['process_workers_ready'] = await executor.warm()
+        startup_stats['workers_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        if prewarm_enabled():
+            startup_stats['prewarm_ms'] = await asyncio.to_thread(prewarm)
+        startup_stats['warm'] = True
+        logger.info("Warm-up finished: %s", startup_stats)
+    except Exception:
+        logger.exception("Warm-up failed, services will load on first use")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy modules (SymPy, SciPy, Matplotlib, Plotly) load per module group
+    # on first use, so the app is ready as soon as the pools exist
+    executor.start()
+    job_queue.start()
+    startup_stats['warm'] = False
+    startup_stats['ready_ms'] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+    logger.info("Ready to serve after %.0f ms", startup_stats['ready_ms'])
+    warm_task = asyncio.create_task(warm_in_background())
+    yield
+    warm_task.cancel()
+    await job_queue.stop()
+    executor.shutdown()
+
+class NumpyJSONResponse(ORJSONResponse):
+    """
+    JSON written by orjson: NumPy arrays straight from their buffers,
+    complex as {"real", "imag"}, NaN and inf as null.
+    Routes returning arrays must return this (or array_response) themselves,
+    since FastAPI's jsonable_encoder runs on plain dict returns first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def array_response(content: Dict, http_request: Request) -> Response:
+    """Matrix result as JSON, or as raw float64 arrays for Accept: application/x-ndarrays"""
+    if wants_arrays(http_request.headers.get('accept', '')):
+        return Response(content=pack_arrays(content), media_type=ARRAYS_MEDIA_TYPE)
+    return NumpyJSONResponse(content)
 
-app = FastAPI(title="Advanced Math Calculator API")
+app = FastAPI(title="Advanced Math Calculator API", lifespan=lifespan, default_response_class=NumpyJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -16,19 +97,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request and label service phase events with its route"""
+    start = time.perf_counter()
+    token, events = metrics.begin_request()
+    response = None
+    try:
+        response = await call_next(request)
+        if events:
+            response.headers['Server-Timing'] = metrics.server_timing(events)
+        return response
+    finally:
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        status = str(response.status_code) if response is not None else '500'
+        metrics.end_request(token, events, path)
+        metrics.REQUEST_DURATION.observe((request.method, path, status), time.perf_counter() - start)
+        if request.headers.get('content-length'):
+            metrics.REQUEST_SIZE.observe((request.method, path), int(request.headers['content-length']))
+        if response is not None and response.headers.get('content-length'):
+            metrics.RESPONSE_SIZE.observe((request.method, path), int(response.headers['content-length']))
+
+# ============ PLOT DATA MODELS ============
+class PlotDataOptions(BaseModel):
+    """Data-only Plotly output for client-side rendering (no layout template, no HTML)"""
+    # Downsample lines and surfaces to about this many points
+    width: Optional[int] = None
+    dtype: Literal["float64", "float32"] = "float64"
+    # Arrays as base64 typed array specs ({dtype, bdata, shape}) instead of lists
+    binary: bool = False
+    
+    @validator('width')
+    def validate_width(cls, v):
+        if v is not None and not MIN_PLOT_WIDTH <= v <= MAX_PLOT_WIDTH:
+            raise ValueError(f'width must be between {MIN_PLOT_WIDTH} and {MAX_PLOT_WIDTH}')
+        return v
+
+def check_function(v: str) -> str:
+    """
+    Validator for function fields: empty text and text the grammar rejects
+    fail validation (422). The submitted text is kept for responses;
+    canonical_params gives the spelling used for keys.
+    """
+    if not v or v.strip() == "":
+        raise ValueError('Function cannot be empty')
+    try:
+        canonical_expression(v)
+    except ValueError as e:
+        raise ValueError(f'Invalid function expression: {e}')
+    return v
+
+def canonical_function(v: str) -> str:
+    """Canonical spelling of a validated function (x^2, x*x and x**2 all become x**2)"""
+    return canonical_expression(v).text
+
+def canonical_params(params: Dict) -> Dict:
+    """
+    Request params with functions in canonical spelling, so equivalent
+    inputs share stored results, figures and in-flight computations
+    """
+    params = dict(params)
+    if 'function' in params:
+        params['function'] = canonical_function(params['function'])
+    if 'functions' in params:
+        params['functions'] = [canonical_function(f) for f in params['functions']]
+    return params
+
+def echo_functions(response: Any, request: BaseModel) -> Any:
+    """
+    The response with the caller's own function text in the fields that echo
+    it, for a response computed for an equivalent spelling
+    """
+    if not isinstance(response, dict):
+        return response
+    response = dict(response)
+    function = getattr(request, 'function', None)
+    if function is not None:
+        for field in ('function', 'original_function'):
+            if field in response:
+                response[field] = function
+    functions = getattr(request, 'functions', None)
+    if functions is not None and 'results' in response:
+        response['results'] = [
+            {**item, 'function': functions[item['function_index']]} if 'function_index' in item else item
+            for item in response['results']
+        ]
+    return response
+
 # ============ SOLID OF REVOLUTION MODELS ============
 class VolumeRequest(BaseModel):
     function: str
     lower_bound: float
     upper_bound: float
     axis: Literal["x-axis", "y-axis"] = "x-axis"
+    # False returns only numbers plus a result_id for /api/visualizations
+    include_visualizations: bool = True
+    plot_data: Optional[PlotDataOptions] = None
+    # Mesh resolution of plot_3d: preview renders fast, high refines
+    lod: Literal["preview", "standard", "high"] = DEFAULT_LOD
+    # Volume only (surface area is always numeric): see CalculationModeRequest
+    mode: Literal["numeric", "symbolic", "auto"] = "symbolic"
     
     @validator('function')
     def validate_function(cls, v):
-        allowed = re.compile(r'^[x0-9+\-*/().\s**sqrt()sincostanexplog]+$')
-        if not allowed.match(v.replace(' ', '')):
-            raise ValueError('Invalid function expression')
-        return v
+        return check_function(v)
     
     @validator('upper_bound')
     def validate_bounds(cls, v, values):
@@ -39,6 +212,8 @@ class VolumeRequest(BaseModel):
 # ============ LINEAR ALGEBRA MODELS ============
 class MatrixRequest(BaseModel):
     matrix: List[List[float]]
+    include_visualizations: bool = True
+    plot_data: Optional[PlotDataOptions] = None
 
 class MatrixOperationRequest(BaseModel):
     operation: Literal["add", "subtract", "multiply", "transpose", "scalar_multiply", "power"]
@@ -55,25 +230,26 @@ class DecompositionRequest(BaseModel):
     method: Literal["lu", "qr", "svd", "cholesky"] = "lu"
 
 # ============ INTEGRAL CALCULATOR MODELS ============
+MAX_BATCH_INTEGRALS = 10000
+MAX_BATCH_VISUALIZATIONS = 20
+MAX_RIEMANN_RECTANGLES = 50000
+
 class IndefiniteIntegralRequest(BaseModel):
     function: str
     
     @validator('function')
     def validate_function(cls, v):
-        if not v or v.strip() == "":
-            raise ValueError('Function cannot be empty')
-        return v.strip()
+        return check_function(v)
 
 class DefiniteIntegralRequest(BaseModel):
     function: str
     lower_bound: float
     upper_bound: float
+    include_visualizations: bool = True
     
     @validator('function')
     def validate_function(cls, v):
-        if not v or v.strip() == "":
-            raise ValueError('Function cannot be empty')
-        return v.strip()
+        return check_function(v)
     
     @validator('upper_bound')
     def validate_bounds(cls, v, values):
@@ -81,8 +257,63 @@ class DefiniteIntegralRequest(BaseModel):
             raise ValueError('Upper bound must be greater than lower bound')
         return v
 
+class CalculationModeRequest(DefiniteIntegralRequest):
+    # numeric: quadrature only; symbolic: SymPy checked against quadrature;
+    # auto: both at once, symbolic form kept if it arrives within AUTO_SYMBOLIC_BUDGET
+    mode: Literal["numeric", "symbolic", "auto"] = "symbolic"
+
+class RiemannRequest(DefiniteIntegralRequest):
+    n_rectangles: int = 10
+    
+    @validator('n_rectangles')
+    def validate_n_rectangles(cls, v):
+        if v < 1 or v > MAX_RIEMANN_RECTANGLES:
+            raise ValueError(f'n_rectangles must be between 1 and {MAX_RIEMANN_RECTANGLES}')
+        return v
+
+class Visualize3DRequest(DefiniteIntegralRequest):
+    plot_data: Optional[PlotDataOptions] = None
+    lod: Literal["preview", "standard", "high"] = DEFAULT_LOD
+
+class IntegralBounds(BaseModel):
+    lower: float
+    upper: float
+    
+    @validator('upper')
+    def validate_bounds(cls, v, values):
+        if 'lower' in values and v <= values['lower']:
+            raise ValueError('Upper bound must be greater than lower bound')
+        return v
+
+class DefiniteIntegralBatchRequest(BaseModel):
+    functions: List[str]
+    bounds: List[IntegralBounds]
+    include_visualizations: bool = False
+    
+    @validator('functions')
+    def validate_functions(cls, v):
+        if not v:
+            raise ValueError('Functions list cannot be empty')
+        return [check_function(f) for f in v]
+    
+    @validator('bounds')
+    def validate_batch_size(cls, v, values):
+        if not v:
+            raise ValueError('Bounds list cannot be empty')
+        if 'functions' in values and len(values['functions']) * len(v) > MAX_BATCH_INTEGRALS:
+            raise ValueError(f'Batch cannot exceed {MAX_BATCH_INTEGRALS} function × bound pairs')
+        return v
+
 class IntegralStepsRequest(BaseModel):
     function: str
+    
+    @validator('function')
+    def validate_function(cls, v):
+        return check_function(v)
+
+class FunctionValidationRequest(BaseModel):
+    # Not parsed here: /api/integral/validate reports invalid input in its response
+    function: str
 
 # ============ ALGEBRA MODELS ============
 class LinearEquationRequest(BaseModel):
@@ -115,6 +346,16 @@ class PolynomialEquationRequest(BaseModel):
             raise ValueError('Coefficients list cannot be empty')
         return v
 
+# ============ JOB MODELS ============
+class JobRequest(BaseModel):
+    service: Literal["integral", "math", "algebra", "linear_algebra"]
+    # Calculation of the service (job_queue.JOB_METHODS), e.g. calculate_definite_integral
+    method: str
+    args: List[Any] = []
+    kwargs: Dict[str, Any] = {}
+    # Seconds before the job fails with 504; defaults to JOB_TIMEOUT
+    timeout: Optional[float] = None
+
 # ============ ROOT ENDPOINT ============
 @app.get("/")
 def read_root():
@@ -153,6 +394,9 @@ def read_root():
                 "endpoints": {
                     "/api/integral/indefinite": "Calculate indefinite integral ∫f(x)dx",
                     "/api/integral/definite": "Calculate definite integral ∫[a,b]f(x)dx with visualization",
+                    "/api/integral/definite/batch": "Calculate many definite integrals (functions × bounds) in one request",
+                    "/api/integral/definite/stream": "Definite integral streamed as NDJSON/SSE: number, symbolic form, then each plot",
+                    "/api/integral/definite/batch/stream": "Batch streamed as NDJSON/SSE, one event per function as it finishes",
                     "/api/integral/area": "Calculate area under curve",
                     "/api/integral/average-value": "Calculate average value of function",
                     "/api/integral/arc-length": "Calculate arc length of curve",
@@ -165,105 +409,473 @@ def read_root():
                     "/api/integral/validate": "Validate function"
                 },
                 "method": "POST"
+            },
+            "visualizations": {
+                "endpoints": {
+                    "/api/visualizations/{result_id}": "Render plots for a stored result (send include_visualizations=false to defer them; ?lod=high refines 3D meshes)",
+                    "/api/visualizations/{result_id}/{name}": "Raw image/png or image/webp bytes of one plot (?format= or Accept header)"
+                },
+                "method": "GET"
+            },
+            "jobs": {
+                "endpoints": {
+                    "POST /api/jobs": "Queue a long-running service call, returns a job_id at once",
+                    "GET /api/jobs/{job_id}": "Job status, queue position and result or error",
+                    "GET /api/jobs/{job_id}/events": "Server-Sent Events stream of job status changes"
+                },
+                "method": "POST, GET"
+            },
+            "diagnostics": {
+                "endpoints": {
+                    "/api/cache/stats": "Expression, integration and figure cache hit/miss/eviction counters, coalesced requests",
+                    "/api/executor/stats": "Worker pool queue depth, timeouts and recycling counters",
+                    "/api/jobs/stats": "Job queue depth, outcomes and store size",
+                    "/api/startup/stats": "Time to readiness, worker spawn, prewarm steps and module group load times",
+                    "/health": "Liveness check, also reports which module groups are loaded",
+                    "/metrics": "Prometheus metrics: latency per route and per service phase, payload sizes, cache hits"
+                },
+                "method": "GET"
             }
         },
         "documentation": "/docs"
     }
 
+# ============ LAZY VISUALIZATIONS ============
+class ImagePlot:
+    """
+    Matplotlib plot of a stored result. JSON responses only carry its URL;
+    the bytes are rendered when /api/visualizations/{id}/{name} is fetched.
+    """
+
+    def __init__(self, service, method: str, *args, **kwargs):
+        self.service = service
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, image_format: str = DEFAULT_IMAGE_FORMAT):
+        return executor.run_cpu(self.service, self.method, *self.args, **self.kwargs, image_format=image_format)
+
+    def key(self, image_format: str) -> str:
+        """figure_key the renderer computes for this call, known without rendering"""
+        renderer = f"{SERVICES[self.service.name][1]}.{self.method}"
+        return figure_key(renderer, self.args, {**self.kwargs, 'image_format': image_format})
+
+async def plotly_plot(service, method: str, *args, plot_data: Optional[Dict] = None, **kwargs):
+    """Render a Plotly plot; data-only output is embedded as an object, not a JSON string"""
+    if plot_data is None:
+        return await executor.run_cpu(service, method, *args, **kwargs)
+    return json.loads(await executor.run_cpu(service, method, *args, plot_data=plot_data, **kwargs))
+
+# Each builder maps plot name -> ImagePlot, or a zero-arg coroutine
+# factory for Plotly plots, which are returned inline
+def _definite_integral_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('integral_visualization')
+    args = (params['function'], params['lower_bound'], params['upper_bound'])
+    return {
+        'function_plot': ImagePlot(viz, 'visualize_function', *args),
+        'area_plot': ImagePlot(viz, 'visualize_area_under_curve', *args, result['numerical_value'])
+    }
+
+def _volume_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('volume_visualization')
+    args = (params['function'], params['lower_bound'], params['upper_bound'], params['axis'])
+    return {
+        'plot_2d': lambda: plotly_plot(viz, 'generate_2d_plot', *args, plot_data=params.get('plot_data')),
+        'plot_3d': lambda: plotly_plot(
+            viz, 'generate_3d_plot', *args, result['volume_numerical'],
+            lod=params.get('lod', DEFAULT_LOD), plot_data=params.get('plot_data')
+        )
+    }
+
+def _determinant_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('linear_algebra_visualization')
+    return {
+        'matrix_visualization': ImagePlot(viz, 'visualize_matrix', np.array(params['matrix']))
+    }
+
+def _inverse_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('linear_algebra_visualization')
+    return {
+        'original_matrix_viz': ImagePlot(viz, 'visualize_matrix', np.array(params['matrix'])),
+        'inverse_matrix_viz': ImagePlot(viz, 'visualize_matrix', np.asarray(result['inverse']))
+    }
+
+def _eigenvalue_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('linear_algebra_visualization')
+    matrix = np.array(params['matrix'])
+    plots = {
+        'matrix_visualization': ImagePlot(viz, 'visualize_matrix', matrix)
+    }
+    
+    # Add eigenvector visualization for 2D or 3D
+    if matrix.shape[0] in (2, 3):
+        eigenvalues = np.array([ep['eigenvalue']['real'] + 1j*ep['eigenvalue']['imag']
+                               for ep in result['eigen_pairs']])
+        eigenvectors = np.asarray(result['eigenvectors'])
+        if matrix.shape[0] == 2:
+            plots['eigenvectors_visualization'] = ImagePlot(
+                viz, 'visualize_eigenvectors_2d', matrix, eigenvalues, eigenvectors
+            )
+        else:
+            plots['eigenvectors_visualization_3d'] = lambda: plotly_plot(
+                viz, 'visualize_eigenvectors_3d', matrix, eigenvalues, eigenvectors,
+                plot_data=params.get('plot_data')
+            )
+    return plots
+
+def _decomposition_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('linear_algebra_visualization')
+    if params['method'].lower() != 'svd':
+        return {}
+    return {
+        'svd_visualization': ImagePlot(
+            viz, 'visualize_svd',
+            np.asarray(result['U']), np.asarray(result['singular_values']), np.asarray(result['Vt'])
+        )
+    }
+
+def _area_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('integral_visualization')
+    return {
+        'area_plot': ImagePlot(
+            viz, 'visualize_area_under_curve',
+            params['function'], params['lower_bound'], params['upper_bound'], result['area']
+        )
+    }
+
+def _riemann_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('integral_visualization')
+    return {
+        'riemann_plot': ImagePlot(
+            viz, 'visualize_riemann_sum',
+            params['function'], params['lower_bound'], params['upper_bound'], params['n_rectangles']
+        )
+    }
+
+def _antiderivative_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('integral_visualization')
+    return {
+        'antiderivative_plot': ImagePlot(
+            viz, 'visualize_antiderivative', params['function'], params['lower_bound'], params['upper_bound']
+        )
+    }
+
+def _comparison_plots(params: Dict, result: Dict) -> Dict:
+    viz = service_handle('integral_visualization')
+    return {
+        'comparison_plot': ImagePlot(
+            viz, 'create_comparison_plot', params['function'], params['lower_bound'], params['upper_bound'],
+            n_rectangles=params['n_rectangles']
+        )
+    }
+
+PLOT_BUILDERS = {
+    'definite_integral': _definite_integral_plots,
+    'volume': _volume_plots,
+    'determinant': _determinant_plots,
+    'inverse': _inverse_plots,
+    'eigenvalues': _eigenvalue_plots,
+    'decomposition': _decomposition_plots,
+    'area': _area_plots,
+    'riemann': _riemann_plots,
+    'antiderivative': _antiderivative_plots,
+    'comparison': _comparison_plots
+}
+
+def image_url(http_request: Request, result_id: str, name: str) -> str:
+    return str(http_request.url_for('get_visualization_image', result_id=result_id, name=name))
+
+async def render_visualizations(entry: Dict, http_request: Request, names: Optional[List[str]] = None,
+                                overrides: Optional[Dict] = None) -> Dict:
+    """
+    Render (or reuse) the requested Plotly plots of a stored result
+    concurrently; Matplotlib plots are returned as image URLs
+    overrides: request params to render with instead of the stored ones (e.g. lod)
+    """
+    params = {**entry['params'], **overrides} if overrides else entry['params']
+    plots = PLOT_BUILDERS[entry['kind']](params, entry['result'])
+    names = list(plots) if names is None else names
+    unknown = [name for name in names if name not in plots]
+    if unknown:
+        raise ValueError(f"Unknown visualization(s): {', '.join(unknown)}. Available: {', '.join(plots)}")
+    
+    # Only the stored params' plots are kept on the entry; the figure cache has the rest
+    cached = entry['visualizations'] if not overrides else {}
+    missing = [name for name in names if name not in cached and not isinstance(plots[name], ImagePlot)]
+    rendered = dict(zip(missing, await asyncio.gather(*[plots[name]() for name in missing])))
+    if not overrides:
+        result_store.add_visualizations(entry, rendered)
+    return {
+        name: image_url(http_request, entry['id'], name) if isinstance(plots[name], ImagePlot)
+        else rendered.get(name, cached.get(name))
+        for name in names
+    }
+
+def image_plot(entry: Dict, name: str) -> ImagePlot:
+    plot = PLOT_BUILDERS[entry['kind']](entry['params'], entry['result']).get(name)
+    if not isinstance(plot, ImagePlot):
+        raise KeyError(name)
+    return plot
+
+# Result fields each kind's plots read; kinds not listed keep the whole result
+PLOT_RESULT_FIELDS = {
+    'determinant': (),
+    'inverse': ('inverse',),
+    'eigenvalues': ('eigen_pairs', 'eigenvectors'),
+    'decomposition': ('U', 'singular_values', 'Vt'),
+}
+
+def plot_inputs(kind: str, params: Dict, result: Dict) -> Tuple[Dict, Dict]:
+    """
+    What result_store keeps for a kind's plots: matrices as float arrays
+    rather than lists of Python floats, and only the result fields the
+    plots read (eigenvectors only where they are drawn, for 2x2 and 3x3)
+    """
+    if 'matrix' in params:
+        params = {**params, 'matrix': np.asarray(params['matrix'], dtype=float)}
+    fields = PLOT_RESULT_FIELDS.get(kind)
+    if kind == 'eigenvalues' and len(params['matrix']) not in (2, 3):
+        fields = ()
+    if fields is not None:
+        result = {field: result[field] for field in fields if field in result}
+    return params, dict(result)
+
+async def store_and_visualize(kind: str, request: BaseModel, result: Dict,
+                              http_request: Request) -> Tuple[Dict, Dict]:
+    """
+    Keep the compute result under an id and either return its plots now
+    (image URLs, inline Plotly) or point the client at
+    /api/visualizations/{id} to fetch them later. A result too large for
+    the store gets no id and no plots.
+    Returns (result_id fields, plots or {})
+    """
+    result_id = result_store.put(kind, *plot_inputs(kind, canonical_params(request.model_dump()), result))
+    if result_id is None:
+        return {'result_id': None, 'visualizations_url': None}, {}
+    lazy = {
+        'result_id': result_id,
+        'visualizations_url': f"/api/visualizations/{result_id}"
+    }
+    rendered = {}
+    if request.include_visualizations:
+        rendered = await render_visualizations(result_store.get(result_id), http_request)
+    return lazy, rendered
+
+def store_images(kind: str, params: Dict, result: Dict, http_request: Request) -> Dict:
+    """Store a result whose plots are all images and return {name: URL} (None if not stored)"""
+    params, result = plot_inputs(kind, canonical_params(params), result)
+    result_id = result_store.put(kind, params, result)
+    names = PLOT_BUILDERS[kind](params, result)
+    return {name: image_url(http_request, result_id, name) if result_id else None for name in names}
+
+# ============ CALCULATION MODES ============
+# Seconds auto mode waits for the symbolic form, counted from the start
+AUTO_SYMBOLIC_BUDGET = float(os.environ.get('AUTO_SYMBOLIC_BUDGET', 1.0))
+
+def _discard(task: asyncio.Task):
+    """Done callback for a result nobody waits for anymore"""
+    if not task.cancelled():
+        task.exception()
+
+def _succeeded(task: asyncio.Task) -> bool:
+    return task.done() and not task.cancelled() and task.exception() is None
+
+async def calculate_in_mode(service, method: str, mode: str, *args) -> Dict:
+    """
+    Run a service calculation in numeric or symbolic mode, or in auto mode:
+    both at once, returning the symbolic result (checked against quadrature)
+    if it is ready within AUTO_SYMBOLIC_BUDGET, counted from the start, and
+    the numeric one otherwise. The symbolic task gets the same budget for
+    SymPy in its worker, so a late one frees the worker soon after the
+    deadline. Clients that want the number at once use numeric mode or the
+    stream route.
+    """
+    if mode != 'auto':
+        return await executor.run_cpu(service, method, *args, mode=mode)
+
+    started = time.perf_counter()
+    # Numeric submitted first so it is not queued behind symbolic on a busy pool
+    numeric_task = asyncio.ensure_future(executor.run_cpu(service, method, *args, mode='numeric'))
+    symbolic = asyncio.ensure_future(
+        executor.run_cpu(service, method, *args, mode='symbolic', symbolic_budget=AUTO_SYMBOLIC_BUDGET)
+    )
+    try:
+        try:
+            numeric, numeric_error = await numeric_task, None
+        except ValueError as e:
+            # Quadrature failed (e.g. did not converge): a closed form may still answer
+            numeric, numeric_error = None, e
+        remaining = max(0.0, AUTO_SYMBOLIC_BUDGET - (time.perf_counter() - started))
+        await asyncio.wait({symbolic}, timeout=remaining)
+        if _succeeded(symbolic):
+            return {**symbolic.result(), 'mode': 'auto', 'symbolic_status': 'completed'}
+        if numeric_error is not None:
+            raise numeric_error
+        return {**numeric, 'mode': 'auto', 'symbolic_status': 'failed' if symbolic.done() else 'pending'}
+    finally:
+        # Whatever happened to numeric, symbolic's outcome is retrieved
+        symbolic.add_done_callback(_discard)
+
+# ============ REQUEST COALESCING ============
+def coalesced(route_fn):
+    """
+    Route decorator: concurrent requests with the same route, validated
+    body and base URL (image URLs are absolute) await one computation and
+    all get its response. The route must take `request` and `http_request`.
+    """
+    @functools.wraps(route_fn)
+    async def wrapper(**kwargs):
+        http_request = kwargs['http_request']
+        route = http_request.scope['route'].path
+        key = request_key(route, canonical_params(kwargs['request'].model_dump()), str(http_request.base_url))
+        response, shared = await single_flight.do(key, lambda: route_fn(**kwargs), route)
+        # Followers may have spelled the function differently from the caller it ran for
+        return echo_functions(response, kwargs['request']) if shared else response
+    return wrapper
+
+# ============ STREAMING ============
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def event_failure(error: BaseException) -> Dict:
+    """Stream event fields for one part that failed while the rest go on"""
+    return {"success": False, "detail": str(error), "status_code": getattr(error, 'status_code', 400)}
+
+def stream_events(events: AsyncIterator[Tuple[str, Dict]], http_request: Request) -> StreamingResponse:
+    """
+    Send (event, data) pairs as they are produced: one JSON line
+    {"event": ..., **data} each (NDJSON), or Server-Sent Events when the
+    client accepts text/event-stream. The status line is sent before the
+    first event, so later failures become an `error` event (with the
+    status_code the plain route would have answered).
+    """
+    sse = 'text/event-stream' in http_request.headers.get('accept', '')
+
+    def encode(event: str, data: Dict) -> str:
+        if sse:
+            return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+        return dumps({"event": event, **data}).decode() + "\n"
+
+    async def body():
+        try:
+            async for event, data in events:
+                yield encode(event, data)
+        except Exception as e:
+            yield encode('error', event_failure(e))
+
+    # X-Accel-Buffering stops nginx from holding events back in its buffer
+    return StreamingResponse(body(), media_type="text/event-stream" if sse else NDJSON_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def render_plot(entry: Dict, name: str, plot, http_request: Request) -> Dict:
+    """One plot of a stored result as stream event fields: images inline (base64) plus their URL"""
+    if not isinstance(plot, ImagePlot):
+        return {"plot": await plot()}
+    image = await plot(DEFAULT_IMAGE_FORMAT)
+    return {
+        "url": f"{image_url(http_request, entry['id'], name)}?format={DEFAULT_IMAGE_FORMAT}",
+        "media_type": IMAGE_MEDIA_TYPES[DEFAULT_IMAGE_FORMAT],
+        "data": base64.b64encode(image).decode()
+    }
+
+async def as_finished(tasks: Dict[asyncio.Future, Any]) -> AsyncIterator[Tuple[Any, asyncio.Future]]:
+    """
+    Yield (label, task) for each task as it finishes. Tasks still running
+    if the consumer stops early (client gone, error) finish unobserved.
+    """
+    pending = set(tasks)
+    for task in pending:
+        task.add_done_callback(_discard)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield tasks[task], task
+
 # ============ ALGEBRA ROUTES ============
 @app.post("/api/algebra/solve-linear")
-async def solve_linear_equation(request: LinearEquationRequest):
+async def solve_linear_equation(request: LinearEquationRequest,
+        algebra=Depends(algebra_service)):
     """Solve linear equation: ax + b = 0"""
     try:
-        from services.algebra_service import AlgebraService
-        
-        algebra_service = AlgebraService()
-        result = algebra_service.solve_linear(request.a, request.b)
-        
+        result = await executor.run_cpu(algebra, 'solve_linear', request.a, request.b)
+
         return {
             "success": True,
             "module": "algebra",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/algebra/solve-quadratic")
-async def solve_quadratic_equation(request: QuadraticEquationRequest):
+async def solve_quadratic_equation(request: QuadraticEquationRequest,
+        algebra=Depends(algebra_service)):
     """Solve quadratic equation: ax² + bx + c = 0"""
     try:
-        from services.algebra_service import AlgebraService
-        
-        algebra_service = AlgebraService()
-        result = algebra_service.solve_quadratic(request.a, request.b, request.c)
-        
+        result = await executor.run_cpu(algebra, 'solve_quadratic', request.a, request.b, request.c)
+
         return {
             "success": True,
             "module": "algebra",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/algebra/factor-quadratic")
-async def factor_quadratic_equation(request: QuadraticEquationRequest):
+async def factor_quadratic_equation(request: QuadraticEquationRequest,
+        algebra=Depends(algebra_service)):
     """Factor quadratic expression: ax² + bx + c"""
     try:
-        from services.algebra_service import AlgebraService
-        
-        algebra_service = AlgebraService()
-        result = algebra_service.factor_quadratic(request.a, request.b, request.c)
-        
+        result = await executor.run_cpu(algebra, 'factor_quadratic', request.a, request.b, request.c)
+
         return {
             "success": True,
             "module": "algebra",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/algebra/solve-polynomial")
-async def solve_polynomial_equation(request: PolynomialEquationRequest):
+async def solve_polynomial_equation(request: PolynomialEquationRequest,
+        algebra=Depends(algebra_service)):
     """Solve polynomial equation from coefficients"""
     try:
-        from services.algebra_service import AlgebraService
-        
-        algebra_service = AlgebraService()
-        result = algebra_service.solve_polynomial(request.coefficients)
-        
+        result = await executor.run_cpu(algebra, 'solve_polynomial', request.coefficients)
+
         return {
             "success": True,
             "module": "algebra",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # ============ SOLID OF REVOLUTION ROUTES ============
 @app.post("/api/volume")
-async def calculate_volume(request: VolumeRequest):
+@coalesced
+async def calculate_volume(request: VolumeRequest, http_request: Request,
+        volume_service=Depends(math_service)):
     try:
-        from services.math_service import MathService
-        from services.visualization_service import VisualizationService
-        
-        math_service = MathService()
-        viz_service = VisualizationService()
-        
-        result = math_service.calculate_volume(
+        result = await calculate_in_mode(
+            volume_service, 'calculate_volume', request.mode,
             request.function,
             request.lower_bound,
             request.upper_bound,
             request.axis
         )
-        
-        plot_data = viz_service.generate_plot(
-            request.function,
-            request.lower_bound,
-            request.upper_bound,
-            request.axis,
-            result['volume_numerical']
-        )
-        
+
+        lazy, plot_data = await store_and_visualize('volume', request, result, http_request)
+
         return {
             "success": True,
             "module": "solid_of_revolution",
@@ -276,151 +888,117 @@ async def calculate_volume(request: VolumeRequest):
                 "upper": request.upper_bound
             },
             "axis": request.axis,
-            "plot_2d": plot_data['plot_2d'],
-            "plot_3d": plot_data['plot_3d']
+            "mode": result['mode'],
+            "symbolic_status": result.get('symbolic_status'),
+            **plot_data,
+            **lazy
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # ============ LINEAR ALGEBRA ROUTES ============
 
 @app.post("/api/linear-algebra/determinant")
-async def matrix_determinant(request: MatrixRequest):
+async def matrix_determinant(request: MatrixRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Calculate determinant of a square matrix"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        from services.linear_algebra_visualization import LinearAlgebraVisualization
-        
-        la_service = LinearAlgebraService()
-        la_viz = LinearAlgebraVisualization()
-        
-        result = la_service.matrix_determinant(request.matrix)
-        
+        result = await executor.run_light(linear_algebra, 'matrix_determinant', request.matrix)
+
         # Add visualization
-        import numpy as np
-        matrix_viz = la_viz.visualize_matrix(np.array(request.matrix))
-        result['matrix_visualization'] = matrix_viz
-        
+        lazy, rendered = await store_and_visualize('determinant', request, result, http_request)
+        result.update(rendered)
+        result.update(lazy)
+
         return {
             "success": True,
             "module": "linear_algebra",
             "operation": "determinant",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/inverse")
-async def matrix_inverse(request: MatrixRequest):
+async def matrix_inverse(request: MatrixRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Calculate inverse of a square matrix"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        from services.linear_algebra_visualization import LinearAlgebraVisualization
-        
-        la_service = LinearAlgebraService()
-        la_viz = LinearAlgebraVisualization()
-        
-        result = la_service.matrix_inverse(request.matrix)
-        
+        result = await executor.run_light(linear_algebra, 'matrix_inverse', request.matrix)
+
         # Add visualizations
-        import numpy as np
-        original_viz = la_viz.visualize_matrix(np.array(request.matrix))
-        inverse_viz = la_viz.visualize_matrix(np.array(result['inverse']))
-        
-        result['original_matrix_viz'] = original_viz
-        result['inverse_matrix_viz'] = inverse_viz
-        
-        return {
+        lazy, rendered = await store_and_visualize('inverse', request, result, http_request)
+        result.update(rendered)
+        result.update(lazy)
+
+        return array_response({
             "success": True,
             "module": "linear_algebra",
             "operation": "inverse",
             **result
-        }
+        }, http_request)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/eigenvalues")
-async def matrix_eigenvalues(request: MatrixRequest):
+async def matrix_eigenvalues(request: MatrixRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Calculate eigenvalues and eigenvectors"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        from services.linear_algebra_visualization import LinearAlgebraVisualization
-        
-        la_service = LinearAlgebraService()
-        la_viz = LinearAlgebraVisualization()
-        
-        result = la_service.matrix_eigenvalues(request.matrix)
-        
-        # Add visualization
-        import numpy as np
-        matrix = np.array(request.matrix)
-        matrix_viz = la_viz.visualize_matrix(matrix)
-        result['matrix_visualization'] = matrix_viz
-        
-        # Add eigenvector visualization for 2D or 3D
-        if matrix.shape[0] == 2:
-            eigenvalues = np.array([ep['eigenvalue']['real'] + 1j*ep['eigenvalue']['imag'] 
-                                   for ep in result['eigen_pairs']])
-            eigenvectors = np.array(result['eigenvectors'])
-            eigen_viz = la_viz.visualize_eigenvectors_2d(matrix, eigenvalues, eigenvectors)
-            result['eigenvectors_visualization'] = eigen_viz
-        elif matrix.shape[0] == 3:
-            eigenvalues = np.array([ep['eigenvalue']['real'] + 1j*ep['eigenvalue']['imag'] 
-                                   for ep in result['eigen_pairs']])
-            eigenvectors = np.array(result['eigenvectors'])
-            eigen_viz = la_viz.visualize_eigenvectors_3d(matrix, eigenvalues, eigenvectors)
-            result['eigenvectors_visualization_3d'] = eigen_viz
-        
-        return {
+        result = await executor.run_light(linear_algebra, 'matrix_eigenvalues', request.matrix)
+
+        # Add visualizations (eigenvectors too for 2D or 3D)
+        lazy, rendered = await store_and_visualize('eigenvalues', request, result, http_request)
+        result.update(rendered)
+        result.update(lazy)
+
+        return array_response({
             "success": True,
             "module": "linear_algebra",
             "operation": "eigenvalues",
             **result
-        }
+        }, http_request)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/decomposition")
-async def matrix_decomposition(request: DecompositionRequest):
+async def matrix_decomposition(request: DecompositionRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Perform matrix decomposition (LU, QR, SVD, Cholesky)"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        from services.linear_algebra_visualization import LinearAlgebraVisualization
-        
-        la_service = LinearAlgebraService()
-        la_viz = LinearAlgebraVisualization()
-        
-        result = la_service.matrix_decomposition(request.matrix, request.method)
-        
-        # Add SVD visualization if method is SVD
-        if request.method.lower() == 'svd':
-            import numpy as np
-            U = np.array(result['U'])
-            S = np.array(result['singular_values'])
-            Vt = np.array(result['Vt'])
-            svd_viz = la_viz.visualize_svd(U, S, Vt)
-            result['svd_visualization'] = svd_viz
-        
-        return {
+        result = await executor.run_light(linear_algebra, 'matrix_decomposition', request.matrix, request.method)
+
+        # Add SVD visualization (image URL) if method is SVD
+        result.update(store_images('decomposition', request.model_dump(), result, http_request))
+
+        return array_response({
             "success": True,
             "module": "linear_algebra",
             "operation": "decomposition",
             **result
-        }
+        }, http_request)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/solve")
-async def solve_linear_system(request: LinearSystemRequest):
+async def solve_linear_system(request: LinearSystemRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Solve linear system Ax = b"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        
-        la_service = LinearAlgebraService()
-        result = la_service.solve_linear_system(request.A, request.b)
-        
-        return {
+        result = await executor.run_light(linear_algebra, 'solve_linear_system', request.A, request.b)
+
+        return array_response({
             "success": True,
             "module": "linear_algebra",
             "operation": "solve_system",
@@ -429,347 +1007,680 @@ async def solve_linear_system(request: LinearSystemRequest):
                 "b": request.b
             },
             **result
-        }
+        }, http_request)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/operations")
-async def matrix_operations(request: MatrixOperationRequest):
+async def matrix_operations(request: MatrixOperationRequest, http_request: Request,
+        linear_algebra=Depends(linear_algebra_service)):
     """Perform basic matrix operations"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        
-        la_service = LinearAlgebraService()
-        result = la_service.matrix_operations(
+        result = await executor.run_light(
+            linear_algebra, 'matrix_operations',
             request.operation,
             request.matrix_a,
             request.matrix_b,
             request.scalar
         )
-        
-        return {
+
+        return array_response({
             "success": True,
             "module": "linear_algebra",
             **result
-        }
+        }, http_request)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/linear-algebra/rank")
-async def matrix_rank(request: MatrixRequest):
+async def matrix_rank(request: MatrixRequest,
+        linear_algebra=Depends(linear_algebra_service)):
     """Calculate matrix rank"""
     try:
-        from services.linear_algebra_service import LinearAlgebraService
-        
-        la_service = LinearAlgebraService()
-        result = la_service.matrix_rank(request.matrix)
-        
+        result = await executor.run_light(linear_algebra, 'matrix_rank', request.matrix)
+
         return {
             "success": True,
             "module": "linear_algebra",
             "operation": "rank",
             **result
         }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # ============ INTEGRAL CALCULATOR ROUTES ============
 
 @app.post("/api/integral/indefinite")
-async def calculate_indefinite_integral(request: IndefiniteIntegralRequest):
+@coalesced
+async def calculate_indefinite_integral(request: IndefiniteIntegralRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate indefinite integral ∫f(x)dx"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.calculate_indefinite_integral(request.function)
-        
+        result = await executor.run_cpu(integral, 'calculate_indefinite_integral', request.function)
+
         return {
             "success": True,
             "module": "integral_calculator",
             "type": "indefinite",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/definite")
-async def calculate_definite_integral(request: DefiniteIntegralRequest):
+@coalesced
+async def calculate_definite_integral(request: CalculationModeRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate definite integral ∫[a,b]f(x)dx with visualization"""
     try:
-        from services.integral_service import IntegralService
-        from services.integral_visualization import IntegralVisualization
-        
-        integral_service = IntegralService()
-        viz_service = IntegralVisualization()
-        
         # Calculate integral
-        result = integral_service.calculate_definite_integral(
-            request.function,
-            request.lower_bound,
-            request.upper_bound
-        )
-        
-        # Generate visualizations
-        function_plot = viz_service.visualize_function(
+        result = await calculate_in_mode(
+            integral, 'calculate_definite_integral', request.mode,
             request.function,
             request.lower_bound,
             request.upper_bound
         )
-        
-        area_plot = viz_service.visualize_area_under_curve(
-            request.function,
-            request.lower_bound,
-            request.upper_bound,
-            result['numerical_value']
-        )
-        
-        result['visualizations'] = {
-            'function_plot': function_plot,
-            'area_plot': area_plot
+
+        # Generate visualizations (or defer them to /api/visualizations)
+        lazy, rendered = await store_and_visualize('definite_integral', request, result, http_request)
+        if rendered:
+            result['visualizations'] = rendered
+        result.update(lazy)
+
+        return {
+            "success": True,
+            "module": "integral_calculator",
+            "type": "definite",
+            **result
         }
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/integral/definite/batch")
+@coalesced
+async def calculate_definite_integral_batch(request: DefiniteIntegralBatchRequest, http_request: Request,
+        integral=Depends(integral_service)):
+    """Calculate ∫[a,b]f(x)dx for every function × bound pair, results in input order"""
+    try:
+        bounds = [(b.lower, b.upper) for b in request.bounds]
+        # Canonical spellings, so equivalent functions are integrated once
+        result = await executor.run_cpu(
+            integral, 'calculate_definite_integral_batch',
+            canonical_params(request.model_dump())['functions'],
+            bounds
+        )
+        result = echo_functions(result, request)
+        
+        # Visualizations are opt-in; each one is an image URL rendered on fetch
+        if request.include_visualizations:
+            items = [item for item in result['results'] if item['success']]
+            if len(items) > MAX_BATCH_VISUALIZATIONS:
+                raise ValueError(f'Visualizations are limited to {MAX_BATCH_VISUALIZATIONS} results per batch')
+            for item in items:
+                params = {
+                    'function': item['function'],
+                    'lower_bound': item['bounds']['lower'],
+                    'upper_bound': item['bounds']['upper']
+                }
+                urls = store_images('area', params, {'area': item['numerical_value']}, http_request)
+                item['visualization'] = urls['area_plot']
         
         return {
             "success": True,
             "module": "integral_calculator",
-            "type": "definite",
+            "type": "definite_batch",
             **result
         }
         
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/integral/definite/stream")
+async def stream_definite_integral(request: DefiniteIntegralRequest, http_request: Request,
+        integral=Depends(integral_service)):
+    """
+    Definite integral as a stream (NDJSON, or SSE for Accept: text/event-stream):
+    `result` with the quadrature value first, then `symbolic` and one
+    `visualization` per plot in the order they finish, then `done`.
+    Errors before the first event are ordinary HTTP errors.
+    """
+    args = (request.function, request.lower_bound, request.upper_bound)
+    # Numeric submitted first so it is not queued behind symbolic on a busy pool
+    numeric = asyncio.ensure_future(
+        executor.run_cpu(integral, 'calculate_definite_integral', *args, mode='numeric'))
+    symbolic = asyncio.ensure_future(
+        executor.run_cpu(integral, 'calculate_definite_integral', *args, mode='symbolic'))
+    symbolic.add_done_callback(_discard)
+    # The number is awaited before the stream opens, so failing inputs get a real status code
+    try:
+        try:
+            result = await numeric
+        except ValueError:
+            # Quadrature failed: the closed form, if any, is the result
+            result = await symbolic
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        result_id = result_store.put('definite_integral', canonical_params(request.model_dump()), dict(result))
+        entry = result_store.get(result_id)
+        yield 'result', {
+            "success": True,
+            "module": "integral_calculator",
+            "type": "definite",
+            **result,
+            "result_id": result_id,
+            "visualizations_url": f"/api/visualizations/{result_id}"
+        }
+
+        tasks = {} if result['mode'] == 'symbolic' else {symbolic: None}
+        if request.include_visualizations:
+            plots = PLOT_BUILDERS['definite_integral'](entry['params'], entry['result'])
+            tasks.update({
+                asyncio.ensure_future(render_plot(entry, name, plot, http_request)): name
+                for name, plot in plots.items()
+            })
+        async for name, task in as_finished(tasks):
+            error = task.exception()
+            data = event_failure(error) if error is not None else {"success": True, **task.result()}
+            if name is None:
+                yield 'symbolic', data
+            else:
+                yield 'visualization', {"name": name, **data}
+        yield 'done', {"result_id": result_id}
+
+    return stream_events(events(), http_request)
+
+@app.post("/api/integral/definite/batch/stream")
+async def stream_definite_integral_batch(request: DefiniteIntegralBatchRequest, http_request: Request,
+        integral=Depends(integral_service)):
+    """
+    Batch of definite integrals as a stream: one `results` event per
+    function (all its bound pairs) in the order they finish, then `done`.
+    Distinct functions are split into chunks integrated in parallel.
+    """
+    pairs = len(request.functions) * len(request.bounds)
+    if request.include_visualizations and pairs > MAX_BATCH_VISUALIZATIONS:
+        raise HTTPException(status_code=400,
+                            detail=f'Visualizations are limited to {MAX_BATCH_VISUALIZATIONS} results per batch')
+    bounds = [(b.lower, b.upper) for b in request.bounds]
+    canonical = canonical_params(request.model_dump())['functions']
+    distinct = list(dict.fromkeys(canonical))
+    # Two chunks per worker keeps every worker busy without flooding the queue
+    size = -(-len(distinct) // (2 * executor.process_workers))
+    chunks = [distinct[i:i + size] for i in range(0, len(distinct), size)]
+
+    async def events():
+        tasks = {
+            asyncio.ensure_future(executor.run_cpu(integral, 'calculate_definite_integral_batch', chunk, bounds)): chunk
+            for chunk in chunks
+        }
+        succeeded = 0
+        async for chunk, task in as_finished(tasks):
+            per_function = {}
+            for item in task.result()['results']:
+                per_function.setdefault(chunk[item.pop('function_index')], []).append(item)
+            for function_index, func_str in enumerate(request.functions):
+                if canonical[function_index] not in per_function:
+                    continue
+                results = [{**item, 'function': func_str} for item in per_function[canonical[function_index]]]
+                for item in results:
+                    if request.include_visualizations and item['success']:
+                        params = {'function': func_str, 'lower_bound': item['bounds']['lower'],
+                                  'upper_bound': item['bounds']['upper']}
+                        urls = store_images('area', params, {'area': item['numerical_value']}, http_request)
+                        item['visualization'] = urls['area_plot']
+                succeeded += sum(item['success'] for item in results)
+                yield 'results', {"function_index": function_index, "function": func_str, "results": results}
+        yield 'done', {"count": pairs, "succeeded": succeeded, "distinct_functions": len(distinct)}
+
+    return stream_events(events(), http_request)
+
 @app.post("/api/integral/area")
-async def calculate_area_under_curve(request: DefiniteIntegralRequest):
+@coalesced
+async def calculate_area_under_curve(request: DefiniteIntegralRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate area under curve"""
     try:
-        from services.integral_service import IntegralService
-        from services.integral_visualization import IntegralVisualization
-        
-        integral_service = IntegralService()
-        viz_service = IntegralVisualization()
-        
-        result = integral_service.calculate_area_under_curve(
+        result = await executor.run_cpu(
+            integral, 'calculate_area_under_curve',
             request.function,
             request.lower_bound,
             request.upper_bound
         )
-        
-        # Add visualization
-        area_plot = viz_service.visualize_area_under_curve(
-            request.function,
-            request.lower_bound,
-            request.upper_bound,
-            result['area']
-        )
-        
-        result['visualization'] = area_plot
-        
+
+        # Add visualization (image URL)
+        urls = store_images('area', request.model_dump(), result, http_request)
+        result['visualization'] = urls['area_plot']
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/average-value")
-async def calculate_average_value(request: DefiniteIntegralRequest):
+@coalesced
+async def calculate_average_value(request: DefiniteIntegralRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate average value of function over interval"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.calculate_average_value(
+        result = await executor.run_cpu(
+            integral, 'calculate_average_value',
             request.function,
             request.lower_bound,
             request.upper_bound
         )
-        
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/arc-length")
-async def calculate_arc_length(request: DefiniteIntegralRequest):
+@coalesced
+async def calculate_arc_length(request: DefiniteIntegralRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate arc length of curve"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.calculate_arc_length(
+        result = await executor.run_cpu(
+            integral, 'calculate_arc_length',
             request.function,
             request.lower_bound,
             request.upper_bound
         )
-        
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/surface-area")
-async def calculate_surface_area_revolution(request: VolumeRequest):
+@coalesced
+async def calculate_surface_area_revolution(request: VolumeRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Calculate surface area of solid of revolution"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.calculate_surface_area_revolution(
+        result = await executor.run_cpu(
+            integral, 'calculate_surface_area_revolution',
             request.function,
             request.lower_bound,
             request.upper_bound,
             request.axis
         )
-        
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/steps")
-async def get_integration_steps(request: IntegralStepsRequest):
+@coalesced
+async def get_integration_steps(request: IntegralStepsRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Get step-by-step integration explanation"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.get_integration_steps(request.function)
-        
+        result = await executor.run_cpu(integral, 'get_integration_steps', request.function)
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/riemann")
-async def visualize_riemann_sum(request: DefiniteIntegralRequest):
+@coalesced
+async def visualize_riemann_sum(request: RiemannRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Visualize Riemann sum approximation"""
     try:
-        from services.integral_visualization import IntegralVisualization
-        
-        viz_service = IntegralVisualization()
-        
-        n_rectangles = 10  # Can be made a parameter
-        riemann_plot = viz_service.visualize_riemann_sum(
-            request.function,
-            request.lower_bound,
-            request.upper_bound,
-            n_rectangles
+        sums = await executor.run_cpu(
+            integral, 'riemann_sums',
+            request.function, request.lower_bound, request.upper_bound, request.n_rectangles
         )
-        
+        riemann_plot = store_images('riemann', request.model_dump(), sums, http_request)['riemann_plot']
+
         return {
             "success": True,
             "module": "integral_calculator",
             "type": "riemann_sum",
             "visualization": riemann_plot,
-            "n_rectangles": n_rectangles
+            **sums
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/visualize-3d")
-async def visualize_3d_integral(request: DefiniteIntegralRequest):
-    """Generate 3D visualization of integral"""
+@coalesced
+async def visualize_3d_integral(request: Visualize3DRequest, http_request: Request,
+        integral_viz=Depends(integral_visualization)):
+    """Generate 3D visualization of integral (HTML, or data-only JSON with plot_data)"""
     try:
-        from services.integral_visualization import IntegralVisualization
-        
-        viz_service = IntegralVisualization()
-        plot_3d = viz_service.visualize_3d_integral(
+        plot_3d = await plotly_plot(
+            integral_viz, 'visualize_3d_integral',
             request.function,
             request.lower_bound,
-            request.upper_bound
+            request.upper_bound,
+            lod=request.lod,
+            plot_data=request.plot_data.model_dump() if request.plot_data else None
         )
-        
+
         return {
             "success": True,
             "module": "integral_calculator",
             "visualization_3d": plot_3d
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/antiderivative-viz")
-async def visualize_antiderivative(request: DefiniteIntegralRequest):
+@coalesced
+async def visualize_antiderivative(request: DefiniteIntegralRequest, http_request: Request):
     """Visualize function and its antiderivative"""
     try:
-        from services.integral_visualization import IntegralVisualization
-        
-        viz_service = IntegralVisualization()
-        antideriv_plot = viz_service.visualize_antiderivative(
-            request.function,
-            request.lower_bound,
-            request.upper_bound
-        )
-        
+        # Nothing is computed until the image is fetched; the request model has validated the function
+        antideriv_plot = store_images('antiderivative', request.model_dump(), {}, http_request)['antiderivative_plot']
+
         return {
             "success": True,
             "module": "integral_calculator",
             "visualization": antideriv_plot
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/comparison")
-async def compare_integration_methods(request: DefiniteIntegralRequest):
+@coalesced
+async def compare_integration_methods(request: RiemannRequest, http_request: Request,
+        integral=Depends(integral_service)):
     """Compare different numerical integration methods"""
     try:
-        from services.integral_visualization import IntegralVisualization
-        
-        viz_service = IntegralVisualization()
-        comparison_plot = viz_service.create_comparison_plot(
-            request.function,
-            request.lower_bound,
-            request.upper_bound
+        sums = await executor.run_cpu(
+            integral, 'riemann_sums',
+            request.function, request.lower_bound, request.upper_bound, request.n_rectangles
         )
-        
+        comparison_plot = store_images('comparison', request.model_dump(), sums, http_request)['comparison_plot']
+
         return {
             "success": True,
             "module": "integral_calculator",
-            "visualization": comparison_plot
+            "visualization": comparison_plot,
+            **sums
         }
-        
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/integral/validate")
-async def validate_integral_function(request: IntegralStepsRequest):
+async def validate_integral_function(request: FunctionValidationRequest,
+        integral=Depends(integral_service)):
     """Validate if function can be integrated"""
     try:
-        from services.integral_service import IntegralService
-        
-        integral_service = IntegralService()
-        result = integral_service.validate_function(request.function)
-        
+        result = await executor.run_cpu(integral, 'validate_function', request.function)
+
         return {
             "success": True,
             "module": "integral_calculator",
             **result
         }
+
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ============ VISUALIZATION ROUTES ============
+
+@app.get("/api/visualizations/{result_id}")
+async def get_visualizations(result_id: str, http_request: Request, names: Optional[str] = None,
+                             lod: Optional[str] = None):
+    """
+    Render plots for a stored result on demand
+    names: optional comma-separated subset, e.g. ?names=area_plot
+    lod: re-render 3D meshes at another level of detail, e.g. ?names=plot_3d&lod=high
+    """
+    entry = result_store.get(result_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    try:
+        selected = [name.strip() for name in names.split(',') if name.strip()] if names else None
+        overrides = {'lod': check_lod(lod)} if lod else None
+        visualizations = await render_visualizations(entry, http_request, selected, overrides)
         
+        return {
+            "success": True,
+            "result_id": result_id,
+            "kind": entry['kind'],
+            "visualizations": visualizations
+        }
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/visualizations/{result_id}/{name}")
+async def get_visualization_image(result_id: str, name: str, http_request: Request,
+                                  format: Optional[str] = None):
+    """
+    Raw image bytes of one plot of a stored result
+    format: png or webp; defaults to WebP when the Accept header allows it
+    Answers If-None-Match with 304 before rendering anything.
+    """
+    entry = result_store.get(result_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    try:
+        if format:
+            image_format = check_image_format(format)
+        else:
+            image_format = negotiate_image_format(http_request.headers.get('accept', ''))
+        plot = image_plot(entry, name)
+        key = plot.key(image_format)
+        headers = {
+            # Same key, same bytes: caches may keep and revalidate it
+            "ETag": etag(key),
+            "Cache-Control": f"public, max-age={int(result_store.ttl)}",
+            "Vary": "Accept"
+        }
+        if if_none_match(http_request.headers.get('if-none-match'), key):
+            return Response(status_code=304, headers=headers)
+        image = await plot(image_format)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No image named {name} for this result")
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    return Response(content=image, media_type=IMAGE_MEDIA_TYPES[image_format], headers=headers)
+
+# ============ JOB ROUTES ============
+# Seconds between SSE keep-alive comments while a job's status is unchanged
+JOB_EVENTS_KEEPALIVE = 15.0
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a service call that may take longer than a request should stay open.
+    Async, like the other job routes, so the queue is only touched on the event loop.
+    """
+    try:
+        job = job_queue.submit(request.service, request.method, request.args, request.kwargs, request.timeout)
+    except ExecutorError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "success": True,
+        "module": "jobs",
+        "job_id": job['id'],
+        "status": job['status'],
+        "position": job.get('position'),
+        "status_url": f"/api/jobs/{job['id']}",
+        "events_url": f"/api/jobs/{job['id']}/events"
+    }
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    """Report job queue depth, outcomes and store size"""
+    return {
+        "success": True,
+        "module": "diagnostics",
+        "jobs": job_queue.stats()
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job, with its result once it has succeeded"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    # Results of linear algebra jobs hold NumPy arrays
+    return NumpyJSONResponse({"success": True, "module": "jobs", **job})
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, http_request: Request):
+    """
+    Server-Sent Events: a `status` event whenever the job's status or queue
+    position changes, ending after the succeeded/failed event
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events():
+        last = None
+        revision = job_queue.revision
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            current = (job['version'], job.get('position'))
+            if current != last:
+                last = current
+                yield f"event: status\ndata: {dumps(job).decode()}\n\n"
+                if job['status'] in TERMINAL_STATES:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            if await http_request.is_disconnected():
+                return
+            revision = await job_queue.changed(revision, JOB_EVENTS_KEEPALIVE)
+
+    # X-Accel-Buffering stops nginx from holding events back in its buffer
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ============ DIAGNOSTICS ROUTES ============
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Report shared cache counters for sizing under real traffic"""
+    from services.expression_cache import expression_cache
+    from services.integration_cache import integration_cache
+
+    return {
+        "success": True,
+        "module": "diagnostics",
+        "expression_cache": expression_cache.stats(),
+        "integration_cache": integration_cache.stats(),
+        "figure_cache": figure_cache.stats(),
+        "result_store": result_store.stats(),
+        # Requests answered by an identical in-flight computation
+        "single_flight": single_flight.stats(),
+        # Each worker process keeps its own caches
+        "workers": executor.worker_stats()
+    }
+
+@app.get("/api/executor/stats")
+def executor_stats():
+    """Report worker pool queue depth, timeouts and recycling"""
+    return {
+        "success": True,
+        "module": "diagnostics",
+        "executor": executor.stats()
+    }
+
+@app.get("/api/startup/stats")
+def startup_report():
+    """Report how long the application took to become ready"""
+    return {
+        "success": True,
+        "module": "diagnostics",
+        "startup": startup_stats,
+        "module_groups_ms": loaded_groups()
+    }
+
+@app.get("/health")
+def health():
+    """Liveness check; never waits for heavy modules to load"""
+    groups = loaded_groups()
+    return {
+        "status": "ok",
+        "warm": startup_stats.get('warm', False),
+        "module_groups": {group: group in groups for group in MODULE_GROUPS}
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of request, phase, payload and cache metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8002)
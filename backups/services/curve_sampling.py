@@ -0,0 +1,108 @@
+from typing import Callable, Tuple
+
+import numpy as np
+
+from services.metrics import record_size, span
+
+# Defaults sized for ~1000 px wide plots
+INITIAL_INTERVALS = 128
+MAX_EVALUATIONS = 4000
+MAX_ROUNDS = 12
+# Allowed midpoint-to-chord distance as a fraction of the y-range
+TOLERANCE = 1e-3
+# Values this many robust y-ranges away from the bulk are asymptote blow-up
+CLIP_RANGES = 3.0
+# A step of this fraction of the y-range across the finest interval is a jump
+JUMP = 0.05
+
+
+def _evaluate(evaluate: Callable[[np.ndarray], np.ndarray], x: np.ndarray) -> np.ndarray:
+    with np.errstate(all='ignore'):
+        y = np.asarray(evaluate(x))
+    if np.iscomplexobj(y):
+        y = np.where(np.abs(y.imag) > 1e-12, np.nan, y.real)
+    return np.broadcast_to(y.astype(float), x.shape).copy()
+
+
+def _y_range(y: np.ndarray) -> Tuple[float, float]:
+    """2nd..98th percentile of the finite values, so spikes do not set the scale"""
+    finite = y[np.isfinite(y)]
+    if not len(finite):
+        return 0.0, 1.0
+    low, high = np.percentile(finite, [2, 98])
+    if high - low <= 0:
+        scale = max(abs(high), 1.0)
+        return low - scale, high + scale
+    return low, high
+
+
+def sample_function(evaluate: Callable[[np.ndarray], np.ndarray], lower: float, upper: float,
+                    max_evaluations: int = MAX_EVALUATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample y = evaluate(x) on [lower, upper] for plotting. Starting from a
+    coarse grid, intervals whose midpoint is off the chord (in screen
+    space) or that border a non-finite value are bisected, a round at a
+    time with one vectorized call each, until the error is below
+    TOLERANCE or max_evaluations is spent. Values blown up by asymptotes
+    and jumps that survive the finest bisection become NaN, which plots
+    as a gap.
+    """
+    with span('viz.sample_function'):
+        x = np.linspace(lower, upper, INITIAL_INTERVALS + 1)
+        y = _evaluate(evaluate, x)
+        budget = max_evaluations - len(x)
+        width = upper - lower
+        min_dx = width / INITIAL_INTERVALS / 2**MAX_ROUNDS
+        low, high = _y_range(y)
+        scale_y = high - low
+        clip_low, clip_high = low - CLIP_RANGES * scale_y, high + CLIP_RANGES * scale_y
+        active = np.ones(len(x) - 1, dtype=bool)
+
+        for _ in range(MAX_ROUNDS):
+            dx = np.diff(x)
+            active &= dx > min_dx
+            candidates = np.flatnonzero(active)
+            if not len(candidates) or budget <= 0:
+                break
+            if len(candidates) > budget:
+                # Spend what is left on the intervals spanning the most screen height
+                jump = np.abs(np.nan_to_num(y[candidates + 1] - y[candidates], nan=np.inf))
+                candidates = np.sort(candidates[np.argsort(-jump, kind='stable')[:budget]])
+            mid_x = (x[candidates] + x[candidates + 1]) / 2
+            mid_y = _evaluate(evaluate, mid_x)
+            budget -= len(mid_x)
+
+            # Screen-space distance of the midpoint from the chord
+            chord = (y[candidates] + y[candidates + 1]) / 2
+            error = np.abs(mid_y - chord) / scale_y
+            left, right = y[candidates], y[candidates + 1]
+            with np.errstate(invalid='ignore'):
+                shown = [(v >= clip_low) & (v <= clip_high) for v in (left, right, mid_y)]
+            visible = shown[0] & shown[1] & shown[2]
+            # Where the curve leaves the plot (domain edge, pole) keep bisecting towards it
+            edge = ~visible & (shown[0] | shown[1] | shown[2])
+            refine = (visible & (error > TOLERANCE)) | edge
+
+            # Both halves of a refined interval stay active
+            x = np.insert(x, candidates + 1, mid_x)
+            y = np.insert(y, candidates + 1, mid_y)
+            split = np.zeros(len(active), dtype=bool)
+            split[candidates] = refine
+            active = np.insert(split, candidates + 1, refine)
+
+        x, y = _clip(x, y, clip_low, clip_high, scale_y, min_dx)
+    record_size('curve_samples', len(x))
+    return x, y
+
+
+def _clip(x: np.ndarray, y: np.ndarray, clip_low: float, clip_high: float, scale_y: float,
+          min_dx: float) -> Tuple[np.ndarray, np.ndarray]:
+    """NaN out asymptote blow-up and break the line across jumps"""
+    with np.errstate(invalid='ignore'):
+        y = np.where((y < clip_low) | (y > clip_high), np.nan, y)
+    # Bisected down to the finest width and still visibly apart: a discontinuity
+    jumps = np.flatnonzero((np.diff(x) <= 2 * min_dx) & (np.abs(np.diff(y)) > JUMP * scale_y))
+    if len(jumps):
+        x = np.insert(x, jumps + 1, (x[jumps] + x[jumps + 1]) / 2)
+        y = np.insert(y, jumps + 1, np.nan)
+    return x, y
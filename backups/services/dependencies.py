@@ -0,0 +1,136 @@
+import importlib
+import threading
+import time
+from typing import Any, Dict, Tuple, Union
+
+# Service name -> (module, class, module group). Modules are imported on
+# first use of their group, so the app boots without SymPy, SciPy,
+# Matplotlib or Plotly loaded.
+SERVICES: Dict[str, Tuple[str, str, str]] = {
+    'algebra': ('services.algebra_service', 'AlgebraService', 'algebra'),
+    'linear_algebra': ('services.linear_algebra_service', 'LinearAlgebraService', 'linear_algebra'),
+    'linear_algebra_visualization': ('services.linear_algebra_visualization', 'LinearAlgebraVisualization', 'linear_algebra'),
+    'integral': ('services.integral_service', 'IntegralService', 'integral'),
+    'integral_visualization': ('services.integral_visualization', 'IntegralVisualization', 'integral'),
+    'math': ('services.math_service', 'MathService', 'volume'),
+    'volume_visualization': ('services.visualization_service', 'VisualizationService', 'volume'),
+}
+MODULE_GROUPS = ('algebra', 'linear_algebra', 'integral', 'volume')
+
+# Services built around another service get the shared instance
+_REQUIRES = {
+    'integral_visualization': 'integral',
+    'volume_visualization': 'math',
+}
+_NAMES = {(module, cls): name for name, (module, cls, _) in SERVICES.items()}
+
+_instances: Dict[str, Any] = {}
+_group_load_ms: Dict[str, float] = {}
+_lock = threading.RLock()
+
+
+class ServiceHandle:
+    """
+    Cheap, picklable reference to a service singleton. Route handlers get
+    handles, and the instance is resolved where the call actually runs
+    (thread pool or worker process), so the API process only imports a
+    module group when it executes that group's work itself.
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def instance(self):
+        return get_service(self.name)
+
+    def __repr__(self) -> str:
+        return f"ServiceHandle({self.name!r})"
+
+
+def _build(name: str):
+    module, cls, _ = SERVICES[name]
+    service_cls = getattr(importlib.import_module(module), cls)
+    if name in _REQUIRES:
+        return service_cls(get_service(_REQUIRES[name]))
+    return service_cls()
+
+
+def get_service(service: Union[str, type, ServiceHandle]):
+    """
+    Process-wide singleton of a service, by name, handle or class. The
+    services keep no per-request state (shared caches are locked), so
+    one instance is safely used by every request and worker thread.
+    """
+    if isinstance(service, ServiceHandle):
+        name = service.name
+    elif isinstance(service, str):
+        name = service
+    else:
+        name = _NAMES[(service.__module__, service.__name__)]
+    instance = _instances.get(name)
+    if instance is None:
+        group = SERVICES[name][2]
+        load_group(group)
+        instance = _instances[name]
+    return instance
+
+
+def load_group(group: str) -> float:
+    """Import and build every service of a module group; returns load time (ms)"""
+    if group in _group_load_ms:
+        return _group_load_ms[group]
+    with _lock:
+        if group not in _group_load_ms:
+            start = time.perf_counter()
+            for name, (_, _, service_group) in SERVICES.items():
+                if service_group == group and name not in _instances:
+                    _instances[name] = _build(name)
+            _group_load_ms[group] = round((time.perf_counter() - start) * 1000, 1)
+    return _group_load_ms[group]
+
+
+_handles = {name: ServiceHandle(name) for name in SERVICES}
+
+
+def service_handle(name: str) -> ServiceHandle:
+    return _handles[name]
+
+
+def build_services() -> Dict[str, float]:
+    """Load every module group now; returns load time per group (ms)"""
+    return {group: load_group(group) for group in MODULE_GROUPS}
+
+
+def loaded_groups() -> Dict[str, float]:
+    return dict(_group_load_ms)
+
+
+# ============ FASTAPI DEPENDENCIES ============
+def algebra_service() -> ServiceHandle:
+    return _handles['algebra']
+
+
+def math_service() -> ServiceHandle:
+    return _handles['math']
+
+
+def volume_visualization() -> ServiceHandle:
+    return _handles['volume_visualization']
+
+
+def linear_algebra_service() -> ServiceHandle:
+    return _handles['linear_algebra']
+
+
+def linear_algebra_visualization() -> ServiceHandle:
+    return _handles['linear_algebra_visualization']
+
+
+def integral_service() -> ServiceHandle:
+    return _handles['integral']
+
+
+def integral_visualization() -> ServiceHandle:
+    return _handles['integral_visualization']
@@ -0,0 +1,393 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from services import metrics
+from services.dependencies import ServiceHandle, get_service
+from services.prewarm import prewarm_enabled
+from services.time_budget import time_limit
+
+
+class ExecutorError(Exception):
+    """Base class for failures of the executor itself (not of the task)"""
+    status_code = 500
+
+
+class ExecutorBusy(ExecutorError):
+    """Queue depth limit reached, the request should be retried later"""
+    status_code = 503
+
+
+class TaskTimeout(ExecutorError):
+    """Task exceeded its time limit"""
+    status_code = 504
+
+
+# ============ WORKER SIDE ============
+def _invoke(service, method: str, args: tuple, kwargs: dict):
+    """service is an instance, or a ServiceHandle/class resolved to this process's singleton"""
+    if isinstance(service, (ServiceHandle, type)):
+        service = get_service(service)
+    return getattr(service, method)(*args, **kwargs)
+
+
+def _invoke_collecting(service, method: str, args: tuple, kwargs: dict):
+    """_invoke that also returns the metric events the call emitted"""
+    with metrics.collect() as events:
+        result = _invoke(service, method, args, kwargs)
+    return result, events
+
+
+def _worker_snapshot() -> Dict:
+    from services.expression_cache import expression_cache
+    from services.figure_cache import figure_cache
+    from services.integration_cache import integration_cache
+
+    return {
+        'expression_cache': expression_cache.stats(),
+        'integration_cache': integration_cache.stats(),
+        'figure_cache': figure_cache.stats()
+    }
+
+
+def _invoke_in_worker(service, method: str, args: tuple, kwargs: dict, timeout: Optional[float]):
+    """
+    Runs in the worker's main thread, so time_limit can interrupt
+    pure-Python work (SymPy, quad callbacks) without killing the process.
+    Cache stats and metric events ride back with the result so the
+    parent can report them.
+    """
+    try:
+        with time_limit(timeout):
+            result, events = _invoke_collecting(service, method, args, kwargs)
+    except TimeoutError:
+        raise TaskTimeout(f"Calculation exceeded the {timeout}s time limit") from None
+    return os.getpid(), result, _worker_snapshot(), events
+
+
+def _worker_init(prewarm: bool):
+    # Ctrl+C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Otherwise services are imported lazily by the first task that needs them
+    if prewarm:
+        from services.prewarm import prewarm as run_prewarm
+        run_prewarm()
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+# ============ PARENT SIDE ============
+class _Worker:
+    """
+    One worker process in a pool of its own. ProcessPoolExecutor treats any
+    killed process as a broken pool and fails every task in it, so each
+    worker gets a separate pool and is only handed a task while idle:
+    killing a stuck worker then fails nothing but that task.
+    """
+
+    def __init__(self, index: int, pool: ProcessPoolExecutor):
+        self.index = index
+        self.pool = pool
+        self.pid = None
+        # Set once the executor has replaced this worker
+        self.retired = False
+
+    @property
+    def broken(self) -> bool:
+        return bool(getattr(self.pool, '_broken', False))
+
+    def kill(self) -> int:
+        """Kill the process (the pool cannot cancel a running task); returns processes killed"""
+        killed = 0
+        for process in list((getattr(self.pool, '_processes', None) or {}).values()):
+            if process.is_alive():
+                process.kill()
+                killed += 1
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        return killed
+
+
+class TaskExecutor:
+    """
+    Dispatches service calls off the asyncio event loop.
+
+    - run_cpu:   process workers for SymPy, SciPy and Matplotlib work
+    - run_light: thread pool for cheap NumPy linear algebra
+
+    Each kind has a queue-depth limit (ExecutorBusy when exceeded).
+    Process tasks wait for an idle worker and have a timeout: the worker
+    interrupts itself first and, if the task is stuck in C code, the
+    parent kills that worker alone after a grace period (TaskTimeout) and
+    starts a replacement. Each worker process is replaced after
+    max_tasks_per_child tasks (ProcessPoolExecutor's own recycling, spawn
+    or forkserver only) to cap memory growth.
+    """
+
+    KILL_GRACE_SECONDS = 2.0
+
+    def __init__(self, mode: str = 'process', process_workers: int = 2, thread_workers: int = 4,
+                 max_queue: int = 64, task_timeout: float = 30.0, max_tasks_per_child: int = 200,
+                 start_method: str = 'spawn', prewarm: bool = False):
+        self.mode = mode
+        self.process_workers = process_workers
+        self.thread_workers = thread_workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.start_method = start_method
+        self.prewarm = prewarm
+
+        self._workers: List[_Worker] = []
+        self._idle: List[_Worker] = []
+        self._waiters = deque()
+        self._thread_pool = None
+        self._pending = {'cpu': 0, 'light': 0}
+        self._worker_stats = {}
+        self.counters = {
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'workers_killed': 0,
+            'recycles': 0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'TaskExecutor':
+        env = os.environ.get
+        return cls(
+            mode=env('EXECUTOR_MODE', 'process'),
+            process_workers=int(env('EXECUTOR_PROCESS_WORKERS', os.cpu_count() or 2)),
+            thread_workers=int(env('EXECUTOR_THREAD_WORKERS', 4)),
+            max_queue=int(env('EXECUTOR_MAX_QUEUE', 64)),
+            task_timeout=float(env('EXECUTOR_TASK_TIMEOUT', 30)),
+            max_tasks_per_child=int(env('EXECUTOR_MAX_TASKS_PER_CHILD', 200)),
+            start_method=env('EXECUTOR_START_METHOD', 'spawn'),
+            prewarm=prewarm_enabled()
+        )
+
+    # ----- worker management -----
+    def _new_worker(self, index: int) -> _Worker:
+        pool = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_worker_init,
+            initargs=(self.prewarm,),
+            # Not supported with fork: workers are then never recycled
+            max_tasks_per_child=(self.max_tasks_per_child or None) if self.start_method != 'fork' else None
+        )
+        return _Worker(index, pool)
+
+    def _start_workers(self):
+        if not self._workers:
+            self._workers = [self._new_worker(index) for index in range(self.process_workers)]
+            self._idle = list(self._workers)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        """Retire a killed or broken worker and put a fresh one in its slot"""
+        worker.retired = True
+        self._worker_stats.pop(worker.index, None)
+        replacement = self._workers[worker.index] = self._new_worker(worker.index)
+        return replacement
+
+    async def _acquire(self) -> _Worker:
+        """An idle worker, waiting in arrival order when all are busy"""
+        self._start_workers()
+        if self._idle:
+            return self._idle.pop()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # Handed a worker just as the caller went away: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self._release(waiter.result())
+            raise
+
+    def _release(self, worker: _Worker):
+        """Give a worker whose task has finished to the next waiter, or park it"""
+        if worker.retired:
+            return
+        if worker.broken:
+            worker = self._replace(worker)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(worker)
+                return
+        self._idle.append(worker)
+
+    def _kill(self, worker: _Worker):
+        """Kill a worker stuck in a task and hand its slot to a fresh process"""
+        if worker.retired:
+            return
+        self.counters['workers_killed'] += worker.kill()
+        self._release(self._replace(worker))
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix='math-light'
+            )
+        return self._thread_pool
+
+    def start(self):
+        """Create the pools up front so the first request does not pay for it"""
+        self._get_thread_pool()
+        if self.mode == 'process':
+            self._start_workers()
+
+    async def warm(self) -> int:
+        """
+        Spawn every process worker now (each prewarms in the initializer
+        when enabled) so no request waits for a cold worker.
+        Returns the number of workers that reported ready.
+        """
+        if self.mode != 'process':
+            return 0
+        self._start_workers()
+        # Each pool spawns its process on the first submit
+        workers = list(self._workers)
+        futures = [asyncio.wrap_future(worker.pool.submit(_worker_ready)) for worker in workers]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for worker, result in zip(workers, results):
+            if isinstance(result, BrokenProcessPool) and worker in self._idle:
+                # Let the next task start on a fresh worker
+                self._idle.remove(worker)
+                self._release(worker)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        return len(set(results))
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.retired = True
+            worker.pool.shutdown(wait=False, cancel_futures=True)
+        self._workers, self._idle = [], []
+        while self._waiters:
+            self._waiters.popleft().cancel()
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+    # ----- dispatch -----
+    def _admit(self, kind: str):
+        if self._pending[kind] >= self.max_queue:
+            self.counters['rejected'] += 1
+            raise ExecutorBusy("Server is busy, please retry shortly")
+        self._pending[kind] += 1
+
+    async def run_cpu(self, service, method: str, *args,
+                      timeout: Optional[float] = None, **kwargs):
+        """
+        Run service.method(*args, **kwargs) in the process pool. Workers
+        use their own singleton of the service (handle, class or instance).
+        """
+        if self.mode != 'process':
+            return await self.run_light(service, method, *args, **kwargs)
+        if not isinstance(service, (ServiceHandle, type)):
+            service = type(service)
+
+        timeout = self.task_timeout if timeout is None else timeout
+        self._admit('cpu')
+        try:
+            worker = await self._acquire()
+            try:
+                future = worker.pool.submit(_invoke_in_worker, service, method, args, kwargs, timeout)
+            except BaseException:
+                self._release(worker)
+                raise
+            # The worker is free again once its task ends, even if this caller is cancelled
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda _: self._call_soon(loop, self._release, worker))
+            try:
+                pid, result, snapshot, events = await asyncio.wait_for(
+                    asyncio.wrap_future(future),
+                    timeout + self.KILL_GRACE_SECONDS if timeout else None
+                )
+            except TaskTimeout:
+                # Interrupted inside the worker, the process is still healthy
+                self.counters['timeouts'] += 1
+                raise
+            except asyncio.TimeoutError:
+                # Worker did not interrupt itself (stuck in C code): kill it alone
+                self.counters['timeouts'] += 1
+                self._kill(worker)
+                raise TaskTimeout(f"Calculation exceeded the {timeout}s time limit")
+            except BrokenProcessPool:
+                # Only this worker's task is lost; _release replaces the worker
+                raise ExecutorError("Calculation worker stopped unexpectedly")
+
+            if worker.pid is not None and pid != worker.pid:
+                # ProcessPoolExecutor replaced the process after max_tasks_per_child tasks
+                self.counters['recycles'] += 1
+            worker.pid = pid
+            self._worker_stats[worker.index] = (pid, snapshot)
+            metrics.replay(events)
+            self.counters['completed'] += 1
+            return result
+        except ExecutorError:
+            raise
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self._pending['cpu'] -= 1
+
+    @staticmethod
+    def _call_soon(loop: asyncio.AbstractEventLoop, callback, *args):
+        """Schedule callback on the event loop from a pool thread"""
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # Loop already closed (shutdown)
+            pass
+
+    async def run_light(self, service, method: str, *args, **kwargs):
+        """Run service.method(*args, **kwargs) in the thread pool"""
+        self._admit('light')
+        try:
+            loop = asyncio.get_running_loop()
+            result, events = await loop.run_in_executor(
+                self._get_thread_pool(),
+                lambda: _invoke_collecting(service, method, args, kwargs)
+            )
+            metrics.replay(events)
+            self.counters['completed'] += 1
+            return result
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self._pending['light'] -= 1
+
+    # ----- reporting -----
+    def worker_stats(self) -> Dict:
+        return {str(pid): snapshot for pid, snapshot in self._worker_stats.values()}
+
+    def stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'process_workers': self.process_workers,
+            'thread_workers': self.thread_workers,
+            'max_queue': self.max_queue,
+            'task_timeout_seconds': self.task_timeout,
+            'max_tasks_per_child': self.max_tasks_per_child,
+            'prewarm': self.prewarm,
+            'pending': dict(self._pending),
+            'idle_workers': len(self._idle),
+            **self.counters
+        }
+
+
+executor = TaskExecutor.from_env()
@@ -0,0 +1,161 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple
+
+import numpy as np
+import sympy as sp
+
+from services.expression_parser import Node, canonical_expression, compile_numpy, to_sympy
+from services.metrics import record_cache, span
+
+
+def fuse(exprs: List[sp.Expr], symbol: sp.Symbol) -> Callable[[np.ndarray], Tuple[np.ndarray, ...]]:
+    """
+    One NumPy kernel evaluating several expressions together: lambdify
+    runs sp.cse over all of them, so a subexpression they share is
+    computed once per call. Each result has the shape of x.
+    """
+    kernel = sp.lambdify(symbol, exprs, 'numpy', cse=True)
+
+    def evaluate(x):
+        x = np.asarray(x, dtype=float)
+        return tuple(np.broadcast_to(np.asarray(value, dtype=float), x.shape) for value in kernel(x))
+    return evaluate
+
+
+class CompiledExpression:
+    """
+    Parsed expression tree plus its NumPy evaluator, compiled with it.
+    The SymPy form, derivative and fused kernels are built on first use,
+    so plotting and quadrature of f never touch SymPy.
+    """
+    __slots__ = ('tree', 'symbol', 'func', '_expr', '_derivative', '_with_slope')
+
+    def __init__(self, tree: Node, symbol: sp.Symbol):
+        self.tree = tree
+        self.symbol = symbol
+        self.func = compile_numpy(tree)
+        self._expr = None
+        self._derivative = None
+        self._with_slope = None
+
+    @property
+    def expr(self) -> sp.Expr:
+        if self._expr is None:
+            with span('expression.to_sympy'):
+                self._expr = to_sympy(self.tree, self.symbol)
+        return self._expr
+
+    @property
+    def derivative(self) -> sp.Expr:
+        if self._derivative is None:
+            with span('expression.differentiate'):
+                self._derivative = sp.diff(self.expr, self.symbol)
+        return self._derivative
+
+    @property
+    def with_slope(self) -> Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Fused evaluator of (f(x), f'(x)) for arc length and surface area
+        integrands; the chain rule makes f' repeat most of f's subterms.
+        """
+        if self._with_slope is None:
+            with span('expression.fuse'):
+                self._with_slope = fuse([self.expr, self.derivative], self.symbol)
+        return self._with_slope
+
+
+class ExpressionCache:
+    """
+    Process-wide LRU cache: structural hash of the canonical expression ->
+    CompiledExpression, so every spelling of an expression shares one entry.
+    Bounded by number of entries and by an estimated memory footprint.
+    """
+
+    # Rough per-node cost of the parse tree with its compiled closure and
+    # SymPy form. Only used for sizing.
+    NODE_BYTES = 512
+    CALLABLE_BYTES = 512
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _estimate_size(self, key: Hashable, compiled: CompiledExpression) -> int:
+        return sys.getsizeof(key) + compiled.tree.size() * self.NODE_BYTES + self.CALLABLE_BYTES
+
+    def compile(self, func_str: str, symbol: sp.Symbol) -> CompiledExpression:
+        """
+        Compiled form of func_str, looked up by its canonical form and
+        compiled (outside the lock) on a miss. Raises ValueError for text
+        outside the expression grammar.
+        """
+        canonical = canonical_expression(func_str)
+        key = canonical.key
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        record_cache('expression', compiled is not None)
+        if compiled is not None:
+            return compiled
+
+        with span('expression.parse'):
+            compiled = CompiledExpression(canonical.tree, symbol)
+        size = self._estimate_size(key, compiled)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Another thread compiled the same expression meanwhile
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = compiled
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._total_bytes > self.max_bytes):
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'estimated_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+# Shared by every service in this process
+expression_cache = ExpressionCache(
+    max_entries=int(os.environ.get('EXPRESSION_CACHE_MAX_ENTRIES', 512)),
+    max_bytes=int(os.environ.get('EXPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+)
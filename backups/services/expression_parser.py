@@ -0,0 +1,451 @@
+import functools
+import hashlib
+import re
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Grammar of function expressions in x:
+#   expr    := expr ('+' | '-') expr | expr ('*' | '/') expr | expr ('**' | '^') expr
+#            | ('-' | '+' | '√') expr | atom
+#   atom    := number | 'x' | constant | name '(' expr [',' expr] ')' | '(' expr ')'
+# with the usual precedence, ** right-associative and binding tighter
+# than unary minus (-x**2 is -(x**2)), as in Python and SymPy.
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NESTING = 64
+# Tree depth, checked after parsing: chains like x+x+...+x deepen the tree
+# without nesting, and the passes over the tree are recursive
+MAX_DEPTH = 200
+# Exact integer powers above this are not expanded for SymPy (9**9**9)
+MAX_EXACT_EXPONENT = 10000
+
+CONSTANTS = {
+    'pi': np.pi,
+    'π': np.pi,
+    'e': np.e,
+    'E': np.e
+}
+# name -> (NumPy evaluator, arity)
+FUNCTIONS = {
+    'sin': (np.sin, 1),
+    'cos': (np.cos, 1),
+    'tan': (np.tan, 1),
+    'asin': (np.arcsin, 1),
+    'acos': (np.arccos, 1),
+    'atan': (np.arctan, 1),
+    'sinh': (np.sinh, 1),
+    'cosh': (np.cosh, 1),
+    'tanh': (np.tanh, 1),
+    'exp': (np.exp, 1),
+    'log': (np.log, 2),
+    'ln': (np.log, 1),
+    'log10': (np.log10, 1),
+    'sqrt': (np.sqrt, 1),
+    'abs': (np.abs, 1)
+}
+BINARY_UFUNCS = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '**': np.power
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*|π)
+      | (?P<op>\*\*|[-+*/^(),√])
+    )""", re.VERBOSE)
+
+# Left binding powers of infix operators
+_INFIX = {'+': 10, '-': 10, '*': 20, '/': 20, '**': 40, '^': 40}
+_PREFIX = 30
+# √ takes a power as its operand, √x**2 is √(x**2)
+_ROOT = 39
+
+
+class Node(NamedTuple):
+    """
+    Expression tree node. op is 'num' (value: literal text), 'x',
+    'const' (value: name), 'neg', a binary operator or a function name;
+    in canonical trees + and * take two or more operands.
+    Nodes are hashable and compare structurally.
+    """
+    op: str
+    args: Tuple['Node', ...] = ()
+    value: Optional[str] = None
+
+    def size(self) -> int:
+        return 1 + sum(arg.size() for arg in self.args)
+
+    def has_x(self) -> bool:
+        return self.op == 'x' or any(arg.has_x() for arg in self.args)
+
+
+# ============ PARSING ============
+def _tokenize(text: str) -> Iterator[Tuple[str, str, int]]:
+    position = 0
+    end = len(text.rstrip())
+    while position < end:
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Unexpected character {text[position:].lstrip()[:1]!r} at position {position}")
+        kind = match.lastgroup
+        yield kind, match.group(kind), match.start(kind)
+        position = match.end()
+    yield 'end', '', end
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = list(_tokenize(text))
+        self.index = 0
+        self.depth = 0
+
+    def peek(self) -> Tuple[str, str, int]:
+        return self.tokens[self.index]
+
+    def next(self) -> Tuple[str, str, int]:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str):
+        kind, text, position = self.next()
+        if text != value or kind == 'end':
+            found = 'end of expression' if kind == 'end' else repr(text)
+            raise ValueError(f"Expected {value!r} at position {position}, found {found}")
+
+    def expression(self, right_power: int = 0) -> Node:
+        self.depth += 1
+        if self.depth > MAX_NESTING:
+            raise ValueError("Expression is nested too deeply")
+        left = self.prefix()
+        while True:
+            kind, text, _ = self.peek()
+            power = _INFIX.get(text, 0) if kind == 'op' else 0
+            if power <= right_power:
+                break
+            self.next()
+            op = '**' if text == '^' else text
+            # ** is right-associative
+            right = self.expression(power - 1 if op == '**' else power)
+            left = Node(op, (left, right))
+        self.depth -= 1
+        return left
+
+    def prefix(self) -> Node:
+        kind, text, position = self.next()
+        if kind == 'number':
+            return Node('num', value=text)
+        if kind == 'name':
+            if text == 'x':
+                return Node('x')
+            if text in CONSTANTS:
+                return Node('const', value='pi' if text == 'π' else text.lower())
+            if text in FUNCTIONS:
+                return self.call(text, position)
+            raise ValueError(f"Unknown name {text!r} at position {position}; only x, pi and e are allowed")
+        if text == '(':
+            inner = self.expression()
+            self.expect(')')
+            return inner
+        if text == '-':
+            return Node('neg', (self.expression(_PREFIX),))
+        if text == '+':
+            return self.expression(_PREFIX)
+        if text == '√':
+            return Node('sqrt', (self.expression(_ROOT),))
+        found = 'end of expression' if kind == 'end' else repr(text)
+        raise ValueError(f"Unexpected {found} at position {position}")
+
+    def call(self, name: str, position: int) -> Node:
+        self.expect('(')
+        args = [self.expression()]
+        while self.peek()[1] == ',' and self.peek()[0] == 'op':
+            self.next()
+            args.append(self.expression())
+        self.expect(')')
+        arity = FUNCTIONS[name][1]
+        if not 1 <= len(args) <= arity:
+            expected = 'one argument' if arity == 1 else f'1 to {arity} arguments'
+            raise ValueError(f"{name}() at position {position} takes {expected}")
+        return Node(name, tuple(args))
+
+
+def parse_expression(text: str) -> Node:
+    """
+    Parse a function of x into a Node tree. Raises ValueError naming the
+    offending position for anything outside the grammar; nothing in the
+    text is ever evaluated as Python.
+    """
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    if not text.strip():
+        raise ValueError("Expression is empty")
+    parser = _Parser(text)
+    tree = parser.expression()
+    kind, value, position = parser.peek()
+    if kind != 'end':
+        raise ValueError(f"Unexpected {value!r} at position {position}")
+    if _too_deep(tree):
+        raise ValueError("Expression is nested too deeply")
+    return tree
+
+
+def _too_deep(tree: Node) -> bool:
+    """Whether the tree is deeper than MAX_DEPTH, found without recursion"""
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > MAX_DEPTH:
+            return True
+        stack.extend((arg, depth + 1) for arg in node.args)
+    return False
+
+
+# ============ CANONICAL FORM ============
+# Printing precedence; the printed form parses back to the same tree
+_PRECEDENCE = {'+': 10, '-': 10, '*': 20, '/': 20, 'neg': 30, '**': 40}
+
+
+def _literal(text: str) -> str:
+    """Canonical spelling of a number: 007 -> 7, .50 and 5e-1 -> 0.5"""
+    if text.isdigit():
+        return str(int(text))
+    value = float(text)
+    return repr(value) if np.isfinite(value) else text
+
+
+def _order(node: Node):
+    # Constant operands first: 2*x, not x*2
+    return node.has_x(), node
+
+
+def _power_of(factor: Node) -> Tuple[Node, int]:
+    """factor as base ** integer exponent"""
+    if factor.op == '**' and factor.args[1].op == 'num' and factor.args[1].value.isdigit():
+        return factor.args[0], int(factor.args[1].value)
+    return factor, 1
+
+
+def _merge_powers(factors):
+    """x*x -> x**2, x**2*x -> x**3 (only for factors in x)"""
+    exponents = {}
+    merged = []
+    for factor in factors:
+        base, exponent = _power_of(factor)
+        if not base.has_x():
+            merged.append(factor)
+        elif base in exponents:
+            exponents[base] += exponent
+        else:
+            exponents[base] = exponent
+    for base, exponent in exponents.items():
+        merged.append(base if exponent == 1 else Node('**', (base, Node('num', value=str(exponent)))))
+    return merged
+
+
+def canonicalize(tree: Node) -> Node:
+    """
+    Canonical tree of an expression: a - b becomes a + (-b), + and * are
+    flattened with their operands sorted, repeated factors become integer
+    powers, --a becomes a, ln becomes log and numbers are spelled one way.
+    Each rewrite evaluates identically in floating point, except that
+    sums and products are taken in sorted order. Division, function
+    arguments and integer vs decimal literals are left as written.
+    """
+    op = tree.op
+    if op == 'num':
+        return Node('num', value=_literal(tree.value))
+    if op in ('x', 'const'):
+        return tree
+    if op == '-':
+        left, right = tree.args
+        return canonicalize(Node('+', (left, Node('neg', (right,)))))
+    args = [canonicalize(arg) for arg in tree.args]
+    if op == 'neg' and args[0].op == 'neg':
+        return args[0].args[0]
+    if op in ('+', '*'):
+        operands = []
+        for arg in args:
+            operands.extend(arg.args if arg.op == op else (arg,))
+        if op == '*':
+            operands = _merge_powers(operands)
+        if len(operands) == 1:
+            return operands[0]
+        return Node(op, tuple(sorted(operands, key=_order)))
+    return Node('log' if op == 'ln' else op, tuple(args))
+
+
+def _wrap(node: Node, parenthesize: bool) -> str:
+    text = format_expression(node)
+    return f"({text})" if parenthesize else text
+
+
+def format_expression(tree: Node) -> str:
+    """Infix text of a tree using ** and minimal parentheses (x**2 + 3*x - 1)"""
+    op = tree.op
+    if op in ('num', 'const'):
+        return tree.value
+    if op == 'x':
+        return 'x'
+    precedence = lambda node: _PRECEDENCE.get(node.op, 50)
+    if op == '+':
+        text = _wrap(tree.args[0], precedence(tree.args[0]) < 10)
+        for term in tree.args[1:]:
+            if term.op == 'neg':
+                text += ' - ' + _wrap(term.args[0], precedence(term.args[0]) <= 10)
+            else:
+                text += ' + ' + _wrap(term, precedence(term) <= 10)
+        return text
+    if op == '*':
+        return '*'.join(_wrap(arg, precedence(arg) <= 30) for arg in tree.args)
+    if op == '-':
+        left, right = tree.args
+        return f"{_wrap(left, precedence(left) < 10)} - {_wrap(right, precedence(right) <= 10)}"
+    if op == '/':
+        left, right = tree.args
+        return f"{_wrap(left, precedence(left) < 20)}/{_wrap(right, precedence(right) <= 30)}"
+    if op == '**':
+        base, exponent = tree.args
+        return f"{_wrap(base, precedence(base) <= 40)}**{_wrap(exponent, precedence(exponent) < 40)}"
+    if op == 'neg':
+        return '-' + _wrap(tree.args[0], precedence(tree.args[0]) < 30)
+    return f"{op}({', '.join(format_expression(arg) for arg in tree.args)})"
+
+
+class CanonicalExpression(NamedTuple):
+    """Canonical tree, its text and a structural hash of it for cache keys"""
+    tree: Node
+    text: str
+    key: str
+
+
+@functools.lru_cache(maxsize=2048)
+def canonical_expression(text: str) -> CanonicalExpression:
+    """
+    Parse and canonicalize a function of x. Spellings of the same
+    expression (x^2, x**2, x*x, √x and sqrt(x), ...) get the same result.
+    Raises ValueError like parse_expression.
+    """
+    tree = canonicalize(parse_expression(text))
+    canonical = format_expression(tree)
+    return CanonicalExpression(tree, canonical, hashlib.sha256(canonical.encode()).hexdigest()[:32])
+
+
+# ============ NUMPY ============
+# Constant exponents evaluated without np.power
+_POWERS = {
+    1.0: lambda v: v,
+    2.0: np.square,
+    3.0: lambda v: v * v * v,
+    0.5: np.sqrt,
+    -1.0: np.reciprocal,
+    -2.0: lambda v: np.reciprocal(np.square(v))
+}
+
+
+def _compile(node: Node) -> Tuple[Callable, bool]:
+    """
+    Closure evaluating node on an array, and whether it depends on x.
+    Subtrees without x are evaluated once here and become constants.
+    """
+    op = node.op
+    if op in ('+', '*') and len(node.args) > 2:
+        # Evaluated left to right; constant operands sort first and fold together
+        node = Node(op, (Node(op, node.args[:-1]), node.args[-1]))
+    if op == 'x':
+        return (lambda x: x), True
+    if op in ('num', 'const'):
+        value = np.float64(float(node.value) if op == 'num' else CONSTANTS[node.value])
+        return (lambda x: value), False
+
+    compiled = [_compile(arg) for arg in node.args]
+    parts = [part for part, _ in compiled]
+    if op == 'neg':
+        (a,) = parts
+        evaluate = lambda x: np.negative(a(x))
+    elif op == '**' and not compiled[1][1] and float(parts[1](0.0)) in _POWERS:
+        # np.power with a scalar exponent misses NumPy's fast paths
+        power, a = _POWERS[float(parts[1](0.0))], parts[0]
+        evaluate = lambda x: power(a(x))
+    elif op in BINARY_UFUNCS:
+        ufunc, (a, b) = BINARY_UFUNCS[op], parts
+        evaluate = lambda x: ufunc(a(x), b(x))
+    elif op == 'log' and len(parts) == 2:
+        a, b = parts
+        evaluate = lambda x: np.divide(np.log(a(x)), np.log(b(x)))
+    else:
+        ufunc, (a,) = FUNCTIONS[op][0], parts
+        evaluate = lambda x: ufunc(a(x))
+
+    if any(depends for _, depends in compiled):
+        return evaluate, True
+    with np.errstate(all='ignore'):
+        value = np.float64(evaluate(np.float64(0.0)))
+    return (lambda x: value), False
+
+
+def compile_numpy(tree: Node) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    NumPy evaluator of a parsed expression: a pipeline of ufunc calls,
+    with constant subexpressions computed once here. The result always
+    has the shape of x (a constant function is broadcast).
+    """
+    evaluate, depends = _compile(tree)
+    if depends:
+        def func(x):
+            return evaluate(np.asarray(x, dtype=float))
+    else:
+        def func(x):
+            x = np.asarray(x, dtype=float)
+            return np.full(x.shape, evaluate(x))
+    return func
+
+
+# ============ SYMPY ============
+def to_sympy(tree: Node, symbol):
+    """
+    SymPy form of a parsed expression, built with the same operators
+    sympify would apply (integer literals exact, decimals as Float)
+    """
+    import sympy as sp
+
+    functions = {
+        'sin': sp.sin, 'cos': sp.cos, 'tan': sp.tan,
+        'asin': sp.asin, 'acos': sp.acos, 'atan': sp.atan,
+        'sinh': sp.sinh, 'cosh': sp.cosh, 'tanh': sp.tanh,
+        'exp': sp.exp, 'ln': sp.log, 'sqrt': sp.sqrt, 'abs': sp.Abs,
+        'log': sp.log, 'log10': lambda a: sp.log(a, 10)
+    }
+    constants = {'pi': sp.pi, 'e': sp.E}
+
+    def build(node: Node):
+        op = node.op
+        if op == 'x':
+            return symbol
+        if op == 'num':
+            return sp.Integer(node.value) if node.value.isdigit() else sp.Float(node.value)
+        if op == 'const':
+            return constants[node.value]
+        args = [build(arg) for arg in node.args]
+        if op == 'neg':
+            return -args[0]
+        if op == '+':
+            return sp.Add(*args)
+        if op == '-':
+            return args[0] - args[1]
+        if op == '*':
+            return sp.Mul(*args)
+        if op == '/':
+            return args[0] / args[1]
+        if op == '**':
+            base, exponent = args
+            if base.is_Number and exponent.is_Integer and abs(exponent) > MAX_EXACT_EXPONENT:
+                raise ValueError(f"Exponent {exponent} is too large")
+            return base ** exponent
+        return functions[op](*args)
+
+    return build(tree)
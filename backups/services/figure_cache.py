@@ -0,0 +1,282 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+
+from services.metrics import record_cache
+
+Figure = Union[bytes, str]
+
+# Anything that changes the pixels must change the keys: library versions
+# and the source of the modules that draw and encode figures
+RENDERER_MODULES = (
+    'integral_visualization.py', 'linear_algebra_visualization.py',
+    'visualization_service.py', 'image_encoding.py', 'plot_data.py', 'curve_sampling.py',
+    'revolution_mesh.py'
+)
+RENDERER_PACKAGES = ('matplotlib', 'plotly', 'numpy')
+
+_salt: Optional[bytes] = None
+
+
+def _render_salt() -> bytes:
+    global _salt
+    if _salt is None:
+        digest = hashlib.sha256()
+        for package in RENDERER_PACKAGES:
+            try:
+                digest.update(f"{package}={metadata.version(package)};".encode())
+            except metadata.PackageNotFoundError:
+                digest.update(f"{package}=;".encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for module in RENDERER_MODULES:
+            with open(os.path.join(here, module), 'rb') as f:
+                digest.update(f.read())
+        _salt = digest.digest()
+    return _salt
+
+
+def _feed(digest, value):
+    """Hash a renderer argument in a canonical, type-tagged form"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None:
+        digest.update(b'N')
+    elif isinstance(value, bool):
+        digest.update(b'T' if value else b'F')
+    elif isinstance(value, int):
+        digest.update(f"i{value};".encode())
+    elif isinstance(value, float):
+        digest.update(f"f{value!r};".encode())
+    elif isinstance(value, complex):
+        digest.update(f"c{value!r};".encode())
+    elif isinstance(value, str):
+        encoded = value.encode()
+        digest.update(f"s{len(encoded)}:".encode())
+        digest.update(encoded)
+    elif isinstance(value, np.ndarray):
+        digest.update(f"a{value.dtype.str}{value.shape}:".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"l{len(value)}[".encode())
+        for item in value:
+            _feed(digest, item)
+        digest.update(b']')
+    elif isinstance(value, dict):
+        digest.update(f"d{len(value)}{{".encode())
+        for k in sorted(value):
+            _feed(digest, k)
+            _feed(digest, value[k])
+        digest.update(b'}')
+    else:
+        raise TypeError(f"Cannot build a figure key from {type(value).__name__}")
+
+
+def figure_key(renderer: str, args: tuple, kwargs: Dict) -> str:
+    """
+    Content address of a figure: renderer name plus its arguments as
+    passed. Equal keys always render byte-identical output, so the key
+    doubles as a strong ETag.
+    """
+    digest = hashlib.sha256(_render_salt())
+    _feed(digest, renderer)
+    _feed(digest, list(args))
+    _feed(digest, kwargs)
+    return digest.hexdigest()
+
+
+def etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def if_none_match(header: Optional[str], key: str) -> bool:
+    """True when an If-None-Match header already names this figure"""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag(key) for tag in tags)
+
+
+class FigureCache:
+    """
+    Process-wide cache of rendered figures (encoded images or Plotly
+    HTML/JSON) by figure_key. A memory LRU bounded by bytes sits in
+    front of an optional directory shared by all worker processes,
+    which drops its least recently used files beyond max_disk_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---- memory tier
+    def _remember(self, key: str, figure: Figure):
+        size = len(figure)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = figure
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._total_bytes -= len(old)
+                self.evictions += 1
+
+    # ---- disk tier
+    def _paths(self, key: str):
+        return os.path.join(self.directory, key + '.bin'), os.path.join(self.directory, key + '.txt')
+
+    def _read(self, key: str) -> Optional[Figure]:
+        for path in self._paths(key):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            # mtime is the LRU clock for eviction
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return data.decode() if path.endswith('.txt') else data
+        return None
+
+    def _write(self, key: str, figure: Figure):
+        binary, text = self._paths(key)
+        path = binary if isinstance(figure, bytes) else text
+        data = figure if isinstance(figure, bytes) else figure.encode()
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Rescan the shared directory and delete the oldest files beyond the limit"""
+        files = []
+        for item in os.scandir(self.directory):
+            if not item.name.endswith(('.bin', '.txt')):
+                continue
+            try:
+                stat = item.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        # Trim to 90% so every write near the limit does not rescan
+        target = self.max_disk_bytes * 0.9 if total > self.max_disk_bytes else total
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += removed
+
+    # ---- API
+    def get(self, key: str) -> Optional[Figure]:
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+        if figure is None and self.directory:
+            figure = self._read(key)
+            if figure is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, figure)
+        if figure is None:
+            with self._lock:
+                self.misses += 1
+        record_cache('figure', figure is not None)
+        return figure
+
+    def put(self, key: str, figure: Figure):
+        self._remember(key, figure)
+        if self.directory:
+            self._write(key, figure)
+
+    def cached(self, fn: Callable) -> Callable:
+        """Decorator for renderer methods; the key is Class.method plus the call's arguments"""
+        renderer = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(service, *args, **kwargs):
+            key = figure_key(renderer, args, kwargs)
+            figure = self.get(key)
+            if figure is None:
+                figure = fn(service, *args, **kwargs)
+                self.put(key, figure)
+            return figure
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'disk_directory': self.directory,
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes if self.directory else None,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None
+            }
+
+
+# Shared by every renderer in this process; the directory (if any) by all processes
+figure_cache = FigureCache(
+    max_bytes=int(os.environ.get('FIGURE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    directory=os.environ.get('FIGURE_CACHE_DIR') or None,
+    max_disk_bytes=int(os.environ.get('FIGURE_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+)
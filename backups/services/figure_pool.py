@@ -0,0 +1,108 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+class FigureTemplate:
+    """
+    A pre-built Agg figure for one plot type. Static decorations (axes,
+    grid, labels, reference lines) are created once; the named data
+    artists in `artists` are updated in place by each render, and
+    anything else a render adds is removed again by reset().
+    """
+    __slots__ = ('figure', 'axes', 'artists', '_baseline', '_layout')
+
+    def __init__(self, figure: Figure, axes: Tuple, artists: Dict):
+        self.figure = figure
+        self.axes = axes
+        self.artists = artists
+        # Only the data axes are reset; colorbar axes redraw themselves
+        self._baseline = {id(child) for ax in axes for child in ax.get_children()}
+        # tight_layout() starts from the current spacing, so restore it
+        params = figure.subplotpars
+        self._layout = {k: getattr(params, k) for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')}
+
+    def rescale(self):
+        """Recompute data limits after the persistent artists got new data"""
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+
+    def reset(self):
+        for ax in self.axes:
+            for child in ax.get_children():
+                if id(child) not in self._baseline:
+                    child.remove()
+        self.figure.subplots_adjust(**self._layout)
+
+
+def new_figure(figsize: Tuple[float, float], **kwargs) -> Figure:
+    """Figure bound to its own Agg canvas, never registered with pyplot"""
+    figure = Figure(figsize=figsize, **kwargs)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+class FigurePool:
+    """
+    Idle templates per plot type. A render checks one out exclusively,
+    so concurrent threads never share a figure and need no pyplot lock;
+    templates are built on demand and at most `max_idle` are kept per type.
+    """
+
+    def __init__(self, max_idle: int = 2):
+        self.max_idle = max_idle
+        self._idle: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.built = 0
+        self.reused = 0
+        self.discarded = 0
+
+    @contextmanager
+    def figure(self, kind: str, build: Callable[[], FigureTemplate]) -> Iterator[FigureTemplate]:
+        with self._lock:
+            idle = self._idle.setdefault(kind, [])
+            template = idle.pop() if idle else None
+            if template is None:
+                self.built += 1
+            else:
+                self.reused += 1
+        if template is None:
+            template = build()
+
+        try:
+            yield template
+        except BaseException:
+            # A half-drawn figure is not worth repairing
+            with self._lock:
+                self.discarded += 1
+            raise
+        template.reset()
+        with self._lock:
+            idle = self._idle[kind]
+            if len(idle) < self.max_idle:
+                idle.append(template)
+            else:
+                self.discarded += 1
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'idle': {kind: len(idle) for kind, idle in self._idle.items()},
+                'max_idle': self.max_idle,
+                'built': self.built,
+                'reused': self.reused,
+                'discarded': self.discarded
+            }
+
+
+# Shared by the Matplotlib renderers of this process
+figure_pool = FigurePool(max_idle=int(os.environ.get('FIGURE_POOL_MAX_IDLE', 2)))
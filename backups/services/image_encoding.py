@@ -0,0 +1,33 @@
+import io
+
+from services.metrics import record_size, span
+
+# Raster formats the Matplotlib renderers can produce (WebP goes through Pillow)
+IMAGE_MEDIA_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp'
+}
+DEFAULT_IMAGE_FORMAT = 'png'
+
+
+def check_image_format(image_format: str) -> str:
+    image_format = (image_format or DEFAULT_IMAGE_FORMAT).lower()
+    if image_format not in IMAGE_MEDIA_TYPES:
+        raise ValueError(f"Unsupported image format: {image_format}. Use one of: {', '.join(IMAGE_MEDIA_TYPES)}")
+    return image_format
+
+
+def negotiate_image_format(accept: str = '') -> str:
+    """Pick WebP when the client advertises it, PNG otherwise"""
+    return 'webp' if 'image/webp' in (accept or '') else DEFAULT_IMAGE_FORMAT
+
+
+def encode_figure(fig, image_format: str = DEFAULT_IMAGE_FORMAT, dpi: int = 100) -> bytes:
+    """Raw image bytes of a Matplotlib figure, written straight from its buffer"""
+    image_format = check_image_format(image_format)
+    with span('viz.encode_image'):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, dpi=dpi, bbox_inches='tight')
+        image = buffer.getvalue()
+    record_size(image_format, len(image))
+    return image
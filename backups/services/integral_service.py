@@ -1,8 +1,21 @@
 import sympy as sp
-from scipy import integrate
 import numpy as np
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import re
+from services import quadrature
+from services.quadrature import check_mode
+from services.curve_sampling import sample_function
+from services.expression_cache import CompiledExpression, expression_cache
+from services.integration_cache import IntegrationTimeout, integration_cache
+from services.metrics import span, timed
+
+
+def _arc_element(slope: np.ndarray) -> np.ndarray:
+    """√(1 + f'(x)²) for an array of slopes, computed in one buffer"""
+    element = np.square(slope)
+    element += 1.0
+    return np.sqrt(element, out=element)
+
 
 class IntegralService:
     def __init__(self):
@@ -14,25 +27,20 @@ class IntegralService:
         Parse string function to sympy expression
         Supports: polynomials, trig, exp, log, etc.
         """
+        return self.compile_function(func_str).expr
+    
+    def compile_function(self, func_str: str) -> CompiledExpression:
+        """
+        Parse string function, reusing the shared expression cache
+        Returns the sympy expression together with its numpy callable
+        """
         try:
-            # Clean and normalize input
-            func_str = func_str.strip()
-            
-            # Replace common notation
-            func_str = func_str.replace('^', '**')
-            func_str = func_str.replace('√', 'sqrt')
-            
-            # Parse using sympy
-            expr = sp.sympify(func_str, locals={
-                'x': self.x,
-                'e': sp.E,
-                'pi': sp.pi
-            })
-            
-            return expr
+            # Parsed with the expression grammar (never eval), keyed by canonical form
+            return expression_cache.compile(func_str, self.x)
         except Exception as e:
             raise ValueError(f"Invalid function expression: {str(e)}")
     
+    @timed('integral.calculate_indefinite_integral')
     def calculate_indefinite_integral(self, func_str: str) -> Dict:
         """
         Calculate indefinite integral ∫f(x)dx
@@ -42,7 +50,7 @@ class IntegralService:
             func = self.parse_function(func_str)
             
             # Calculate integral
-            integral_result = sp.integrate(func, self.x)
+            integral_result = integration_cache.antiderivative(func, self.x)
             
             # Format results
             original_latex = sp.latex(func)
@@ -53,7 +61,7 @@ class IntegralService:
             
             return {
                 'success': True,
-                'original_function': str(func),
+                'original_function': func_str,
                 'original_latex': original_latex,
                 'integral_result': str(integral_result),
                 'integral_latex': integral_latex,
@@ -64,53 +72,58 @@ class IntegralService:
         except Exception as e:
             raise ValueError(f"Error calculating integral: {str(e)}")
     
-    def calculate_definite_integral(self, func_str: str, lower: float, upper: float) -> Dict:
+    @timed('integral.calculate_definite_integral')
+    def calculate_definite_integral(self, func_str: str, lower: float, upper: float,
+                                    mode: str = 'symbolic', symbolic_budget: Optional[float] = None) -> Dict:
         """
         Calculate definite integral ∫[a,b]f(x)dx
         Combines symbolic and numerical integration from math_service.py
+        mode: 'symbolic' checks SymPy's result against quadrature,
+              'numeric' skips symbolic integration
+        symbolic_budget: seconds for SymPy if less than INTEGRATION_TIME_BUDGET
         """
+        check_mode(mode)
         try:
             # Parse function
-            func = self.parse_function(func_str)
+            compiled = self.compile_function(func_str)
+            func = compiled.expr
             
             # Try symbolic integration first
             symbolic_result = None
             symbolic_value = None
-            try:
-                symbolic_result = sp.integrate(func, (self.x, lower, upper))
-                symbolic_value = float(symbolic_result.evalf())
-            except:
-                pass
-            
-            # Numerical integration (always compute as backup)
-            func_numeric = sp.lambdify(self.x, func, 'numpy')
-            
-            def integrand_func(x):
+            if mode == 'symbolic':
                 try:
-                    return func_numeric(x)
-                except:
-                    return 0
+                    symbolic_result = integration_cache.definite(func, self.x, lower, upper, budget=symbolic_budget)
+                    with span('integral.evalf'):
+                        symbolic_value = float(symbolic_result.evalf())
+                except Exception:
+                    pass
             
-            numerical_value, error = integrate.quad(integrand_func, lower, upper)
+            # Numerical integration (always compute as backup)
+            numeric = quadrature.integrate(compiled.func, lower, upper)
+            numerical_value, error = numeric['value'], numeric['error']
             
-            # Use symbolic if available and matches numerical
-            if symbolic_value is not None:
-                if abs(symbolic_value - numerical_value) < 0.01 * abs(numerical_value):
+            # Use symbolic if available and matches numerical (or numerical failed)
+            if symbolic_value is not None and np.isfinite(symbolic_value):
+                if not numeric['converged'] or abs(symbolic_value - numerical_value) < 0.01 * abs(numerical_value):
                     final_value = symbolic_value
                 else:
                     final_value = numerical_value
-            else:
+            elif numeric['converged']:
                 final_value = numerical_value
+            else:
+                raise ValueError(quadrature.failure_message(numeric))
             
             # Format results
-            original_latex = sp.latex(func)
-            result_latex = sp.latex(symbolic_result) if symbolic_result else str(round(final_value, 6))
+            with span('integral.latex'):
+                original_latex = sp.latex(func)
+                result_latex = sp.latex(symbolic_result) if symbolic_result else str(round(final_value, 6))
             
             full_expression = f"\\int_{{{lower}}}^{{{upper}}} {original_latex} \\, dx = {result_latex}"
             
             return {
                 'success': True,
-                'original_function': str(func),
+                'original_function': func_str,
                 'original_latex': original_latex,
                 'definite_result': str(symbolic_result) if symbolic_result else str(final_value),
                 'result_latex': result_latex,
@@ -118,12 +131,114 @@ class IntegralService:
                 'symbolic_result': str(symbolic_result) if symbolic_result else None,
                 'error_estimate': error if error else None,
                 'full_expression_latex': full_expression,
-                'bounds': {'lower': lower, 'upper': upper}
+                'bounds': {'lower': lower, 'upper': upper},
+                'mode': mode
             }
             
         except Exception as e:
             raise ValueError(f"Error calculating definite integral: {str(e)}")
     
+    @timed('integral.calculate_definite_integral_batch')
+    def calculate_definite_integral_batch(self, functions: List[str], bounds: List[Tuple[float, float]]) -> Dict:
+        """
+        Calculate ∫[a,b]f(x)dx for every function × bound pair
+        Each distinct function is compiled and integrated symbolically once,
+        then F(b) - F(a) is evaluated for all bounds in one vectorized pass.
+        Results are checked against the vectorized quadrature engine, which
+        integrates all bounds of a function together, using the same rule
+        as calculate_definite_integral.
+        """
+        try:
+            lowers = np.array([b[0] for b in bounds], dtype=float)
+            uppers = np.array([b[1] for b in bounds], dtype=float)
+            
+            per_function = {}
+            for func_str in dict.fromkeys(functions):
+                per_function[func_str] = self._integrate_over_bounds(func_str, lowers, uppers)
+            
+            results = []
+            for func_index, func_str in enumerate(functions):
+                for bound_index, item in enumerate(per_function[func_str]):
+                    results.append({
+                        'function_index': func_index,
+                        'bounds_index': bound_index,
+                        **item
+                    })
+            
+            return {
+                'success': True,
+                'count': len(results),
+                'distinct_functions': len(per_function),
+                'results': results
+            }
+            
+        except Exception as e:
+            raise ValueError(f"Error calculating definite integral batch: {str(e)}")
+    
+    def _integrate_over_bounds(self, func_str: str, lowers: np.ndarray, uppers: np.ndarray) -> List[Dict]:
+        """Batch worker for a single function, returns one dict per bound pair"""
+        try:
+            compiled = self.compile_function(func_str)
+        except ValueError as e:
+            return [{
+                'success': False,
+                'function': func_str,
+                'bounds': {'lower': float(a), 'upper': float(b)},
+                'error': str(e)
+            } for a, b in zip(lowers, uppers)]
+        
+        numeric = quadrature.integrate_intervals(compiled.func, lowers, uppers)
+        
+        with np.errstate(all='ignore'):
+            # Antiderivative once, evaluated at all bounds
+            symbolic = None
+            try:
+                antiderivative = integration_cache.antiderivative(compiled.expr, self.x)
+                if not antiderivative.has(sp.Integral):
+                    F = sp.lambdify(self.x, antiderivative, 'numpy')
+                    symbolic = np.asarray(F(uppers) - F(lowers))
+                    if np.iscomplexobj(symbolic):
+                        symbolic = np.where(np.abs(symbolic.imag) < 1e-12, symbolic.real, np.nan)
+                    symbolic = np.broadcast_to(symbolic.astype(float), lowers.shape)
+            except (IntegrationTimeout, TypeError, ValueError):
+                symbolic = None
+        
+        items = []
+        for i, (a, b) in enumerate(zip(lowers, uppers)):
+            reference, error = float(numeric.value[i]), float(numeric.error[i])
+            converged = bool(numeric.converged[i])
+            
+            if not converged:
+                # F(b) - F(a) means nothing across a pole (1/x**2 on [-1, 1])
+                items.append({
+                    'success': False,
+                    'function': func_str,
+                    'bounds': {'lower': float(a), 'upper': float(b)},
+                    'error': quadrature.failure_message({
+                        'value': reference,
+                        'error': error,
+                        'singular_points': [p for p in numeric.singular_points
+                                            if min(a, b) <= p <= max(a, b)]
+                    })
+                })
+                continue
+            
+            # Same rule as calculate_definite_integral: symbolic only if it agrees
+            value, method = reference, 'quadrature'
+            if symbolic is not None and np.isfinite(symbolic[i]):
+                if abs(symbolic[i] - reference) <= 0.01 * abs(reference) + 1e-12:
+                    value, method = float(symbolic[i]), 'antiderivative'
+            
+            items.append({
+                'success': True,
+                'function': func_str,
+                'bounds': {'lower': float(a), 'upper': float(b)},
+                'numerical_value': round(value, 6),
+                'method': method,
+                'error_estimate': error if error else None
+            })
+        return items
+    
     def calculate_area_under_curve(self, func_str: str, lower: float, upper: float) -> Dict:
         """
         Calculate area under curve (absolute value of integral)
@@ -167,33 +282,90 @@ class IntegralService:
         except Exception as e:
             raise ValueError(f"Error calculating average value: {str(e)}")
     
+    @timed('integral.riemann_sums')
+    def riemann_sums(self, func_str: str, lower: float, upper: float, n: int) -> Dict:
+        """
+        Left, right, midpoint, trapezoid and Simpson estimates with n
+        subintervals, plus the same estimates for n, n/2, n/4, ... 1 to
+        show convergence. Every node of every grid is evaluated in one call.
+        """
+        try:
+            counts = sorted({max(1, round(n / 2**k)) for k in range(int(np.ceil(np.log2(n))) + 1)})
+            edges = [np.linspace(lower, upper, m + 1) for m in counts]
+            mids = [(e[:-1] + e[1:]) / 2 for e in edges]
+            
+            with np.errstate(all='ignore'):
+                points = np.concatenate(edges + mids)
+                values = self.evaluate_function(func_str, points)
+                values = np.broadcast_to(np.asarray(values, dtype=float), points.shape)
+                
+                # Per-grid sums over left nodes, right nodes and midpoints;
+                # gathering them separately keeps an endpoint singularity
+                # out of the sums that do not touch it
+                m = np.array(counts)
+                edge_starts = np.concatenate(([0], np.cumsum(m + 1)[:-1]))
+                offsets = np.concatenate(([0], np.cumsum(m)[:-1]))
+                left_nodes = np.repeat(edge_starts - offsets, m) + np.arange(m.sum())
+                left_sums = np.add.reduceat(values[left_nodes], offsets)
+                right_sums = np.add.reduceat(values[left_nodes + 1], offsets)
+                mid_sums = np.add.reduceat(values[(m + 1).sum():], offsets)
+                dx = (upper - lower) / m
+                
+                estimates = {
+                    'left': left_sums * dx,
+                    'right': right_sums * dx,
+                    'midpoint': mid_sums * dx,
+                    'trapezoid': (left_sums + right_sums) / 2 * dx
+                }
+                # Composite Simpson on the grid refined by the midpoints
+                estimates['simpson'] = (estimates['trapezoid'] + 2 * estimates['midpoint']) / 3
+            
+            def finite(values):
+                # Singular integrands give inf/nan, which JSON cannot carry
+                return [float(v) if np.isfinite(v) else None for v in values]
+            
+            return {
+                'n_rectangles': n,
+                'approximations': {method: finite(values[-1:])[0] for method, values in estimates.items()},
+                'convergence': {
+                    'n': counts,
+                    **{method: finite(values) for method, values in estimates.items()}
+                }
+            }
+            
+        except Exception as e:
+            raise ValueError(f"Error calculating Riemann sums: {str(e)}")
+    
+    @timed('integral.calculate_arc_length')
     def calculate_arc_length(self, func_str: str, lower: float, upper: float) -> Dict:
         """
         Calculate arc length of curve y=f(x) from x=a to x=b
         Arc length = ∫[a,b]√(1 + (f'(x))²)dx
         """
         try:
-            # Parse function
-            func = self.parse_function(func_str)
-            
-            # Calculate derivative
-            derivative = sp.diff(func, self.x)
+            # Parse function and its derivative (cached with the expression)
+            compiled = self.compile_function(func_str)
+            func, derivative = compiled.expr, compiled.derivative
             
             # Arc length integrand: sqrt(1 + (f'(x))^2)
             integrand = sp.sqrt(1 + derivative**2)
             
             # Try symbolic integration
             try:
-                symbolic_length = sp.integrate(integrand, (self.x, lower, upper))
+                symbolic_length = integration_cache.definite(integrand, self.x, lower, upper)
                 arc_length = float(symbolic_length.evalf())
-            except:
-                # Numerical integration
-                integrand_func = sp.lambdify(self.x, integrand, 'numpy')
-                arc_length, error = integrate.quad(integrand_func, lower, upper)
+            except Exception:
+                # Numerical integration of the fused f, f' kernel
+                with_slope = compiled.with_slope
+                integrand_func = lambda t: _arc_element(with_slope(t)[1])
+                numeric = quadrature.integrate(integrand_func, lower, upper)
+                if not numeric['converged']:
+                    raise ValueError(quadrature.failure_message(numeric))
+                arc_length = numeric['value']
             
             return {
                 'success': True,
-                'function': str(func),
+                'function': func_str,
                 'derivative': str(derivative),
                 'arc_length': round(arc_length, 6),
                 'bounds': {'lower': lower, 'upper': upper},
@@ -203,6 +375,7 @@ class IntegralService:
         except Exception as e:
             raise ValueError(f"Error calculating arc length: {str(e)}")
     
+    @timed('integral.calculate_surface_area_revolution')
     def calculate_surface_area_revolution(self, func_str: str, lower: float, upper: float, axis: str = 'x-axis') -> Dict:
         """
         Calculate surface area of solid of revolution
@@ -210,30 +383,35 @@ class IntegralService:
         Surface Area = 2π ∫[a,b] x√(1 + (f'(x))²)dx  (y-axis)
         """
         try:
-            func = self.parse_function(func_str)
-            derivative = sp.diff(func, self.x)
+            compiled = self.compile_function(func_str)
+            func, with_slope = compiled.expr, compiled.with_slope
             
             if axis == 'x-axis':
                 # SA = 2π ∫ f(x)√(1 + (f'(x))²)dx
-                integrand = 2 * sp.pi * func * sp.sqrt(1 + derivative**2)
+                def integrand_func(t):
+                    value, slope = with_slope(t)
+                    area = _arc_element(slope)
+                    area *= value
+                    area *= 2 * np.pi
+                    return area
             else:  # y-axis
                 # SA = 2π ∫ x√(1 + (f'(x))²)dx
-                integrand = 2 * sp.pi * self.x * sp.sqrt(1 + derivative**2)
+                def integrand_func(t):
+                    _, slope = with_slope(t)
+                    area = _arc_element(slope)
+                    area *= t
+                    area *= 2 * np.pi
+                    return area
             
             # Numerical integration
-            integrand_func = sp.lambdify(self.x, integrand, 'numpy')
-            
-            def safe_integrand(x):
-                try:
-                    return integrand_func(x)
-                except:
-                    return 0
-            
-            surface_area, error = integrate.quad(safe_integrand, lower, upper)
+            numeric = quadrature.integrate(integrand_func, lower, upper)
+            if not numeric['converged']:
+                raise ValueError(quadrature.failure_message(numeric))
+            surface_area, error = numeric['value'], numeric['error']
             
             return {
                 'success': True,
-                'function': str(func),
+                'function': func_str,
                 'axis': axis,
                 'surface_area': round(surface_area, 6),
                 'bounds': {'lower': lower, 'upper': upper},
@@ -243,6 +421,7 @@ class IntegralService:
         except Exception as e:
             raise ValueError(f"Error calculating surface area: {str(e)}")
     
+    @timed('integral.get_integration_steps')
     def get_integration_steps(self, func_str: str) -> Dict:
         """
         Get step-by-step integration explanation
@@ -309,7 +488,7 @@ class IntegralService:
                 step_count += 1
             
             # Calculate final result
-            integral_result = sp.integrate(func, self.x)
+            integral_result = integration_cache.antiderivative(func, self.x)
             
             steps.append({
                 'step': step_count,
@@ -321,7 +500,7 @@ class IntegralService:
             
             return {
                 'success': True,
-                'function': str(func),
+                'function': func_str,
                 'function_latex': sp.latex(func),
                 'steps': steps,
                 'total_steps': len(steps),
@@ -332,6 +511,7 @@ class IntegralService:
         except Exception as e:
             raise ValueError(f"Error generating steps: {str(e)}")
     
+    @timed('integral.validate_function')
     def validate_function(self, func_str: str) -> Dict:
         """
         Validate if the function is integrable
@@ -341,10 +521,13 @@ class IntegralService:
             
             # Try to integrate
             try:
-                integral = sp.integrate(func, self.x)
+                integration_cache.antiderivative(func, self.x)
                 is_integrable = True
                 message = "Function is integrable"
-            except:
+            except IntegrationTimeout:
+                is_integrable = False
+                message = "Symbolic integration timed out for this function"
+            except Exception:
                 is_integrable = False
                 message = "Function cannot be integrated symbolically"
             
@@ -364,24 +547,34 @@ class IntegralService:
                 'parsed_function': None
             }
     
+    @timed('integral.evaluate_function')
     def evaluate_function(self, func_str: str, x_vals: np.ndarray) -> np.ndarray:
         """
         Evaluate function at given x values (for plotting)
         """
         try:
-            func = self.parse_function(func_str)
-            func_numeric = sp.lambdify(self.x, func, 'numpy')
-            return func_numeric(x_vals)
+            return self.compile_function(func_str).func(x_vals)
+        except Exception as e:
+            raise ValueError(f"Error evaluating function: {str(e)}")
+    
+    @timed('integral.sample_function')
+    def sample_function(self, func_str: str, lower: float, upper: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Adaptively sampled (x, y) for plotting, gaps as NaN
+        """
+        try:
+            return sample_function(self.compile_function(func_str).func, lower, upper)
         except Exception as e:
             raise ValueError(f"Error evaluating function: {str(e)}")
     
+    @timed('integral.get_antiderivative_at_point')
     def get_antiderivative_at_point(self, func_str: str, point: float) -> Dict:
         """
         Evaluate antiderivative at specific point (useful for C constant determination)
         """
         try:
             func = self.parse_function(func_str)
-            antiderivative = sp.integrate(func, self.x)
+            antiderivative = integration_cache.antiderivative(func, self.x)
             
             # Evaluate at point
             antideriv_func = sp.lambdify(self.x, antiderivative, 'numpy')
@@ -1,180 +1,287 @@
 import numpy as np
+from typing import Dict, Optional
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
 from mpl_toolkits.mplot3d import Axes3D
 import plotly.graph_objects as go
-import io
-import base64
+from services.figure_cache import figure_cache
+from services.figure_pool import FigureTemplate, figure_pool, new_figure
+from services.image_encoding import DEFAULT_IMAGE_FORMAT, encode_figure
+from services.metrics import record_size, span, timed
+from services.plot_data import compact_figure
+from services.revolution_mesh import DEFAULT_LOD, revolve
+from scipy.integrate import cumulative_trapezoid
 from services.integral_service import IntegralService
+from services.integration_cache import IntegrationFailed, IntegrationTimeout, integration_cache
+
+# Beyond this many subintervals the outlines would cover the fill
+MAX_OUTLINED_RECTANGLES = 200
+
+
+def rule_collection(x0: np.ndarray, x1: np.ndarray, y0: np.ndarray, y1: np.ndarray,
+                    linewidth: float = 1.0, on_axis: bool = True) -> PolyCollection:
+    """
+    Every panel of a quadrature rule as one artist: the quadrilaterals
+    (x0, 0), (x1, 0), (x1, y1), (x0, y0). Panels with a non-finite
+    height are skipped. Past MAX_OUTLINED_RECTANGLES the unoutlined
+    panels are merged into a single polygon along their tops.
+    on_axis pins autoscaling to y=0 like ax.bar.
+    """
+    finite = np.isfinite(y0) & np.isfinite(y1)
+    if len(x0) > MAX_OUTLINED_RECTANGLES:
+        tops = np.empty((len(x0), 2, 2))
+        tops[:, 0, 0], tops[:, 1, 0] = x0, x1
+        tops[:, 0, 1], tops[:, 1, 1] = np.where(finite, y0, 0), np.where(finite, y1, 0)
+        outline = np.concatenate([[[x0[0], 0]], tops.reshape(-1, 2), [[x1[-1], 0]]])
+        collection = PolyCollection([outline], facecolors='yellow', edgecolors='none', alpha=0.3)
+    else:
+        x0, x1, y0, y1 = x0[finite], x1[finite], y0[finite], y1[finite]
+        verts = np.zeros((len(x0), 4, 2))
+        verts[:, [0, 3], 0] = x0[:, None]
+        verts[:, [1, 2], 0] = x1[:, None]
+        verts[:, 2, 1] = y1
+        verts[:, 3, 1] = y0
+        collection = PolyCollection(verts, facecolors='yellow', edgecolors='red', alpha=0.3,
+                                    linewidths=linewidth)
+    if on_axis:
+        collection.sticky_edges.y.append(0)
+    return collection
+
+
+# ============ FIGURE TEMPLATES ============
+# Static parts of each plot, built once per pooled figure. Named artists
+# are given new data per render; everything else a render adds is transient.
+def _function_template() -> FigureTemplate:
+    fig = new_figure((10, 6))
+    ax = fig.add_subplot()
+    curve, = ax.plot([], [], 'b-', linewidth=2)
+    lower = ax.axvline(x=0, color='red', linestyle='--', linewidth=1.5)
+    upper = ax.axvline(x=0, color='red', linestyle='--', linewidth=1.5)
+    ax.axhline(y=0, color='k', linewidth=0.5)
+    ax.axvline(x=0, color='k', linewidth=0.5)
+    ax.grid(True, alpha=0.3)
+    ax.set_xlabel('x', fontsize=12)
+    ax.set_ylabel('f(x)', fontsize=12)
+    return FigureTemplate(fig, (ax,), {'curve': curve, 'lower': lower, 'upper': upper})
+
+
+def _area_template() -> FigureTemplate:
+    fig = new_figure((12, 7))
+    ax = fig.add_subplot()
+    curve, = ax.plot([], [], 'b-', linewidth=2.5)
+    lower_edge, = ax.plot([], [], 'r--', linewidth=2)
+    upper_edge, = ax.plot([], [], 'r--', linewidth=2)
+    lower_point, = ax.plot([], [], 'ro', markersize=8)
+    upper_point, = ax.plot([], [], 'ro', markersize=8)
+    ax.axhline(y=0, color='k', linewidth=0.8)
+    ax.axvline(x=0, color='k', linewidth=0.8)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.set_xlabel('x', fontsize=14, fontweight='bold')
+    ax.set_ylabel('f(x)', fontsize=14, fontweight='bold')
+    return FigureTemplate(fig, (ax,), {
+        'curve': curve, 'lower_edge': lower_edge, 'upper_edge': upper_edge,
+        'lower_point': lower_point, 'upper_point': upper_point
+    })
+
+
+def _riemann_template() -> FigureTemplate:
+    fig = new_figure((12, 7))
+    ax = fig.add_subplot()
+    curve, = ax.plot([], [], 'b-', linewidth=2)
+    ax.axhline(y=0, color='k', linewidth=0.5)
+    ax.axvline(x=0, color='k', linewidth=0.5)
+    ax.grid(True, alpha=0.3)
+    ax.set_xlabel('x', fontsize=12)
+    ax.set_ylabel('f(x)', fontsize=12)
+    return FigureTemplate(fig, (ax,), {'curve': curve})
+
+
+def _antiderivative_template() -> FigureTemplate:
+    fig = new_figure((12, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+    curve, = ax1.plot([], [], 'b-', linewidth=2)
+    ax1.axhline(y=0, color='k', linewidth=0.5)
+    ax1.axvline(x=0, color='k', linewidth=0.5)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_ylabel('f(x)', fontsize=12)
+    ax1.set_title('Original Function', fontsize=14, fontweight='bold')
+
+    antiderivative, = ax2.plot([], [], 'r-', linewidth=2)
+    ax2.axhline(y=0, color='k', linewidth=0.5)
+    ax2.axvline(x=0, color='k', linewidth=0.5)
+    lower = ax2.axvline(x=0, color='g', linestyle='--', alpha=0.5)
+    upper = ax2.axvline(x=0, color='g', linestyle='--', alpha=0.5)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlabel('x', fontsize=12)
+    ax2.set_ylabel('F(x)', fontsize=12)
+    ax2.set_title('Antiderivative (Indefinite Integral)', fontsize=14, fontweight='bold')
+    return FigureTemplate(fig, (ax1, ax2), {
+        'curve': curve, 'antiderivative': antiderivative, 'lower': lower, 'upper': upper
+    })
+
+
+def _comparison_template() -> FigureTemplate:
+    fig = new_figure((16, 12))
+    axes = tuple(fig.subplots(2, 2).flatten())
+    curves = []
+    for ax in axes:
+        curve, = ax.plot([], [], 'b-', linewidth=2)
+        curves.append(curve)
+        ax.axhline(y=0, color='k', linewidth=0.5)
+        ax.grid(True, alpha=0.3)
+    return FigureTemplate(fig, axes, {'curves': curves})
+
 
 class IntegralVisualization:
-    def __init__(self):
-        self.integral_service = IntegralService()
+    def __init__(self, integral_service: Optional[IntegralService] = None):
+        # Share the caller's (singleton) service instead of building another
+        self.integral_service = integral_service or IntegralService()
     
-    def visualize_function(self, func_str: str, lower: float, upper: float) -> str:
+    @timed('viz.visualize_function')
+    @figure_cache.cached
+    def visualize_function(self, func_str: str, lower: float, upper: float,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """
         Visualize function for integration
         """
         try:
             # Generate x values
-            x = np.linspace(lower - 1, upper + 1, 500)
-            y = self.integral_service.evaluate_function(func_str, x)
-            
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Plot function
-            ax.plot(x, y, 'b-', linewidth=2, label=f'f(x) = {func_str}')
-            
-            # Highlight integration region
-            x_fill = np.linspace(lower, upper, 500)
-            y_fill = self.integral_service.evaluate_function(func_str, x_fill)
-            ax.fill_between(x_fill, 0, y_fill, alpha=0.3, color='blue', label='Integration region')
+            x, y = self.integral_service.sample_function(func_str, lower - 1, upper + 1)
+            x_fill, y_fill = self.integral_service.sample_function(func_str, lower, upper)
             
-            # Mark bounds
-            ax.axvline(x=lower, color='red', linestyle='--', linewidth=1.5, label=f'x = {lower}')
-            ax.axvline(x=upper, color='red', linestyle='--', linewidth=1.5, label=f'x = {upper}')
-            
-            # Axes
-            ax.axhline(y=0, color='k', linewidth=0.5)
-            ax.axvline(x=0, color='k', linewidth=0.5)
-            ax.grid(True, alpha=0.3)
-            
-            ax.set_xlabel('x', fontsize=12)
-            ax.set_ylabel('f(x)', fontsize=12)
-            ax.set_title(f'Function: f(x) = {func_str}', fontsize=14, fontweight='bold')
-            ax.legend()
-            
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('function', _function_template) as template:
+                ax, = template.axes
+                curve, lower_line, upper_line = (template.artists[k] for k in ('curve', 'lower', 'upper'))
+                
+                # Plot function
+                curve.set_data(x, np.broadcast_to(y, x.shape))
+                curve.set_label(f'f(x) = {func_str}')
+                
+                # Mark bounds
+                lower_line.set_xdata([lower, lower])
+                lower_line.set_label(f'x = {lower}')
+                upper_line.set_xdata([upper, upper])
+                upper_line.set_label(f'x = {upper}')
+                template.rescale()
+                
+                # Highlight integration region
+                region = ax.fill_between(x_fill, 0, y_fill, alpha=0.3, color='blue', label='Integration region')
+                
+                ax.set_title(f'Function: f(x) = {func_str}', fontsize=14, fontweight='bold')
+                ax.legend(handles=[curve, region, lower_line, upper_line])
+                
+                return encode_figure(template.figure, image_format, dpi=100)
             
         except Exception as e:
             raise ValueError(f"Error visualizing function: {str(e)}")
     
-    def visualize_area_under_curve(self, func_str: str, lower: float, upper: float, integral_value: float) -> str:
+    @timed('viz.visualize_area_under_curve')
+    @figure_cache.cached
+    def visualize_area_under_curve(self, func_str: str, lower: float, upper: float, integral_value: float,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """
         Visualize area under curve with shading
         """
         try:
             # Generate x values
-            x_range = np.linspace(lower - 1, upper + 1, 500)
-            y_range = self.integral_service.evaluate_function(func_str, x_range)
+            x_range, y_range = self.integral_service.sample_function(func_str, lower - 1, upper + 1)
             
             # Integration region
-            x_fill = np.linspace(lower, upper, 500)
-            y_fill = self.integral_service.evaluate_function(func_str, x_fill)
-            
-            fig, ax = plt.subplots(figsize=(12, 7))
-            
-            # Plot function
-            ax.plot(x_range, y_range, 'b-', linewidth=2.5, label=f'f(x) = {func_str}')
-            
-            # Fill area
-            ax.fill_between(x_fill, 0, y_fill, alpha=0.4, color='skyblue', label=f'Area = {integral_value:.4f}')
+            x_fill, y_fill = self.integral_service.sample_function(func_str, lower, upper)
             
             # Mark bounds
             y_lower = self.integral_service.evaluate_function(func_str, np.array([lower]))[0]
             y_upper = self.integral_service.evaluate_function(func_str, np.array([upper]))[0]
             
-            ax.plot([lower, lower], [0, y_lower], 'r--', linewidth=2)
-            ax.plot([upper, upper], [0, y_upper], 'r--', linewidth=2)
-            ax.plot(lower, y_lower, 'ro', markersize=8, label=f'({lower}, {y_lower:.2f})')
-            ax.plot(upper, y_upper, 'ro', markersize=8, label=f'({upper}, {y_upper:.2f})')
-            
-            # Axes
-            ax.axhline(y=0, color='k', linewidth=0.8)
-            ax.axvline(x=0, color='k', linewidth=0.8)
-            ax.grid(True, alpha=0.3, linestyle='--')
-            
-            ax.set_xlabel('x', fontsize=14, fontweight='bold')
-            ax.set_ylabel('f(x)', fontsize=14, fontweight='bold')
-            ax.set_title(f'Definite Integral: ∫[{lower}, {upper}] f(x)dx = {integral_value:.4f}', 
-                        fontsize=16, fontweight='bold')
-            ax.legend(fontsize=11, loc='best')
-            
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=120, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('area', _area_template) as template:
+                ax, = template.axes
+                artists = template.artists
+                
+                # Plot function
+                artists['curve'].set_data(x_range, np.broadcast_to(y_range, x_range.shape))
+                artists['curve'].set_label(f'f(x) = {func_str}')
+                
+                artists['lower_edge'].set_data([lower, lower], [0, y_lower])
+                artists['upper_edge'].set_data([upper, upper], [0, y_upper])
+                artists['lower_point'].set_data([lower], [y_lower])
+                artists['lower_point'].set_label(f'({lower}, {y_lower:.2f})')
+                artists['upper_point'].set_data([upper], [y_upper])
+                artists['upper_point'].set_label(f'({upper}, {y_upper:.2f})')
+                template.rescale()
+                
+                # Fill area
+                area = ax.fill_between(x_fill, 0, y_fill, alpha=0.4, color='skyblue',
+                                       label=f'Area = {integral_value:.4f}')
+                
+                ax.set_title(f'Definite Integral: ∫[{lower}, {upper}] f(x)dx = {integral_value:.4f}', 
+                            fontsize=16, fontweight='bold')
+                ax.legend(handles=[artists['curve'], area, artists['lower_point'], artists['upper_point']],
+                          fontsize=11, loc='best')
+                
+                return encode_figure(template.figure, image_format, dpi=120)
             
         except Exception as e:
             raise ValueError(f"Error visualizing area: {str(e)}")
     
-    def visualize_riemann_sum(self, func_str: str, lower: float, upper: float, n_rectangles: int = 10) -> str:
+    @timed('viz.visualize_riemann_sum')
+    @figure_cache.cached
+    def visualize_riemann_sum(self, func_str: str, lower: float, upper: float, n_rectangles: int = 10,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """
         Visualize Riemann sum approximation
         """
         try:
-            x = np.linspace(lower, upper, 500)
-            y = self.integral_service.evaluate_function(func_str, x)
+            x, y = self.integral_service.sample_function(func_str, lower, upper)
             
             # Calculate rectangle positions
             dx = (upper - lower) / n_rectangles
-            x_rect = np.linspace(lower, upper - dx, n_rectangles)
-            y_rect = self.integral_service.evaluate_function(func_str, x_rect + dx/2)  # Midpoint
-            
-            fig, ax = plt.subplots(figsize=(12, 7))
-            
-            # Plot function
-            ax.plot(x, y, 'b-', linewidth=2, label=f'f(x) = {func_str}')
-            
-            # Draw rectangles
-            for i in range(n_rectangles):
-                ax.bar(x_rect[i] + dx/2, y_rect[i], width=dx, alpha=0.3, 
-                      edgecolor='red', color='yellow', linewidth=1.5)
+            edges = np.linspace(lower, upper, n_rectangles + 1)
+            y_rect = self.integral_service.evaluate_function(func_str, (edges[:-1] + edges[1:]) / 2)  # Midpoint
+            y_rect = np.broadcast_to(y_rect, (n_rectangles,))
             
             # Calculate Riemann sum
             riemann_sum = np.sum(y_rect * dx)
             
-            ax.axhline(y=0, color='k', linewidth=0.5)
-            ax.axvline(x=0, color='k', linewidth=0.5)
-            ax.grid(True, alpha=0.3)
-            
-            ax.set_xlabel('x', fontsize=12)
-            ax.set_ylabel('f(x)', fontsize=12)
-            ax.set_title(f'Riemann Sum Approximation (n={n_rectangles}): ≈ {riemann_sum:.4f}', 
-                        fontsize=14, fontweight='bold')
-            ax.legend()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('riemann', _riemann_template) as template:
+                ax, = template.axes
+                curve = template.artists['curve']
+                
+                # Plot function
+                curve.set_data(x, np.broadcast_to(y, x.shape))
+                curve.set_label(f'f(x) = {func_str}')
+                template.rescale()
+                
+                # Draw rectangles
+                ax.add_collection(rule_collection(edges[:-1], edges[1:], y_rect, y_rect, linewidth=1.5))
+                ax.autoscale_view()
+                
+                ax.set_title(f'Riemann Sum Approximation (n={n_rectangles}): ≈ {riemann_sum:.4f}', 
+                            fontsize=14, fontweight='bold')
+                ax.legend(handles=[curve])
+                
+                return encode_figure(template.figure, image_format, dpi=100)
             
         except Exception as e:
             raise ValueError(f"Error visualizing Riemann sum: {str(e)}")
     
-    def visualize_3d_integral(self, func_str: str, lower: float, upper: float) -> str:
+    @timed('viz.visualize_3d_integral')
+    @figure_cache.cached
+    def visualize_3d_integral(self, func_str: str, lower: float, upper: float,
+            lod: str = DEFAULT_LOD, plot_data: Optional[Dict] = None) -> str:
         """
         3D visualization showing area as volume (plotly)
+        lod: mesh level of detail (preview, standard, high)
+        plot_data: compact_figure() options for data-only JSON instead of HTML
         """
         try:
-            # Generate mesh
-            x = np.linspace(lower, upper, 50)
-            y_vals = self.integral_service.evaluate_function(func_str, x)
-            
             # Create 3D surface by rotating around x-axis
-            theta = np.linspace(0, 2*np.pi, 30)
-            X, Theta = np.meshgrid(x, theta)
-            Y = np.outer(np.cos(theta), y_vals)
-            Z = np.outer(np.sin(theta), y_vals)
+            f = lambda x: self.integral_service.evaluate_function(func_str, x)
+            mesh = revolve(f, lower, upper, 'x-axis', base=(50, 30), lod=lod)
             
             fig = go.Figure(data=[
                 go.Surface(
-                    x=X, y=Y, z=Z,
+                    x=mesh.x, y=mesh.y, z=mesh.z,
                     colorscale='Viridis',
                     showscale=True,
                     opacity=0.9
@@ -193,12 +300,21 @@ class IntegralVisualization:
                 height=700
             )
             
-            return fig.to_html(include_plotlyjs='cdn')
+            if plot_data is not None:
+                return compact_figure(fig, **plot_data)
+            
+            with span('viz.encode_plotly'):
+                html = fig.to_html(include_plotlyjs='cdn')
+            record_size('plotly_html', len(html))
+            return html
             
         except Exception as e:
             raise ValueError(f"Error creating 3D visualization: {str(e)}")
     
-    def visualize_antiderivative(self, func_str: str, lower: float, upper: float) -> str:
+    @timed('viz.visualize_antiderivative')
+    @figure_cache.cached
+    def visualize_antiderivative(self, func_str: str, lower: float, upper: float,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """
         Plot both function and its antiderivative
         """
@@ -207,121 +323,115 @@ class IntegralVisualization:
             
             # Parse and integrate
             func = self.integral_service.parse_function(func_str)
-            antideriv = sp.integrate(func, self.integral_service.x)
+            try:
+                antideriv = integration_cache.antiderivative(func, self.integral_service.x)
+            except (IntegrationTimeout, IntegrationFailed):
+                antideriv = None
             
             # Generate x values
-            x = np.linspace(lower - 1, upper + 1, 500)
-            y_func = self.integral_service.evaluate_function(func_str, x)
+            x, y_func = self.integral_service.sample_function(func_str, lower - 1, upper + 1)
             
             # Evaluate antiderivative
-            antideriv_lambda = sp.lambdify(self.integral_service.x, antideriv, 'numpy')
-            y_antideriv = antideriv_lambda(x)
-            
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-            
-            # Plot original function
-            ax1.plot(x, y_func, 'b-', linewidth=2, label=f'f(x) = {func_str}')
-            ax1.fill_between(x[(x >= lower) & (x <= upper)], 
-                           0, 
-                           y_func[(x >= lower) & (x <= upper)], 
-                           alpha=0.3, color='blue')
-            ax1.axhline(y=0, color='k', linewidth=0.5)
-            ax1.axvline(x=0, color='k', linewidth=0.5)
-            ax1.grid(True, alpha=0.3)
-            ax1.set_ylabel('f(x)', fontsize=12)
-            ax1.set_title('Original Function', fontsize=14, fontweight='bold')
-            ax1.legend()
-            
-            # Plot antiderivative
-            ax2.plot(x, y_antideriv, 'r-', linewidth=2, label=f'F(x) = {str(antideriv)}')
-            ax2.axhline(y=0, color='k', linewidth=0.5)
-            ax2.axvline(x=0, color='k', linewidth=0.5)
-            ax2.axvline(x=lower, color='g', linestyle='--', alpha=0.5)
-            ax2.axvline(x=upper, color='g', linestyle='--', alpha=0.5)
-            ax2.grid(True, alpha=0.3)
-            ax2.set_xlabel('x', fontsize=12)
-            ax2.set_ylabel('F(x)', fontsize=12)
-            ax2.set_title('Antiderivative (Indefinite Integral)', fontsize=14, fontweight='bold')
-            ax2.legend()
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            if antideriv is not None and not antideriv.has(sp.Integral):
+                antideriv_lambda = sp.lambdify(self.integral_service.x, antideriv, 'numpy')
+                y_antideriv = antideriv_lambda(x)
+                antideriv_label = str(antideriv)
+            else:
+                # No closed form (or symbolic budget exceeded): integrate numerically
+                y_antideriv = cumulative_trapezoid(np.broadcast_to(y_func, x.shape), x, initial=0)
+                antideriv_label = 'numerical ∫f(x)dx'
+            
+            with figure_pool.figure('antiderivative', _antiderivative_template) as template:
+                ax1, ax2 = template.axes
+                artists = template.artists
+                y_func = np.broadcast_to(y_func, x.shape)
+                
+                # Plot original function
+                artists['curve'].set_data(x, y_func)
+                artists['curve'].set_label(f'f(x) = {func_str}')
+                
+                # Plot antiderivative
+                artists['antiderivative'].set_data(x, np.broadcast_to(y_antideriv, x.shape))
+                artists['antiderivative'].set_label(f'F(x) = {antideriv_label}')
+                artists['lower'].set_xdata([lower, lower])
+                artists['upper'].set_xdata([upper, upper])
+                template.rescale()
+                
+                ax1.fill_between(x[(x >= lower) & (x <= upper)], 
+                               0, 
+                               y_func[(x >= lower) & (x <= upper)], 
+                               alpha=0.3, color='blue')
+                ax1.legend(handles=[artists['curve']])
+                ax2.legend(handles=[artists['antiderivative']])
+                
+                template.figure.tight_layout()
+                
+                return encode_figure(template.figure, image_format, dpi=100)
             
         except Exception as e:
             raise ValueError(f"Error visualizing antiderivative: {str(e)}")
     
+    @timed('viz.create_comparison_plot')
+    @figure_cache.cached
     def create_comparison_plot(self, func_str: str, lower: float, upper: float, 
-                              methods: list = ['left', 'right', 'midpoint', 'trapezoid']) -> str:
+                              methods: list = ['left', 'right', 'midpoint', 'trapezoid'],
+                              n_rectangles: int = 10,
+                              image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """
         Compare different numerical integration methods
         """
         try:
-            x = np.linspace(lower, upper, 500)
-            y = self.integral_service.evaluate_function(func_str, x)
+            x, y = self.integral_service.sample_function(func_str, lower, upper)
             
-            n = 10  # Number of subdivisions
+            n = n_rectangles  # Number of subdivisions
             dx = (upper - lower) / n
-            
-            fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-            axes = axes.flatten()
-            
-            for idx, method in enumerate(methods[:4]):
-                ax = axes[idx]
-                ax.plot(x, y, 'b-', linewidth=2, label=f'f(x) = {func_str}')
+            x_points = np.linspace(lower, upper, n + 1)
+            
+            with figure_pool.figure('comparison', _comparison_template) as template:
+                curves = template.artists['curves']
+                for idx, (ax, curve) in enumerate(zip(template.axes, curves)):
+                    # Panels beyond the requested methods stay blank
+                    ax.set_visible(idx < len(methods))
+                    curve.set_data(x, np.broadcast_to(y, x.shape))
+                    curve.set_label(f'f(x) = {func_str}')
+                template.rescale()
                 
-                x_points = np.linspace(lower, upper, n + 1)
-                
-                if method == 'left':
-                    y_points = self.integral_service.evaluate_function(func_str, x_points[:-1])
-                    for i in range(n):
-                        ax.bar(x_points[i], y_points[i], width=dx, alpha=0.3, 
-                              align='edge', edgecolor='red', color='yellow')
-                    approx = np.sum(y_points * dx)
-                    
-                elif method == 'right':
-                    y_points = self.integral_service.evaluate_function(func_str, x_points[1:])
-                    for i in range(n):
-                        ax.bar(x_points[i+1], y_points[i], width=-dx, alpha=0.3,
-                              align='edge', edgecolor='red', color='yellow')
-                    approx = np.sum(y_points * dx)
+                for idx, method in enumerate(methods[:4]):
+                    ax = template.axes[idx]
                     
-                elif method == 'midpoint':
-                    x_mid = (x_points[:-1] + x_points[1:]) / 2
-                    y_mid = self.integral_service.evaluate_function(func_str, x_mid)
-                    for i in range(n):
-                        ax.bar(x_mid[i], y_mid[i], width=dx, alpha=0.3,
-                              edgecolor='red', color='yellow')
-                    approx = np.sum(y_mid * dx)
+                    if method == 'left':
+                        y_points = np.broadcast_to(
+                            self.integral_service.evaluate_function(func_str, x_points[:-1]), (n,))
+                        panels = rule_collection(x_points[:-1], x_points[1:], y_points, y_points)
+                        approx = np.sum(y_points * dx)
+                        
+                    elif method == 'right':
+                        y_points = np.broadcast_to(
+                            self.integral_service.evaluate_function(func_str, x_points[1:]), (n,))
+                        panels = rule_collection(x_points[:-1], x_points[1:], y_points, y_points)
+                        approx = np.sum(y_points * dx)
+                        
+                    elif method == 'midpoint':
+                        x_mid = (x_points[:-1] + x_points[1:]) / 2
+                        y_mid = np.broadcast_to(self.integral_service.evaluate_function(func_str, x_mid), (n,))
+                        panels = rule_collection(x_points[:-1], x_points[1:], y_mid, y_mid)
+                        approx = np.sum(y_mid * dx)
+                        
+                    elif method == 'trapezoid':
+                        y_points = np.broadcast_to(
+                            self.integral_service.evaluate_function(func_str, x_points), (n + 1,))
+                        panels = rule_collection(x_points[:-1], x_points[1:], y_points[:-1], y_points[1:],
+                                                 on_axis=False)
+                        approx = np.sum((y_points[:-1] + y_points[1:]) / 2 * dx)
                     
-                elif method == 'trapezoid':
-                    y_points = self.integral_service.evaluate_function(func_str, x_points)
-                    for i in range(n):
-                        ax.fill([x_points[i], x_points[i+1], x_points[i+1], x_points[i]],
-                               [0, 0, y_points[i+1], y_points[i]], 
-                               alpha=0.3, color='yellow', edgecolor='red')
-                    approx = np.sum((y_points[:-1] + y_points[1:]) / 2 * dx)
+                    ax.add_collection(panels)
+                    ax.autoscale_view()
+                    ax.set_title(f'{method.capitalize()} Rule: ≈ {approx:.4f}', fontweight='bold')
+                    ax.legend(handles=[curves[idx]])
                 
-                ax.axhline(y=0, color='k', linewidth=0.5)
-                ax.grid(True, alpha=0.3)
-                ax.set_title(f'{method.capitalize()} Rule: ≈ {approx:.4f}', fontweight='bold')
-                ax.legend()
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+                template.figure.tight_layout()
+                
+                return encode_figure(template.figure, image_format, dpi=100)
             
         except Exception as e:
-            raise ValueError(f"Error creating comparison plot: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error creating comparison plot: {str(e)}")
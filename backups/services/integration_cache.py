@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import sympy as sp
+
+from services.metrics import record_cache, span
+from services.time_budget import run_with_budget
+
+
+class IntegrationTimeout(ValueError):
+    """Symbolic integration did not finish within the time budget"""
+    pass
+
+
+class IntegrationFailed(ValueError):
+    """sp.integrate raised (NotImplementedError, PolynomialError, ...)"""
+    pass
+
+
+# Tombstones stored in place of a result
+NO_CLOSED_FORM = 'no_closed_form'
+TIMED_OUT = 'timed_out'
+
+
+class IntegrationCache:
+    """
+    Process-wide memo of sp.integrate results keyed by the structural
+    form of the integrand (and the limits for definite integrals).
+
+    Failures are cached too: an integrand without a closed form is stored
+    as NO_CLOSED_FORM, one that exceeded the time budget as TIMED_OUT and
+    one on which SymPy raised as an IntegrationFailed carrying the message,
+    so the same pathological input never burns CPU twice.
+    """
+
+    def __init__(self, max_entries: int = 1024, time_budget: float = 5.0):
+        self.max_entries = max_entries
+        self.time_budget = time_budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.timeouts = 0
+
+    def _key(self, expr: sp.Expr, x: sp.Symbol, limits=None) -> Hashable:
+        return (sp.srepr(expr), x.name, limits)
+
+    def _lookup(self, key):
+        with self._lock:
+            found = key in self._entries
+            if found:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = self._entries[key]
+            else:
+                self.misses += 1
+                value = None
+        record_cache('integration', found)
+        return found, value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _integrate(self, key, *args, budget: Optional[float] = None):
+        budget = self.time_budget if budget is None else min(budget, self.time_budget)
+        found, value = self._lookup(key)
+        if not found:
+            try:
+                with span('integration.symbolic'):
+                    value = run_with_budget(lambda: sp.integrate(*args), budget)
+                if len(args) == 2 and value.has(sp.Integral):
+                    # Indefinite integral came back unevaluated
+                    value = NO_CLOSED_FORM
+            except TimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                if budget < self.time_budget:
+                    # A caller's shorter budget says nothing about the full one
+                    raise IntegrationTimeout(f"Symbolic integration exceeded the {budget}s time budget")
+                value = TIMED_OUT
+            except MemoryError:
+                raise
+            except Exception as exc:
+                value = IntegrationFailed(f"Symbolic integration failed: {exc}")
+            self._store(key, value)
+        if value is TIMED_OUT:
+            raise IntegrationTimeout(
+                f"Symbolic integration exceeded the {self.time_budget}s time budget"
+            )
+        if isinstance(value, IntegrationFailed):
+            # Fresh instance per raise so tracebacks do not pile up on the cached one
+            raise IntegrationFailed(*value.args)
+        return value
+
+    def antiderivative(self, expr: sp.Expr, x: sp.Symbol) -> sp.Expr:
+        """
+        Indefinite integral of expr. Returns the unevaluated Integral
+        when SymPy finds no closed form (same as sp.integrate), raises
+        IntegrationTimeout when the budget was exceeded and
+        IntegrationFailed when SymPy itself raised.
+        """
+        result = self._integrate(self._key(expr, x), expr, x)
+        if result is NO_CLOSED_FORM:
+            return sp.Integral(expr, x)
+        return result
+
+    def has_closed_form(self, expr: sp.Expr, x: sp.Symbol) -> bool:
+        return not self.antiderivative(expr, x).has(sp.Integral)
+
+    def definite(self, expr: sp.Expr, x: sp.Symbol, lower: float, upper: float,
+                 budget: Optional[float] = None) -> sp.Expr:
+        """
+        Definite integral of expr over [lower, upper], memoized per bounds
+        budget: seconds allowed for this call if less than time_budget
+        """
+        key = self._key(expr, x, (float(lower), float(upper)))
+        return self._integrate(key, expr, (x, lower, upper), budget=budget)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            tombstones = sum(1 for v in self._entries.values() if isinstance(v, (str, IntegrationFailed)))
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'tombstones': tombstones,
+                'time_budget_seconds': self.time_budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'timeouts': self.timeouts,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+# Shared by every service in this process
+integration_cache = IntegrationCache(
+    max_entries=int(os.environ.get('INTEGRATION_CACHE_MAX_ENTRIES', 1024)),
+    time_budget=float(os.environ.get('INTEGRATION_TIME_BUDGET', 5.0))
+)
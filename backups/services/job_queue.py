@@ -0,0 +1,327 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services import metrics
+from services.dependencies import ServiceHandle
+from services.executor import ExecutorBusy, ExecutorError, executor
+from services.serialization import dumps, loads
+
+# Calculations that can run as jobs, per service (dependencies.SERVICES names).
+# Parsing and sampling helpers are deliberately left out.
+JOB_METHODS = {
+    'integral': (
+        'calculate_indefinite_integral', 'calculate_definite_integral',
+        'calculate_definite_integral_batch', 'calculate_area_under_curve',
+        'calculate_average_value', 'riemann_sums', 'calculate_arc_length',
+        'calculate_surface_area_revolution', 'get_integration_steps'
+    ),
+    'math': ('calculate_volume',),
+    'algebra': ('solve_linear', 'solve_quadratic', 'factor_quadratic', 'solve_polynomial'),
+    'linear_algebra': (
+        'matrix_determinant', 'matrix_inverse', 'matrix_eigenvalues', 'matrix_decomposition',
+        'solve_linear_system', 'matrix_operations', 'matrix_rank'
+    ),
+}
+TERMINAL_STATES = ('succeeded', 'failed')
+
+
+# ============ STORES ============
+class JobStore(ABC):
+    """
+    Where job records live. Records are dicts (NumPy values allowed, see
+    serialization) replaced as a whole on every state change; finished
+    ones expire after `ttl`.
+    """
+
+    @abstractmethod
+    def put(self, job: Dict):
+        """Store a new record or replace an existing one (ExecutorBusy when full)"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """The record, or None when unknown or expired"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Size and settings, for /api/jobs/stats"""
+
+
+class MemoryJobStore(JobStore):
+    """
+    Jobs of this process. Beyond max_entries the oldest finished jobs are
+    dropped; new jobs are refused while every record is still unfinished.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float, room: int):
+        """
+        Drop finished jobs past their ttl, and the oldest finished ones while
+        `room` more records would not fit. Queued and running jobs stay.
+        """
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job['status'] not in TERMINAL_STATES:
+                continue
+            if now - job['finished_at'] <= self.ttl and len(self._jobs) + room <= self.max_entries:
+                # Finished jobs are never rewritten, so the rest are newer
+                break
+            del self._jobs[job_id]
+
+    def put(self, job: Dict):
+        with self._lock:
+            room = 0 if job['id'] in self._jobs else 1
+            self._expire(time.time(), room)
+            if len(self._jobs) + room > self.max_entries:
+                raise ExecutorBusy("Too many unfinished jobs, please retry shortly")
+            self._jobs[job['id']] = job
+            self._jobs.move_to_end(job['id'])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'store': 'memory', 'entries': len(self._jobs), 'max_entries': self.max_entries,
+                    'ttl_seconds': self.ttl}
+
+
+class DirectoryJobStore(JobStore):
+    """
+    One JSON file per job, written atomically, so records survive a
+    restart and can be read by other processes sharing the directory
+    """
+
+    SWEEP_EVERY = 100
+
+    def __init__(self, directory: str, ttl: float = 3600.0):
+        self.directory = directory
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _sweep(self):
+        """Remove files not written for ttl seconds (finished jobs are never rewritten)"""
+        cutoff = time.time() - self.ttl
+        for item in os.scandir(self.directory):
+            try:
+                if item.name.endswith('.json') and item.stat().st_mtime < cutoff:
+                    os.remove(item.path)
+            except FileNotFoundError:
+                pass
+
+    def put(self, job: Dict):
+        path = self._path(job['id'])
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, 'wb') as f:
+            f.write(dumps(job))
+        os.replace(partial, path)
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.SWEEP_EVERY == 0
+        if sweep:
+            self._sweep()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            return None
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def stats(self) -> Dict:
+        entries = sum(1 for item in os.scandir(self.directory) if item.name.endswith('.json'))
+        return {'store': 'directory', 'directory': self.directory, 'entries': entries,
+                'ttl_seconds': self.ttl}
+
+
+def store_from_env() -> JobStore:
+    ttl = float(os.environ.get('JOB_STORE_TTL', 3600))
+    directory = os.environ.get('JOB_STORE_DIR')
+    if directory:
+        return DirectoryJobStore(directory, ttl=ttl)
+    return MemoryJobStore(max_entries=int(os.environ.get('JOB_STORE_MAX_ENTRIES', 1000)), ttl=ttl)
+
+
+# ============ QUEUE ============
+class JobQueue:
+    """
+    In-process queue of service calls that may outlive an HTTP request.
+    submit() records the job and returns at once; `workers` consumer
+    tasks run jobs one at a time each through the executor's process
+    pool with the (longer) job timeout, writing every state change to
+    the store and waking anyone waiting in changed().
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, max_queued: int = 256,
+                 timeout: float = 300.0, max_timeout: float = 1800.0):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._waiting: OrderedDict = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        # Bumped on every state change of any job
+        self.revision = 0
+        self.counters = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'rejected': 0}
+
+    @classmethod
+    def from_env(cls) -> 'JobQueue':
+        env = os.environ.get
+        return cls(
+            store_from_env(),
+            # Half the process pool by default so interactive requests keep capacity
+            workers=int(env('JOB_WORKERS', max(1, executor.process_workers // 2))),
+            max_queued=int(env('JOB_MAX_QUEUED', 256)),
+            timeout=float(env('JOB_TIMEOUT', 300)),
+            max_timeout=float(env('JOB_MAX_TIMEOUT', 1800))
+        )
+
+    def start(self):
+        """Start the consumers on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._changed = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ----- submission -----
+    def submit(self, service: str, method: str, args: List[Any], kwargs: Dict[str, Any],
+               timeout: Optional[float] = None) -> Dict:
+        """Record and enqueue a job; call on the event loop the queue was started on"""
+        if service not in JOB_METHODS:
+            raise ValueError(f"Unknown service: {service}. Use one of: {', '.join(JOB_METHODS)}")
+        if method not in JOB_METHODS[service]:
+            raise ValueError(f"Unsupported method for {service}: {method}. "
+                             f"Use one of: {', '.join(JOB_METHODS[service])}")
+        timeout = self.timeout if timeout is None else timeout
+        if not 0 < timeout <= self.max_timeout:
+            raise ValueError(f"timeout must be between 0 and {self.max_timeout} seconds")
+        if self._queue is None:
+            raise ExecutorError("Job queue is not running")
+        if len(self._waiting) >= self.max_queued:
+            self.counters['rejected'] += 1
+            raise ExecutorBusy("Job queue is full, please retry shortly")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'service': service,
+            'method': method,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'timeout_seconds': timeout,
+            'result': None,
+            'error': None,
+            'status_code': None,
+            'version': 0
+        }
+        try:
+            self.store.put(job)
+        except ExecutorBusy:
+            self.counters['rejected'] += 1
+            raise
+        self._waiting[job['id']] = None
+        self._queue.put_nowait((job, args, kwargs))
+        self.counters['submitted'] += 1
+        return self.get(job['id'])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job record plus its place in the queue while it waits"""
+        job = self.store.get(job_id)
+        if job is not None and job['status'] == 'queued' and job_id in self._waiting:
+            job = {**job, 'position': list(self._waiting).index(job_id)}
+        return job
+
+    async def changed(self, since: int, timeout: float) -> int:
+        """Wait until any job changed state after revision `since` (or timeout)"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.revision != since), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.revision
+
+    # ----- execution -----
+    async def _update(self, job: Dict, **fields) -> Dict:
+        job = {**job, **fields, 'version': job['version'] + 1}
+        self.store.put(job)
+        async with self._changed:
+            self.revision += 1
+            self._changed.notify_all()
+        return job
+
+    async def _consume(self):
+        while True:
+            job, args, kwargs = await self._queue.get()
+            try:
+                await self._run(job, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict, args: List[Any], kwargs: Dict[str, Any]):
+        self._waiting.pop(job['id'], None)
+        job = await self._update(job, status='running', started_at=time.time())
+        # Service phases of the job are reported under the jobs route
+        token, events = metrics.begin_request()
+        try:
+            result = await executor.run_cpu(
+                ServiceHandle(job['service']), job['method'], *args,
+                timeout=job['timeout_seconds'], **kwargs
+            )
+        except asyncio.CancelledError:
+            await self._update(job, status='failed', finished_at=time.time(),
+                               error='Server shut down before the job finished', status_code=503)
+            raise
+        except ExecutorError as e:
+            self.counters['failed'] += 1
+            await self._update(job, status='failed', finished_at=time.time(), error=str(e),
+                               status_code=e.status_code)
+        except Exception as e:
+            self.counters['failed'] += 1
+            await self._update(job, status='failed', finished_at=time.time(), error=str(e), status_code=400)
+        else:
+            self.counters['succeeded'] += 1
+            await self._update(job, status='succeeded', finished_at=time.time(), result=result)
+        finally:
+            metrics.end_request(token, events, '/api/jobs')
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'queued': len(self._waiting),
+            'max_queued': self.max_queued,
+            'timeout_seconds': self.timeout,
+            'max_timeout_seconds': self.max_timeout,
+            **self.counters,
+            'store': self.store.stats()
+        }
+
+
+job_queue = JobQueue.from_env()
@@ -3,11 +3,13 @@ from scipy import linalg
 import sympy as sp
 from typing import Dict, List, Optional, Tuple
 import json
+from services.metrics import span, timed
 
 class LinearAlgebraService:
     def __init__(self):
         pass
     
+    @timed('linalg.parse_matrix')
     def parse_matrix(self, matrix_str: str) -> np.ndarray:
         """
         Parse matrix from string or list
@@ -25,6 +27,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Invalid matrix format: {str(e)}")
     
+    @timed('linalg.matrix_determinant')
     def matrix_determinant(self, matrix: List[List[float]]) -> Dict:
         try:
             A = self.parse_matrix(matrix)
@@ -37,9 +40,10 @@ class LinearAlgebraService:
             if A.shape[0] <= 4:
                 try:
                     # Gunakan nsimplify agar SymPy mencoba mengubah float ke rasional
-                    A_sym = sp.Matrix(A.tolist())
-                    symbolic_det = str(sp.simplify(A_sym.det()))
-                except:
+                    with span('linalg.symbolic_determinant'):
+                        A_sym = sp.Matrix(A.tolist())
+                        symbolic_det = str(sp.simplify(A_sym.det()))
+                except Exception:
                     pass
             
             return {
@@ -51,6 +55,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error calculating determinant: {str(e)}")
     
+    @timed('linalg.matrix_inverse')
     def matrix_inverse(self, matrix: List[List[float]]) -> Dict:
         """Calculate matrix inverse"""
         try:
@@ -69,7 +74,7 @@ class LinearAlgebraService:
             verification = np.allclose(A @ A_inv, np.eye(A.shape[0]))
             
             return {
-                'inverse': A_inv.tolist(),
+                'inverse': A_inv,
                 'determinant': float(det),
                 'verification_passed': verification,
                 'condition_number': float(np.linalg.cond(A))
@@ -79,6 +84,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error calculating inverse: {str(e)}")
     
+    @timed('linalg.matrix_eigenvalues')
     def matrix_eigenvalues(self, matrix: List[List[float]]) -> Dict:
         """Calculate eigenvalues and eigenvectors"""
         try:
@@ -102,12 +108,13 @@ class LinearAlgebraService:
                         'imag': float(val.imag),
                         'magnitude': float(np.abs(val))
                     },
-                    'eigenvector': vec.tolist()
+                    'eigenvector': vec
                 })
             
             return {
-                'eigenvalues': [float(val.real) if val.imag == 0 else complex(val) for val in eigenvalues],
-                'eigenvectors': eigenvectors.tolist(),
+                # Real dtype unless some eigenvalue is complex (np.linalg.eig)
+                'eigenvalues': eigenvalues,
+                'eigenvectors': eigenvectors,
                 'eigen_pairs': eigen_pairs,
                 'trace': float(np.trace(A)),
                 'is_diagonalizable': True  # Simplified check
@@ -115,6 +122,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error calculating eigenvalues: {str(e)}")
     
+    @timed('linalg.matrix_decomposition')
     def matrix_decomposition(self, matrix: List[List[float]], method: str = 'lu') -> Dict:
         """
         Matrix decomposition: LU, QR, SVD, Cholesky
@@ -122,31 +130,31 @@ class LinearAlgebraService:
         try:
             A = self.parse_matrix(matrix)
             
-            result = {'method': method, 'original_matrix': A.tolist()}
+            result = {'method': method, 'original_matrix': A}
             
             if method.lower() == 'lu':
                 P, L, U = linalg.lu(A)
                 result.update({
-                    'P': P.tolist(),
-                    'L': L.tolist(),
-                    'U': U.tolist(),
+                    'P': P,
+                    'L': L,
+                    'U': U,
                     'description': 'A = P·L·U decomposition'
                 })
                 
             elif method.lower() == 'qr':
                 Q, R = np.linalg.qr(A)
                 result.update({
-                    'Q': Q.tolist(),
-                    'R': R.tolist(),
+                    'Q': Q,
+                    'R': R,
                     'description': 'A = Q·R decomposition (Q is orthogonal)'
                 })
                 
             elif method.lower() == 'svd':
                 U, S, Vt = np.linalg.svd(A)
                 result.update({
-                    'U': U.tolist(),
-                    'singular_values': S.tolist(),
-                    'Vt': Vt.tolist(),
+                    'U': U,
+                    'singular_values': S,
+                    'Vt': Vt,
                     'condition_number': float(S[0] / S[-1]) if S[-1] != 0 else float('inf'),
                     'rank': int(np.sum(S > 1e-10)),
                     'description': 'A = U·Σ·V^T decomposition'
@@ -160,7 +168,7 @@ class LinearAlgebraService:
                 
                 L = np.linalg.cholesky(A)
                 result.update({
-                    'L': L.tolist(),
+                    'L': L,
                     'description': 'A = L·L^T decomposition (Cholesky)'
                 })
             else:
@@ -173,6 +181,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error in decomposition: {str(e)}")
     
+    @timed('linalg.solve_linear_system')
     def solve_linear_system(self, A: List[List[float]], b: List[float]) -> Dict:
         """
         Solve linear system Ax = b
@@ -195,7 +204,7 @@ class LinearAlgebraService:
             residual = np.linalg.norm(A_matrix @ x - b_vector)
             
             return {
-                'solution': x.tolist(),
+                'solution': x,
                 'verification_passed': verification,
                 'residual': float(residual),
                 'determinant': float(det) if det is not None else None,
@@ -207,6 +216,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error solving system: {str(e)}")
     
+    @timed('linalg.matrix_operations')
     def matrix_operations(self, operation: str, matrix_a: List[List[float]], 
                          matrix_b: Optional[List[List[float]]] = None,
                          scalar: Optional[float] = None) -> Dict:
@@ -219,13 +229,13 @@ class LinearAlgebraService:
             
             if operation == 'transpose':
                 result = A.T
-                result_data['result'] = result.tolist()
+                result_data['result'] = result
                 
             elif operation == 'scalar_multiply':
                 if scalar is None:
                     raise ValueError("Scalar value required for scalar multiplication")
                 result = scalar * A
-                result_data['result'] = result.tolist()
+                result_data['result'] = result
                 result_data['scalar'] = scalar
                 
             elif operation == 'power':
@@ -234,7 +244,7 @@ class LinearAlgebraService:
                 if A.shape[0] != A.shape[1]:
                     raise ValueError("Matrix must be square for power operation")
                 result = np.linalg.matrix_power(A, int(scalar))
-                result_data['result'] = result.tolist()
+                result_data['result'] = result
                 result_data['power'] = int(scalar)
                 
             elif operation in ['add', 'subtract', 'multiply']:
@@ -258,7 +268,7 @@ class LinearAlgebraService:
                         raise ValueError(f"Cannot multiply matrices: {A.shape} and {B.shape}")
                     result = A @ B
                 
-                result_data['result'] = result.tolist()
+                result_data['result'] = result
                 result_data['matrix_b_shape'] = list(B.shape)  # ✅ Jadi list
                 
             else:
@@ -272,6 +282,7 @@ class LinearAlgebraService:
         except Exception as e:
             raise ValueError(f"Error in matrix operation: {str(e)}")
     
+    @timed('linalg.matrix_rank')
     def matrix_rank(self, matrix: List[List[float]]) -> Dict:
         try:
             A = self.parse_matrix(matrix)
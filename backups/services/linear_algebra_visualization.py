@@ -1,89 +1,132 @@
 import numpy as np
+from typing import Dict, Optional
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import plotly.graph_objects as go
-import io
-import base64
+from services.figure_cache import figure_cache
+from services.figure_pool import FigureTemplate, figure_pool, new_figure
+from services.image_encoding import DEFAULT_IMAGE_FORMAT, encode_figure
+from services.metrics import record_size, span, timed
+from services.plot_data import compact_figure
+
+# ============ FIGURE TEMPLATES ============
+def _heatmap(fig, ax):
+    """Placeholder image plus colorbar; set_image() swaps in the real data"""
+    im = ax.imshow(np.zeros((1, 1)), cmap='RdBu_r', aspect='auto')
+    fig.colorbar(im, ax=ax)
+    return im
+
+
+def set_image(im, data: np.ndarray):
+    """Show data in a template heatmap, rescaling extent, limits and colorbar"""
+    data = np.asarray(data)
+    im.set_data(data)
+    im.set_extent((-0.5, data.shape[1] - 0.5, data.shape[0] - 0.5, -0.5))
+    im.autoscale()
+
+
+def _matrix_template() -> FigureTemplate:
+    fig = new_figure((8, 6))
+    ax = fig.add_subplot()
+    im = _heatmap(fig, ax)
+    ax.set_title('Matrix Heatmap', fontsize=14, fontweight='bold')
+    ax.grid(which='minor', color='gray', linestyle='-', linewidth=0.5)
+    return FigureTemplate(fig, (ax,), {'image': im})
+
+
+def _eigenvectors_2d_template() -> FigureTemplate:
+    fig = new_figure((8, 8))
+    ax = fig.add_subplot()
+    # Unit circle for reference
+    theta = np.linspace(0, 2*np.pi, 100)
+    ax.plot(np.cos(theta), np.sin(theta), linestyle='--', color='gray', alpha=0.5)
+    ax.set_xlim(-3, 3)
+    ax.set_ylim(-3, 3)
+    ax.set_aspect('equal')
+    ax.grid(True, alpha=0.3)
+    ax.axhline(y=0, color='k', linewidth=0.5)
+    ax.axvline(x=0, color='k', linewidth=0.5)
+    ax.set_title('Eigenvectors Visualization', fontsize=14, fontweight='bold')
+    return FigureTemplate(fig, (ax,), {})
+
+
+def _svd_template() -> FigureTemplate:
+    fig = new_figure((15, 5))
+    ax_u, ax_s, ax_vt = fig.subplots(1, 3)
+    u = _heatmap(fig, ax_u)
+    ax_u.set_title('U (Left Singular Vectors)', fontweight='bold')
+    ax_s.set_title('Singular Values (Σ)', fontweight='bold')
+    ax_s.set_xlabel('Index')
+    ax_s.set_ylabel('Value')
+    ax_s.grid(True, alpha=0.3)
+    vt = _heatmap(fig, ax_vt)
+    ax_vt.set_title('V^T (Right Singular Vectors)', fontweight='bold')
+    return FigureTemplate(fig, (ax_u, ax_s, ax_vt), {'U': u, 'Vt': vt})
+
 
 class LinearAlgebraVisualization:
     
-    def visualize_matrix(self, matrix: np.ndarray) -> str:
+    @timed('viz.visualize_matrix')
+    @figure_cache.cached
+    def visualize_matrix(self, matrix: np.ndarray,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """Create heatmap visualization of matrix"""
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            im = ax.imshow(matrix, cmap='RdBu_r', aspect='auto')
-            ax.set_title('Matrix Heatmap', fontsize=14, fontweight='bold')
-            
-            plt.colorbar(im, ax=ax)
-            
-            # PERBAIKAN: Aktifkan minor ticks agar grid muncul
-            ax.set_xticks(np.arange(matrix.shape[1]))
-            ax.set_yticks(np.arange(matrix.shape[0]))
-            ax.set_xticks(np.arange(-.5, matrix.shape[1], 1), minor=True)
-            ax.set_yticks(np.arange(-.5, matrix.shape[0], 1), minor=True)
-            ax.grid(which='minor', color='gray', linestyle='-', linewidth=0.5)
-            
-            for i in range(matrix.shape[0]):
-                for j in range(matrix.shape[1]):
-                    # Tambahkan pengecekan jika nilai sangat kecil, tampilkan 0
-                    val = matrix[i, j]
-                    ax.text(j, i, f'{val:.2f}', ha="center", va="center", 
-                            color="white" if abs(val) > (matrix.max()/2) else "black")
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('matrix', _matrix_template) as template:
+                ax, = template.axes
+                set_image(template.artists['image'], matrix)
+                
+                # PERBAIKAN: Aktifkan minor ticks agar grid muncul
+                ax.set_xticks(np.arange(matrix.shape[1]))
+                ax.set_yticks(np.arange(matrix.shape[0]))
+                ax.set_xticks(np.arange(-.5, matrix.shape[1], 1), minor=True)
+                ax.set_yticks(np.arange(-.5, matrix.shape[0], 1), minor=True)
+                
+                for i in range(matrix.shape[0]):
+                    for j in range(matrix.shape[1]):
+                        # Tambahkan pengecekan jika nilai sangat kecil, tampilkan 0
+                        val = matrix[i, j]
+                        ax.text(j, i, f'{val:.2f}', ha="center", va="center", 
+                                color="white" if abs(val) > (matrix.max()/2) else "black")
+                
+                return encode_figure(template.figure, image_format, dpi=100)
         except Exception as e:
             raise ValueError(f"Error visualizing matrix: {str(e)}")
     
-    def visualize_eigenvectors_2d(self, matrix: np.ndarray, eigenvalues, eigenvectors) -> str:
+    @timed('viz.visualize_eigenvectors_2d')
+    @figure_cache.cached
+    def visualize_eigenvectors_2d(self, matrix: np.ndarray, eigenvalues, eigenvectors,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """Visualize eigenvectors in 2D"""
         try:
             if matrix.shape[0] != 2:
                 raise ValueError("Only 2x2 matrices supported for 2D visualization")
             
-            fig, ax = plt.subplots(figsize=(8, 8))
-            
             # Plot eigenvectors - PERBAIKAN: Pastikan hanya ambil bagian REAL
             origin = np.zeros((2, len(eigenvalues))) 
             eigenvectors_real = eigenvectors.real # Ambil komponen riil
             
             colors = ['red', 'green', 'blue']
-            ax.quiver(origin[0], origin[1], eigenvectors_real[0], eigenvectors_real[1],
-                     color=colors[:len(eigenvalues)], scale=1, scale_units='xy', 
-                     angles='xy', width=0.015, label='Eigenvectors')
-            
-            # Tambahkan lingkaran satuan (unit circle) untuk referensi
-            theta = np.linspace(0, 2*np.pi, 100)
-            ax.plot(np.cos(theta), np.sin(theta), linestyle='--', color='gray', alpha=0.5)
-            
-            ax.set_xlim(-3, 3)
-            ax.set_ylim(-3, 3)
-            ax.set_aspect('equal')
-            ax.grid(True, alpha=0.3)
-            ax.axhline(y=0, color='k', linewidth=0.5)
-            ax.axvline(x=0, color='k', linewidth=0.5)
-            ax.set_title('Eigenvectors Visualization', fontsize=14, fontweight='bold')
-            ax.legend()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('eigenvectors_2d', _eigenvectors_2d_template) as template:
+                ax, = template.axes
+                ax.quiver(origin[0], origin[1], eigenvectors_real[0], eigenvectors_real[1],
+                         color=colors[:len(eigenvalues)], scale=1, scale_units='xy', 
+                         angles='xy', width=0.015, label='Eigenvectors')
+                ax.legend()
+                
+                return encode_figure(template.figure, image_format, dpi=100)
         except Exception as e:
             raise ValueError(f"Error visualizing eigenvectors: {str(e)}")
     
-    def visualize_eigenvectors_3d(self, matrix: np.ndarray, eigenvalues, eigenvectors) -> str:
-        """Visualize eigenvectors in 3D using Plotly"""
+    @timed('viz.visualize_eigenvectors_3d')
+    @figure_cache.cached
+    def visualize_eigenvectors_3d(self, matrix: np.ndarray, eigenvalues, eigenvectors,
+            plot_data: Optional[Dict] = None) -> str:
+        """
+        Visualize eigenvectors in 3D using Plotly
+        plot_data: compact_figure() options for data-only JSON instead of HTML
+        """
         try:
             if matrix.shape[0] != 3:
                 raise ValueError("Only 3x3 matrices supported for 3D visualization")
@@ -136,41 +179,35 @@ class LinearAlgebraVisualization:
                 height=600
             )
             
-            return fig.to_html(include_plotlyjs='cdn')
+            if plot_data is not None:
+                return compact_figure(fig, **plot_data)
+            
+            with span('viz.encode_plotly'):
+                html = fig.to_html(include_plotlyjs='cdn')
+            record_size('plotly_html', len(html))
+            return html
             
         except Exception as e:
             raise ValueError(f"Error visualizing 3D eigenvectors: {str(e)}")
     
-    def visualize_svd(self, U, S, Vt) -> str:
+    @timed('viz.visualize_svd')
+    @figure_cache.cached
+    def visualize_svd(self, U, S, Vt,
+            image_format: str = DEFAULT_IMAGE_FORMAT) -> bytes:
         """Visualize SVD components"""
         try:
-            fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-            
-            # U matrix
-            im1 = axes[0].imshow(U, cmap='RdBu_r', aspect='auto')
-            axes[0].set_title('U (Left Singular Vectors)', fontweight='bold')
-            plt.colorbar(im1, ax=axes[0])
-            
-            # Singular values
-            axes[1].bar(range(len(S)), S, color='steelblue')
-            axes[1].set_title('Singular Values (Σ)', fontweight='bold')
-            axes[1].set_xlabel('Index')
-            axes[1].set_ylabel('Value')
-            axes[1].grid(True, alpha=0.3)
-            
-            # Vt matrix
-            im3 = axes[2].imshow(Vt, cmap='RdBu_r', aspect='auto')
-            axes[2].set_title('V^T (Right Singular Vectors)', fontweight='bold')
-            plt.colorbar(im3, ax=axes[2])
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode()
-            plt.close()
-            
-            return f"data:image/png;base64,{image_base64}"
+            with figure_pool.figure('svd', _svd_template) as template:
+                # U and Vt matrices
+                set_image(template.artists['U'], U)
+                set_image(template.artists['Vt'], Vt)
+                
+                # Singular values
+                ax_s = template.axes[1]
+                ax_s.relim()
+                ax_s.bar(range(len(S)), S, color='steelblue')
+                
+                template.figure.tight_layout()
+                
+                return encode_figure(template.figure, image_format, dpi=100)
         except Exception as e:
             raise ValueError(f"Error visualizing SVD: {str(e)}")
\ No newline at end of file
@@ -1,7 +1,12 @@
 import sympy as sp
-from scipy import integrate
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from services import quadrature
+from services.quadrature import check_mode
+from services.curve_sampling import sample_function
+from services.expression_cache import CompiledExpression, expression_cache
+from services.integration_cache import integration_cache
+from services.metrics import span, timed
 
 class MathService:
     def __init__(self):
@@ -10,78 +15,94 @@ class MathService:
     
     def parse_function(self, func_str: str) -> sp.Expr:
         """Parse string function to sympy expression"""
+        return self.compile_function(func_str).expr
+    
+    def compile_function(self, func_str: str) -> CompiledExpression:
+        """Parse string function, reusing the shared expression cache"""
         try:
-            # Replace common mathematical functions
-            func_str = func_str.replace('^', '**')
-            # Parse using sympy
-            expr = sp.sympify(func_str, locals={'x': self.x})
-            return expr
+            # Parsed with the expression grammar (never eval), keyed by canonical form
+            return expression_cache.compile(func_str, self.x)
         except Exception as e:
             raise ValueError(f"Invalid function expression: {str(e)}")
     
-    def calculate_volume(self, func_str: str, a: float, b: float, axis: str) -> Dict:
+    @timed('volume.calculate_volume')
+    def calculate_volume(self, func_str: str, a: float, b: float, axis: str, mode: str = 'symbolic',
+                         symbolic_budget: Optional[float] = None) -> Dict:
         """
         Calculate volume of solid of revolution
         V = π ∫[a,b] [f(x)]² dx  (for x-axis rotation)
+        mode: 'symbolic' checks SymPy's result against quadrature,
+              'numeric' skips symbolic integration
+        symbolic_budget: seconds for SymPy if less than INTEGRATION_TIME_BUDGET
         """
+        check_mode(mode)
         try:
-            func = self.parse_function(func_str)
+            compiled = self.compile_function(func_str)
+            f = compiled.func
             
             if axis == "x-axis":
                 # Disk method: V = π ∫[a,b] [f(x)]² dx
-                integrand = sp.pi * func**2
+                integrand_numeric = lambda t: np.pi * f(t)**2
             else:  # y-axis rotation
                 # Shell method: V = 2π ∫[a,b] x·f(x) dx
-                integrand = 2 * sp.pi * self.x * func
+                integrand_numeric = lambda t: 2 * np.pi * t * f(t)
             
             # Try symbolic integration
             volume_symbolic = None
             integral_expr = None
-            try:
-                integral_indefinite = sp.integrate(integrand, self.x)
-                volume_symbolic = sp.integrate(integrand, (self.x, a, b))
-                integral_expr = sp.latex(integrand)
-                
-                # Try to evaluate symbolically
-                volume_symbolic_value = float(volume_symbolic.evalf())
-            except:
-                volume_symbolic_value = None
-            
-            # Numerical integration (always compute as backup)
-            func_numeric = sp.lambdify(self.x, integrand, 'numpy')
-            
-            def integrand_func(x):
+            volume_symbolic_value = None
+            if mode == 'symbolic':
+                func = compiled.expr
+                integrand = sp.pi * func**2 if axis == "x-axis" else 2 * sp.pi * self.x * func
                 try:
-                    return func_numeric(x)
-                except:
-                    return 0
+                    volume_symbolic = integration_cache.definite(integrand, self.x, a, b, budget=symbolic_budget)
+                    with span('volume.latex'):
+                        integral_expr = sp.latex(integrand)
+                    
+                    # Try to evaluate symbolically
+                    with span('volume.evalf'):
+                        volume_symbolic_value = float(volume_symbolic.evalf())
+                except Exception:
+                    volume_symbolic_value = None
             
-            volume_numerical, error = integrate.quad(integrand_func, a, b)
+            # Numerical integration (always compute as backup)
+            numeric = quadrature.integrate(integrand_numeric, a, b)
+            volume_numerical, error = numeric['value'], numeric['error']
             
-            # Use symbolic if available and matches numerical
-            if volume_symbolic_value is not None:
-                if abs(volume_symbolic_value - volume_numerical) < 0.01 * volume_numerical:
+            # Use symbolic if available and matches numerical (or numerical failed)
+            if volume_symbolic_value is not None and np.isfinite(volume_symbolic_value):
+                if not numeric['converged'] or abs(volume_symbolic_value - volume_numerical) < 0.01 * volume_numerical:
                     volume_result = volume_symbolic_value
                 else:
                     volume_result = volume_numerical
-            else:
+            elif numeric['converged']:
                 volume_result = volume_numerical
+            else:
+                raise ValueError(quadrature.failure_message(numeric))
             
             return {
                 'volume_numerical': round(volume_result, 6),
                 'volume_symbolic': str(volume_symbolic) if volume_symbolic else None,
                 'integral_expression': integral_expr if integral_expr else f"π∫[{a},{b}] ({func_str})² dx",
-                'error_estimate': error if error else None
+                'error_estimate': error if error else None,
+                'mode': mode
             }
             
         except Exception as e:
             raise ValueError(f"Error calculating volume: {str(e)}")
     
+    @timed('volume.evaluate_function')
     def evaluate_function(self, func_str: str, x_vals: np.ndarray) -> np.ndarray:
         """Evaluate function at given x values"""
         try:
-            func = self.parse_function(func_str)
-            func_numeric = sp.lambdify(self.x, func, 'numpy')
-            return func_numeric(x_vals)
+            return self.compile_function(func_str).func(x_vals)
+        except Exception as e:
+            raise ValueError(f"Error evaluating function: {str(e)}")
+    
+    @timed('volume.sample_function')
+    def sample_function(self, func_str: str, lower: float, upper: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Adaptively sampled (x, y) for plotting, gaps as NaN"""
+        try:
+            return sample_function(self.compile_function(func_str).func, lower, upper)
         except Exception as e:
             raise ValueError(f"Error evaluating function: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,227 @@
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# ============ METRIC TYPES ============
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter in the Prometheus text format"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                  buckets: Iterable[float] = DURATION_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...]) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'route', 'status'))
+REQUEST_SIZE = registry.histogram(
+    'http_request_size_bytes', 'HTTP request body size', ('method', 'route'), SIZE_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    'http_response_size_bytes', 'HTTP response body size', ('method', 'route'), SIZE_BUCKETS)
+PHASE_DURATION = registry.histogram(
+    'phase_duration_seconds', 'Time spent in a service phase', ('route', 'phase'))
+PAYLOAD_SIZE = registry.histogram(
+    'payload_size_bytes', 'Size of generated payloads (images, plot JSON)', ('route', 'kind'), SIZE_BUCKETS)
+CACHE_LOOKUPS = registry.counter(
+    'cache_lookups_total', 'Cache lookups by result', ('route', 'cache', 'result'))
+COALESCED_REQUESTS = registry.counter(
+    'coalesced_requests_total', 'Requests that computed a result or shared an identical in-flight one',
+    ('route', 'result'))
+
+
+# ============ EVENTS ============
+# Services report ('span', phase, seconds), ('size', kind, bytes) and
+# ('cache', name, hit) events. Inside an executor task they are collected
+# per thread and shipped back with the result; in the parent they are
+# buffered per request so they can be labelled with the matched route.
+_local = threading.local()
+_request_events: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar('request_events', default=None)
+
+
+def _observe(event: Tuple, route: str):
+    kind, name, value = event
+    if kind == 'span':
+        PHASE_DURATION.observe((route, name), value)
+    elif kind == 'size':
+        PAYLOAD_SIZE.observe((route, name), value)
+    elif kind == 'cache':
+        CACHE_LOOKUPS.inc((route, name, 'hit' if value else 'miss'))
+
+
+def _emit(event: Tuple):
+    collector = getattr(_local, 'events', None)
+    if collector is not None:
+        collector.append(event)
+        return
+    pending = _request_events.get()
+    if pending is not None:
+        pending.append(event)
+        return
+    _observe(event, '')
+
+
+@contextmanager
+def span(phase: str):
+    """Record the duration of the enclosed block as `phase`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit(('span', phase, time.perf_counter() - start))
+
+
+def timed(phase: str) -> Callable:
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_size(kind: str, size: int):
+    _emit(('size', kind, size))
+
+
+def record_cache(cache: str, hit: bool):
+    _emit(('cache', cache, hit))
+
+
+@contextmanager
+def collect():
+    """Capture the events emitted by this thread instead of recording them"""
+    previous = getattr(_local, 'events', None)
+    events = _local.events = []
+    try:
+        yield events
+    finally:
+        _local.events = previous
+
+
+def replay(events: Iterable[Tuple]):
+    """Record events captured by collect(), typically in another process"""
+    for event in events:
+        _emit(event)
+
+
+# ============ REQUEST SCOPE ============
+def begin_request() -> Tuple[contextvars.Token, List]:
+    events = []
+    return _request_events.set(events), events
+
+
+def end_request(token: contextvars.Token, events: List, route: str):
+    _request_events.reset(token)
+    for event in events:
+        _observe(event, route)
+
+
+def server_timing(events: List) -> str:
+    """Server-Timing header value summing span durations per phase"""
+    totals: Dict[str, float] = {}
+    for kind, name, value in events:
+        if kind == 'span':
+            totals[name] = totals.get(name, 0.0) + value
+    return ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items())
@@ -0,0 +1,123 @@
+import base64
+import json
+from typing import Dict, Optional
+
+import numpy as np
+
+from services.metrics import record_size, span
+
+# Data-only Plotly output: {"data": [...], "layout": {...}} without the
+# layout template, with arrays as JSON lists or Plotly typed array specs
+PLOT_DATA_DTYPES = {
+    'float64': 'f8',
+    'float32': 'f4'
+}
+MIN_PLOT_WIDTH = 16
+MAX_PLOT_WIDTH = 10000
+ARRAY_KEYS = ('x', 'y', 'z')
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that
+    keep the visual shape of the line (x, y), first and last included.
+    Points with a non-finite y are only picked from all-gap buckets.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+
+    # Interior points split into threshold - 2 buckets; each bucket's
+    # mean is the third triangle vertex for the bucket before it
+    bounds = np.linspace(1, n - 1, threshold - 1).astype(int)
+    counts = np.maximum(np.add.reduceat(finite[1:-1].astype(float), bounds[:-1] - 1), 1)
+    mean_x = np.add.reduceat(np.where(finite, x, 0)[1:-1], bounds[:-1] - 1) / counts
+    mean_y = np.add.reduceat(np.where(finite, y, 0)[1:-1], bounds[:-1] - 1) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        area[~finite[start:stop]] = -1
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def typed_array(values, dtype: str = 'float64', binary: bool = False):
+    """
+    Numeric array as a JSON list (NaN/inf as null, float32 rounded to
+    its 7 significant digits) or as Plotly's base64 typed array spec
+    """
+    values = np.asarray(values, dtype=dtype)
+    if binary:
+        spec = {
+            'dtype': PLOT_DATA_DTYPES[dtype],
+            'bdata': base64.b64encode(np.ascontiguousarray(values).astype(f"<{PLOT_DATA_DTYPES[dtype]}").tobytes()).decode()
+        }
+        if values.ndim > 1:
+            spec['shape'] = ', '.join(map(str, values.shape))
+        return spec
+
+    def element(v):
+        if not np.isfinite(v):
+            return None
+        return float(f"{v:.7g}") if dtype == 'float32' else float(v)
+
+    if values.ndim > 1:
+        return [[element(v) for v in row] for row in values]
+    return [element(v) for v in values]
+
+
+def _keep(trace: Dict, width: Optional[int]) -> Optional[np.ndarray]:
+    """Point (or surface column) indices to keep for a target width, None for all"""
+    if not width:
+        return None
+    x, y = trace.get('x'), trace.get('y')
+    if x is None or y is None:
+        return None
+    x, y = np.asarray(x), np.asarray(y)
+    if trace.get('type') == 'surface' and x.ndim == 2 and y.ndim == 2:
+        # Columns chosen along the first row, the generating profile of a revolution mesh
+        return lttb_indices(x[0], y[0], width)
+    if trace.get('type') == 'scatter' and x.ndim == 1 and y.ndim == 1 and len(x) == len(y):
+        return lttb_indices(x, y, width)
+    return None
+
+
+def compact_figure(fig, width: Optional[int] = None, dtype: str = 'float64',
+                   binary: bool = False) -> str:
+    """
+    JSON of a Plotly figure for client-side rendering: the traces and
+    layout the renderer set, without Plotly's template, with lines (and
+    surfaces along x) downsampled to about `width` points
+    """
+    if dtype not in PLOT_DATA_DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype}. Use one of: {', '.join(PLOT_DATA_DTYPES)}")
+    with span('viz.encode_plot_data'):
+        traces = []
+        for trace in fig.data:
+            trace = trace.to_plotly_json()
+            keep = _keep(trace, width)
+            for key in ARRAY_KEYS:
+                if trace.get(key) is None:
+                    continue
+                values = np.asarray(trace[key], dtype=float)
+                if keep is not None:
+                    values = values[..., keep] if values.ndim > 1 else values[keep]
+                trace[key] = typed_array(values, dtype, binary)
+            traces.append(trace)
+        layout = fig.layout.to_plotly_json()
+        layout.pop('template', None)
+        plot_data = json.dumps({'data': traces, 'layout': layout}, separators=(',', ':'))
+    record_size('plot_data', len(plot_data))
+    return plot_data
@@ -0,0 +1,49 @@
+import os
+import time
+from typing import Dict
+
+from services import metrics
+from services.dependencies import build_services, get_service
+
+# Parsed and compiled ahead of time so common inputs hit a warm cache
+COMMON_EXPRESSIONS = (
+    'x', 'x**2', 'x**3', 'sqrt(x)', '1/x', 'sin(x)', 'cos(x)', 'tan(x)',
+    'exp(x)', 'exp(-x**2)', 'log(x)', 'x*sin(x)', 'x**2*exp(x)'
+)
+
+
+def prewarm_enabled() -> bool:
+    return os.environ.get('PREWARM', '0').lower() in ('1', 'true', 'yes')
+
+
+def prewarm() -> Dict[str, float]:
+    """
+    Pay one-off costs before the first real request: import and build
+    every service, compile COMMON_EXPRESSIONS, run one symbolic +
+    numeric integral and render throwaway Matplotlib and Plotly figures
+    (font cache, Agg backend, Plotly validators). Returns ms per step.
+    """
+    timings = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        fn()
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    # Warm-up work must not show up in request metrics
+    with metrics.collect():
+        step('services', build_services)
+        integral, math = get_service('integral'), get_service('math')
+
+        def compile_expressions():
+            import numpy as np
+            sample = np.linspace(0.5, 1.5, 8)
+            for text in COMMON_EXPRESSIONS:
+                integral.compile_function(text).func(sample)
+                math.compile_function(text).func(sample)
+        step('expressions', compile_expressions)
+
+        step('integration', lambda: integral.calculate_definite_integral('x**2', 0, 1))
+        step('matplotlib', lambda: get_service('integral_visualization').visualize_function('x**2', 0, 1))
+        step('plotly', lambda: get_service('volume_visualization').generate_3d_plot('x', 0, 1, 'x-axis', 1.0))
+    return timings
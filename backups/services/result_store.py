@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def approximate_size(value: Any) -> int:
+    """Bytes held by a stored value: arrays by their buffer, containers by their items"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultStore:
+    """
+    In-memory store of computed results addressable by id, so plots can
+    be rendered later (only if the client asks for them) from the same
+    inputs and numbers. Entries expire after `ttl` seconds and the
+    least recently used ones are dropped beyond `max_entries` or
+    `max_bytes`; an entry larger than `max_entry_bytes` is not kept.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 600.0,
+                 max_bytes: int = 256 * 2**20, max_entry_bytes: int = 32 * 2**20):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._entries:
+            result_id, entry = next(iter(self._entries.items()))
+            if (now - entry['touched'] <= self.ttl and len(self._entries) <= self.max_entries
+                    and self._bytes <= self.max_bytes):
+                break
+            self._entries.pop(result_id)
+            self._bytes -= entry['bytes']
+
+    def put(self, kind: str, params: Dict, result: Dict) -> Optional[str]:
+        """Store a result and return its id, or None if it is over max_entry_bytes"""
+        size = approximate_size(params) + approximate_size(result)
+        if size > self.max_entry_bytes:
+            with self._lock:
+                self.rejected += 1
+            return None
+        result_id = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self._entries[result_id] = {
+                'id': result_id,
+                'kind': kind,
+                'params': params,
+                'result': result,
+                'visualizations': {},
+                'touched': now,
+                'bytes': size
+            }
+            self._bytes += size
+            self._expire(now)
+        return result_id
+
+    def add_visualizations(self, entry: Dict, visualizations: Dict):
+        """Keep rendered plots on a stored entry, counted towards its size"""
+        size = approximate_size(visualizations)
+        with self._lock:
+            if self._entries.get(entry['id']) is not entry or entry['bytes'] + size > self.max_entry_bytes:
+                return
+            entry['visualizations'].update(visualizations)
+            entry['bytes'] += size
+            self._bytes += size
+            self._expire(time.monotonic())
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                entry['touched'] = now
+                self._entries.move_to_end(result_id)
+            return entry
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes,
+                'rejected': self.rejected,
+                'ttl_seconds': self.ttl
+            }
+
+
+result_store = ResultStore(
+    max_entries=int(os.environ.get('RESULT_STORE_MAX_ENTRIES', 1000)),
+    ttl=float(os.environ.get('RESULT_STORE_TTL', 600)),
+    max_bytes=int(os.environ.get('RESULT_STORE_MAX_BYTES', 256 * 2**20)),
+    max_entry_bytes=int(os.environ.get('RESULT_STORE_MAX_ENTRY_BYTES', 32 * 2**20))
+)
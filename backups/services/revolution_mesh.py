@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import Callable, NamedTuple, Tuple
+
+import numpy as np
+
+from services.metrics import record_size, span
+
+# Resolution multipliers over a renderer's own (profile, angular) point counts
+LEVELS_OF_DETAIL = {
+    'preview': 0.4,
+    'standard': 1.0,
+    'high': 3.0
+}
+DEFAULT_LOD = 'standard'
+MIN_PROFILE_POINTS = 8
+MIN_ANGULAR_POINTS = 8
+
+
+class RevolutionMesh(NamedTuple):
+    """Surface coordinates, each (angular, profile) float32 views of one buffer"""
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+
+
+def check_lod(lod: str) -> str:
+    lod = lod or DEFAULT_LOD
+    if lod not in LEVELS_OF_DETAIL:
+        raise ValueError(f"Unsupported level of detail: {lod}. Use one of: {', '.join(LEVELS_OF_DETAIL)}")
+    return lod
+
+
+def resolution(base: Tuple[int, int], lod: str = DEFAULT_LOD) -> Tuple[int, int]:
+    """(profile, angular) point counts for a renderer's standard resolution at this level"""
+    scale = LEVELS_OF_DETAIL[check_lod(lod)]
+    profile, angular = base
+    return (max(MIN_PROFILE_POINTS, round(profile * scale)),
+            max(MIN_ANGULAR_POINTS, round(angular * scale)))
+
+
+@lru_cache(maxsize=16)
+def trig_table(angular: int) -> Tuple[np.ndarray, np.ndarray]:
+    """cos and sin of `angular` angles over [0, 2π] as read-only float32 columns"""
+    theta = np.linspace(0, 2*np.pi, angular)
+    cos, sin = np.cos(theta).astype(np.float32)[:, None], np.sin(theta).astype(np.float32)[:, None]
+    cos.setflags(write=False)
+    sin.setflags(write=False)
+    return cos, sin
+
+
+def revolve(evaluate: Callable[[np.ndarray], np.ndarray], lower: float, upper: float,
+            axis: str = 'x-axis', base: Tuple[int, int] = (100, 50),
+            lod: str = DEFAULT_LOD) -> RevolutionMesh:
+    """
+    Surface swept by y = evaluate(x), x in [lower, upper], around the x-
+    or y-axis. Around x the profile value is the radius; around y, x is.
+    """
+    profile, angular = resolution(base, lod)
+    with span('viz.revolve'):
+        x = np.linspace(lower, upper, profile)
+        with np.errstate(all='ignore'):
+            y = np.broadcast_to(np.asarray(evaluate(x), dtype=np.float32), x.shape)
+        x = x.astype(np.float32)
+        axial, radius = (x, y) if axis == 'x-axis' else (y, x)
+        cos, sin = trig_table(angular)
+
+        buffer = np.empty((3, angular, profile), dtype=np.float32)
+        along, across, depth = (buffer[0], buffer[1], buffer[2]) if axis == 'x-axis' else (buffer[1], buffer[0], buffer[2])
+        along[...] = axial
+        np.multiply(cos, radius, out=across)
+        np.multiply(sin, radius, out=depth)
+    record_size('revolution_mesh', buffer.nbytes)
+    return RevolutionMesh(buffer[0], buffer[1], buffer[2])
@@ -0,0 +1,92 @@
+import struct
+from typing import Any, Dict
+
+import numpy as np
+import orjson
+
+# Results may carry NumPy arrays and scalars straight from the services.
+# Everywhere they leave the process (HTTP, streams, job records):
+#   - real arrays are written by orjson from their buffer, no Python lists
+#   - complex numbers are {"real": ..., "imag": ...}, element-wise in arrays
+#   - NaN and ±inf are null
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Binary form of a result for Accept: application/x-ndarrays (all little-endian):
+#   4 bytes   magic b'NDA1'
+#   uint32    length of the JSON header
+#   header    {"fields": <every non-array value>,
+#              "arrays": {name: {"dtype": "<f8" | "<c16", "shape": [...], "offset": n}}}
+#   padding   to a multiple of 8 bytes; offsets count from here
+#   data      each top-level array in C order, 8-byte aligned
+ARRAYS_MEDIA_TYPE = 'application/x-ndarrays'
+ARRAYS_MAGIC = b'NDA1'
+_ALIGN = 8
+
+_complex_elements = np.frompyfunc(lambda z: {'real': float(z.real), 'imag': float(z.imag)}, 1, 1)
+
+
+def _default(value: Any):
+    """orjson fallback for values it does not write natively"""
+    if isinstance(value, np.ndarray):
+        if np.iscomplexobj(value):
+            return _complex_elements(value).tolist()
+        if not value.flags.c_contiguous:
+            # Transposes and slices: orjson only reads C-contiguous buffers
+            return np.ascontiguousarray(value)
+        return value.tolist()
+    if isinstance(value, (complex, np.complexfloating)):
+        return {'real': float(value.real), 'imag': float(value.imag)}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes of a result, NumPy values included"""
+    return orjson.dumps(content, default=_default, option=JSON_OPTIONS)
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+def wants_arrays(accept: str) -> bool:
+    return ARRAYS_MEDIA_TYPE in (accept or '')
+
+
+def pack_arrays(content: Dict) -> bytes:
+    """
+    Binary form of a result: top-level numeric arrays as raw float64
+    (complex128 when complex) after a JSON header holding their shapes and
+    every other field
+    """
+    fields, arrays, chunks = {}, {}, []
+    offset = 0
+    for name, value in content.items():
+        if not (isinstance(value, np.ndarray) and value.ndim and value.dtype.kind in 'biufc'):
+            fields[name] = value
+            continue
+        data = np.ascontiguousarray(value, dtype='<c16' if value.dtype.kind == 'c' else '<f8')
+        arrays[name] = {'dtype': data.dtype.str, 'shape': list(data.shape), 'offset': offset}
+        chunks.append(data.tobytes())
+        offset += data.nbytes
+    header = dumps({'fields': fields, 'arrays': arrays})
+    prefix = ARRAYS_MAGIC + struct.pack('<I', len(header)) + header
+    prefix += b'\0' * (-len(prefix) % _ALIGN)
+    return prefix + b''.join(chunks)
+
+
+def unpack_arrays(payload: bytes) -> Dict:
+    """Inverse of pack_arrays, for Python clients: fields plus arrays as ndarrays"""
+    if payload[:4] != ARRAYS_MAGIC:
+        raise ValueError("Not an application/x-ndarrays payload")
+    (length,) = struct.unpack_from('<I', payload, 4)
+    header = loads(payload[8:8 + length])
+    start = 8 + length
+    start += -start % _ALIGN
+    content = header['fields']
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        content[name] = np.frombuffer(payload, dtype, count, start + spec['offset']).reshape(spec['shape'])
+    return content
@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from services.metrics import COALESCED_REQUESTS
+
+
+def request_key(*parts: Any) -> str:
+    """Stable hash of JSON-compatible parts (route, validated body, ...), key order ignored"""
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class SingleFlight:
+    """
+    Deduplicates identical concurrent computations: the first caller for a
+    key starts the computation as its own task, callers arriving while it
+    runs await that task, and all receive its result or exception. Nothing
+    is kept once it finishes, so later calls compute afresh.
+    A caller that goes away does not cancel the computation for the rest.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.counters = {'computed': 0, 'shared': 0}
+
+    def _finished(self, key: str, flight: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieved here so an error nobody awaited anymore is not logged as lost
+        if not flight.cancelled():
+            flight.exception()
+
+    async def do(self, key: str, compute: Callable[[], Awaitable], route: str = '') -> Tuple[Any, bool]:
+        """Result of compute() for this key and whether it was shared with an earlier caller"""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if not shared:
+            flight = self._flights[key] = asyncio.ensure_future(compute())
+            flight.add_done_callback(lambda done: self._finished(key, done))
+        self.counters['shared' if shared else 'computed'] += 1
+        COALESCED_REQUESTS.inc((route, 'shared' if shared else 'computed'))
+        return await asyncio.shield(flight), shared
+
+    def stats(self) -> Dict:
+        total = self.counters['computed'] + self.counters['shared']
+        return {
+            'in_flight': len(self._flights),
+            **self.counters,
+            'saved_ratio': round(self.counters['shared'] / total, 4) if total else 0.0
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,96 @@
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _BudgetExpired(BaseException):
+    """
+    Raised from the SIGALRM handler. Derives from BaseException so that
+    `except Exception` blocks inside SymPy cannot swallow it.
+    """
+    def __init__(self, token):
+        super().__init__()
+        self.token = token
+
+
+def _can_use_alarm() -> bool:
+    return (hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread())
+
+
+@contextmanager
+def time_limit(seconds: float):
+    """
+    Interrupt the enclosed block with TimeoutError after `seconds`.
+
+    Uses an interval timer, so it only works on the main thread of a
+    POSIX process (which is where the event loop and the process-pool
+    workers run). Elsewhere the block runs without a limit; use
+    run_with_budget() when the caller must stop waiting regardless.
+    Nested limits are supported: the outer deadline is re-armed on exit.
+    """
+    if not seconds or seconds <= 0 or not _can_use_alarm():
+        yield
+        return
+
+    token = object()
+    now = time.monotonic()
+    deadline = now + seconds
+
+    previous_handler = signal.getsignal(signal.SIGALRM)
+    previous_remaining = signal.getitimer(signal.ITIMER_REAL)[0]
+    previous_deadline = now + previous_remaining if previous_remaining else None
+
+    def handler(signum, frame):
+        if previous_deadline is not None and time.monotonic() >= previous_deadline and callable(previous_handler):
+            # The enclosing limit expired first, let it fire
+            previous_handler(signum, frame)
+        raise _BudgetExpired(token)
+
+    effective = deadline if previous_deadline is None else min(deadline, previous_deadline)
+    signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, max(effective - now, 1e-3))
+    try:
+        yield
+    except _BudgetExpired as exc:
+        if exc.token is not token:
+            raise
+        raise TimeoutError(f"Exceeded time budget of {seconds}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+        if previous_deadline is not None:
+            signal.setitimer(signal.ITIMER_REAL, max(previous_deadline - time.monotonic(), 1e-3))
+
+
+def run_with_budget(fn, seconds: float):
+    """
+    Call fn() and raise TimeoutError if it runs longer than `seconds`.
+
+    On the main thread the call is interrupted. On other threads it is
+    moved to a daemon thread and abandoned on timeout (Python threads
+    cannot be killed), so the caller is freed but the CPU is not.
+    """
+    if not seconds or seconds <= 0:
+        return fn()
+    if _can_use_alarm():
+        with time_limit(seconds):
+            return fn()
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = fn()
+        except BaseException as exc:
+            outcome['error'] = exc
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(seconds)
+    if worker.is_alive():
+        raise TimeoutError(f"Exceeded time budget of {seconds}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
@@ -1,10 +1,16 @@
 import numpy as np
+from typing import Dict, Optional
 import plotly.graph_objects as go
 from services.math_service import MathService
+from services.figure_cache import figure_cache
+from services.metrics import record_size, span, timed
+from services.plot_data import compact_figure
+from services.revolution_mesh import DEFAULT_LOD, revolve
 
 class VisualizationService:
-    def __init__(self):
-        self.math_service = MathService()
+    def __init__(self, math_service: Optional[MathService] = None):
+        # Share the caller's (singleton) service instead of building another
+        self.math_service = math_service or MathService()
     
     def generate_plot(self, func_str: str, a: float, b: float, axis: str, volume: float) -> dict:
         """Generate both 2D and 3D visualizations"""
@@ -16,11 +22,16 @@ class VisualizationService:
             'plot_3d': plot_3d
         }
     
-    def generate_2d_plot(self, func_str: str, a: float, b: float, axis: str) -> str:
-        """Generate 2D plot of the function using Plotly"""
+    @timed('viz.generate_2d_plot')
+    @figure_cache.cached
+    def generate_2d_plot(self, func_str: str, a: float, b: float, axis: str,
+            plot_data: Optional[Dict] = None) -> str:
+        """
+        Generate 2D plot of the function using Plotly
+        plot_data: compact_figure() options for data-only output
+        """
         try:
-            x = np.linspace(a, b, 500)
-            y = self.math_service.evaluate_function(func_str, x)
+            x, y = self.math_service.sample_function(func_str, a, b)
             
             # Create Plotly figure for 2D
             fig = go.Figure()
@@ -52,40 +63,36 @@ class VisualizationService:
                 height=500
             )
             
+            if plot_data is not None:
+                return compact_figure(fig, **plot_data)
+            
             # Convert to JSON
-            plotly_json = fig.to_json()
+            with span('viz.encode_plotly'):
+                plotly_json = fig.to_json()
+            record_size('plotly_json', len(plotly_json))
             
             return plotly_json
         except Exception as e:
             raise ValueError(f"Error generating 2D plot: {str(e)}")
     
-    def generate_3d_plot(self, func_str: str, a: float, b: float, axis: str, volume: float) -> str:
-        """Generate 3D plot of solid of revolution using Plotly"""
+    @timed('viz.generate_3d_plot')
+    @figure_cache.cached
+    def generate_3d_plot(self, func_str: str, a: float, b: float, axis: str, volume: float,
+            lod: str = DEFAULT_LOD, plot_data: Optional[Dict] = None) -> str:
+        """
+        Generate 3D plot of solid of revolution using Plotly
+        lod: mesh level of detail (preview, standard, high)
+        plot_data: compact_figure() options for data-only output
+        """
         try:
-            # Generate the solid of revolution
-            x_vals = np.linspace(a, b, 100)
-            y_vals = self.math_service.evaluate_function(func_str, x_vals)
-            
-            # Create rotation surface
-            theta = np.linspace(0, 2*np.pi, 50)
-            
-            if axis == "x-axis":
-                # Rotate around x-axis
-                X, Theta = np.meshgrid(x_vals, theta)
-                R = np.outer(np.ones(len(theta)), y_vals)
-                Y = R * np.cos(Theta)
-                Z = R * np.sin(Theta)
-            else:
-                # Rotate around y-axis (shell method visualization)
-                Y, Theta = np.meshgrid(y_vals, theta)
-                R = np.outer(np.ones(len(theta)), x_vals)
-                X = R * np.cos(Theta)
-                Z = R * np.sin(Theta)
+            # Generate the solid of revolution (around y-axis: shell method visualization)
+            f = lambda x: self.math_service.evaluate_function(func_str, x)
+            mesh = revolve(f, a, b, axis, base=(100, 50), lod=lod)
             
             # Create Plotly figure
             fig = go.Figure(data=[
                 go.Surface(
-                    x=X, y=Y, z=Z,
+                    x=mesh.x, y=mesh.y, z=mesh.z,
                     colorscale='Viridis',
                     showscale=False,
                     opacity=0.9
@@ -104,8 +111,13 @@ class VisualizationService:
                 height=600
             )
             
+            if plot_data is not None:
+                return compact_figure(fig, **plot_data)
+            
             # Convert to JSON
-            plotly_json = fig.to_json()
+            with span('viz.encode_plotly'):
+                plotly_json = fig.to_json()
+            record_size('plotly_json', len(plotly_json))
             
             return plotly_json
             
@@ -0,0 +1,111 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+import main
+
+
+class FakeExecutor:
+    """Stands in for executor.run_cpu: outcome and delay per mode"""
+
+    def __init__(self, **outcomes):
+        self.outcomes = outcomes
+        self.calls = []
+
+    async def run_cpu(self, service, method, *args, mode, symbolic_budget=None):
+        self.calls.append(mode)
+        delay, outcome = self.outcomes[mode]
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {**outcome, 'mode': mode}
+
+
+def run(fake, mode='auto', monkeypatch=None, budget=0.5):
+    """calculate_in_mode with the fake executor; returns (result or error, seconds, unretrieved errors)"""
+    monkeypatch.setattr(main, 'executor', fake)
+    monkeypatch.setattr(main, 'AUTO_SYMBOLIC_BUDGET', budget)
+    unretrieved = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        started = time.perf_counter()
+        try:
+            outcome = await main.calculate_in_mode('service', 'calculate_definite_integral', mode, 'x', 0, 1)
+        except Exception as e:
+            # Without the traceback the frame (and its tasks) can be collected
+            outcome = e.with_traceback(None)
+        elapsed = time.perf_counter() - started
+        # Let the symbolic task finish, then make sure nothing was left unretrieved
+        await asyncio.sleep(0.4)
+        gc.collect()
+        return outcome, elapsed
+
+    outcome, elapsed = asyncio.run(scenario())
+    return outcome, elapsed, unretrieved
+
+
+NUMERIC = {'numerical_value': 0.5, 'symbolic_result': None}
+SYMBOLIC = {'numerical_value': 0.5, 'symbolic_result': '1/2'}
+
+
+@pytest.mark.parametrize('mode', ['numeric', 'symbolic'])
+def test_single_modes_run_one_calculation(monkeypatch, mode):
+    fake = FakeExecutor(numeric=(0, NUMERIC), symbolic=(0, SYMBOLIC))
+    result, _, _ = run(fake, mode, monkeypatch)
+    assert result['mode'] == mode
+    assert fake.calls == [mode]
+
+
+def test_auto_attaches_symbolic_arriving_within_budget(monkeypatch):
+    fake = FakeExecutor(numeric=(0.01, NUMERIC), symbolic=(0.1, SYMBOLIC))
+    result, elapsed, _ = run(fake, 'auto', monkeypatch, budget=0.5)
+    assert result == {**SYMBOLIC, 'mode': 'auto', 'symbolic_status': 'completed'}
+    assert elapsed < 0.3
+
+
+def test_auto_returns_numeric_at_the_deadline(monkeypatch):
+    fake = FakeExecutor(numeric=(0.01, NUMERIC), symbolic=(0.3, ValueError('too slow anyway')))
+    result, elapsed, unretrieved = run(fake, 'auto', monkeypatch, budget=0.1)
+    assert result == {**NUMERIC, 'mode': 'auto', 'symbolic_status': 'pending'}
+    assert 0.09 < elapsed < 0.25
+    assert unretrieved == []
+
+
+def test_auto_attaches_symbolic_when_already_done(monkeypatch):
+    fake = FakeExecutor(numeric=(0.05, NUMERIC), symbolic=(0.0, SYMBOLIC))
+    result, _, _ = run(fake, 'auto', monkeypatch)
+    assert result == {**SYMBOLIC, 'mode': 'auto', 'symbolic_status': 'completed'}
+
+
+def test_auto_reports_failed_symbolic(monkeypatch):
+    fake = FakeExecutor(numeric=(0.05, NUMERIC), symbolic=(0.0, ValueError('no closed form')))
+    result, _, unretrieved = run(fake, 'auto', monkeypatch)
+    assert result['symbolic_status'] == 'failed'
+    assert result['numerical_value'] == 0.5
+    assert unretrieved == []
+
+
+def test_auto_falls_back_to_symbolic_when_numeric_fails(monkeypatch):
+    fake = FakeExecutor(numeric=(0.0, ValueError('did not converge')), symbolic=(0.1, SYMBOLIC))
+    result, _, _ = run(fake, 'auto', monkeypatch)
+    assert result['symbolic_status'] == 'completed'
+    assert result['symbolic_result'] == '1/2'
+
+
+def test_auto_raises_numeric_error_when_symbolic_misses_budget(monkeypatch):
+    fake = FakeExecutor(numeric=(0.0, ValueError('did not converge')), symbolic=(0.3, SYMBOLIC))
+    error, elapsed, unretrieved = run(fake, 'auto', monkeypatch, budget=0.1)
+    assert isinstance(error, ValueError)
+    assert elapsed < 0.25
+    assert unretrieved == []
+
+
+@pytest.mark.parametrize('error', [main.ExecutorError('busy'), RuntimeError('unexpected')])
+def test_auto_handles_symbolic_whatever_numeric_raises(monkeypatch, error):
+    fake = FakeExecutor(numeric=(0.0, error), symbolic=(0.1, ValueError('no closed form')))
+    outcome, _, unretrieved = run(fake, 'auto', monkeypatch)
+    assert outcome is error
+    assert unretrieved == []
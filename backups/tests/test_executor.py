@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from services.executor import ExecutorError, TaskExecutor, TaskTimeout
+from worker_probe import Probe
+
+
+def run(coroutine_function, **options):
+    """Run coroutine_function(executor) against a fresh process executor"""
+    async def main():
+        executor = TaskExecutor(**{'process_workers': 2, 'task_timeout': 10.0, **options})
+        executor.KILL_GRACE_SECONDS = 0.5
+        executor.start()
+        try:
+            return await coroutine_function(executor), executor.stats()
+        finally:
+            executor.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_stuck_task_kills_only_its_worker():
+    async def scenario(executor):
+        stuck = executor.run_cpu(Probe, 'stuck', 30, timeout=0.5)
+        healthy = executor.run_cpu(Probe, 'sleep', 2.0)
+        outcomes = await asyncio.gather(stuck, healthy, return_exceptions=True)
+        # The killed worker was replaced
+        pids = await asyncio.gather(*(executor.run_cpu(Probe, 'pid') for _ in range(2)))
+        return outcomes, pids
+
+    (outcomes, pids), stats = run(scenario)
+    assert isinstance(outcomes[0], TaskTimeout)
+    assert isinstance(outcomes[1], int)
+    assert all(isinstance(pid, int) for pid in pids)
+    assert stats['workers_killed'] == 1
+    assert stats['idle_workers'] == 2
+
+
+def test_crashed_worker_fails_only_its_task():
+    async def scenario(executor):
+        crash = executor.run_cpu(Probe, 'crash')
+        healthy = executor.run_cpu(Probe, 'sleep', 1.0)
+        outcomes = await asyncio.gather(crash, healthy, return_exceptions=True)
+        return outcomes, await executor.run_cpu(Probe, 'pid')
+
+    (outcomes, pid), stats = run(scenario)
+    assert isinstance(outcomes[0], ExecutorError)
+    assert isinstance(outcomes[1], int)
+    assert isinstance(pid, int)
+
+
+def test_tasks_wait_for_an_idle_worker():
+    async def scenario(executor):
+        return await asyncio.gather(*(executor.run_cpu(Probe, 'sleep', 0.2) for _ in range(4)))
+
+    pids, stats = run(scenario, process_workers=1)
+    assert len(set(pids)) == 1
+    assert stats['completed'] == 4
+
+
+def test_workers_recycled_after_max_tasks_per_child():
+    async def scenario(executor):
+        return [await executor.run_cpu(Probe, 'pid') for _ in range(5)]
+
+    pids, stats = run(scenario, process_workers=1, max_tasks_per_child=2)
+    assert len(set(pids)) == 3
+    assert stats['recycles'] == 2
+
+
+def test_queue_limit():
+    async def scenario(executor):
+        return await asyncio.gather(*(executor.run_cpu(Probe, 'sleep', 0.5) for _ in range(3)),
+                                    return_exceptions=True)
+
+    outcomes, stats = run(scenario, process_workers=1, max_queue=2)
+    assert sum(isinstance(outcome, ExecutorError) for outcome in outcomes) == 1
+    assert stats['rejected'] == 1
@@ -0,0 +1,121 @@
+import math
+import re
+
+import numpy as np
+import pytest
+import sympy as sp
+
+from services.expression_parser import (MAX_DEPTH, MAX_EXPRESSION_LENGTH, MAX_NESTING, canonical_expression,
+                                        compile_numpy, parse_expression, to_sympy)
+
+x = sp.Symbol('x')
+
+
+def evaluate(function, at):
+    return float(compile_numpy(parse_expression(function))(np.array([at]))[0])
+
+
+@pytest.mark.parametrize('function, at, expected', [
+    ('1 + 2*3', 0, 7.0),
+    ('(1 + 2)*3', 0, 9.0),
+    ('-x**2', 3, -9.0),
+    ('2**3**2', 0, 512.0),
+    ('2^3^2', 0, 512.0),
+    ('8/4/2', 0, 1.0),
+    ('10 - 4 - 3', 0, 3.0),
+    ('√x**2', 3, 3.0),
+    ('√4*x', 3, 6.0),
+    ('+x - -x', 2, 4.0),
+    ('2.5e-1 + .5 + 1.', 0, 1.75),
+    ('pi + π + e + E', 0, 2 * math.pi + 2 * math.e),
+    ('log(8, 2)', 0, 3.0),
+    ('ln(e) + log10(100) + abs(-x)', 4, 7.0),
+    ('sin(x)**2 + cos(x)**2', 0.7, 1.0),
+])
+def test_grammar(function, at, expected):
+    assert evaluate(function, at) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('function', ['x**2*sin(x)', '-x**2', '2**3**2 + x', 'log(x, 2)', '√x + 1/x'])
+def test_sympy_matches_sympify(function):
+    assert to_sympy(parse_expression(function), x) == sp.sympify(function.replace('√x', 'sqrt(x)'))
+
+
+def test_constant_function_keeps_shape():
+    values = compile_numpy(parse_expression('2*pi'))(np.zeros(4))
+    assert values.shape == (4,)
+    assert np.all(values == 2 * np.pi)
+
+
+@pytest.mark.parametrize('function, message', [
+    ('y', "Unknown name 'y' at position 0"),
+    ('x + foo(x)', "Unknown name 'foo' at position 4"),
+    ('__import__(x)', "Unknown name '__import__'"),
+    ('__import__("os")', "Unexpected character '\"'"),
+    ('exec', "Unknown name 'exec'"),
+    ('x.real', "Unexpected character '.'"),
+    ('x; 1', "Unexpected character ';'"),
+    ('x[0]', "Unexpected character '['"),
+    ('lambda + 1', "Unknown name 'lambda'"),
+])
+def test_rejects_unknown_names_and_characters(function, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_expression(function)
+
+
+@pytest.mark.parametrize('function, message', [
+    ('', 'empty'),
+    ('   ', 'empty'),
+    ('x**', 'Unexpected end of expression at position 3'),
+    ('(x + 1', "Expected ')'"),
+    ('x x', "Unexpected 'x' at position 2"),
+    ('sin(x, 2)', 'takes one argument'),
+    ('log(x, 2, 3)', 'takes 1 to 2 arguments'),
+    ('sin x', "Expected '(' at position 4, found 'x'"),
+    ('(' * (MAX_NESTING + 1) + 'x' + ')' * (MAX_NESTING + 1), 'nested too deeply'),
+    ('x+' * MAX_EXPRESSION_LENGTH + 'x', 'longer than'),
+])
+def test_rejects_malformed_expressions(function, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_expression(function)
+
+
+@pytest.mark.parametrize('op', ['+', '-', '*', '/'])
+def test_long_chains_are_refused_before_recursing(op):
+    # Left-associative chains deepen the tree without nesting
+    with pytest.raises(ValueError, match='nested too deeply'):
+        parse_expression(f'x{op}' * 499 + 'x')
+    text = f'x{op}' * (MAX_DEPTH - 1) + 'x'
+    tree = parse_expression(text)
+    assert compile_numpy(canonical_expression(text).tree)(np.array([1.5])).shape == (1,)
+    assert to_sympy(tree, x) is not None
+
+
+def test_huge_exact_power_is_refused():
+    tree = parse_expression('9**9**9')
+    with pytest.raises(ValueError, match='Exponent 387420489 is too large'):
+        to_sympy(tree, x)
+    with np.errstate(over='ignore'):
+        assert evaluate('9**9**9', 0) == math.inf
+
+
+def test_moderate_exact_power_is_kept():
+    assert to_sympy(parse_expression('2**100'), x) == sp.Integer(2)**100
+    assert to_sympy(parse_expression('x**100000'), x) == x**100000
+
+
+@pytest.mark.parametrize('left, right', [
+    ('x^2', 'x**2'),
+    ('x*x', 'x**2'),
+    ('sqrt(x)', '√x'),
+    ('2*x + 1', '1 + x*2'),
+    ('x ** 2 * sin(x)', 'sin(x)*x^2'),
+])
+def test_spellings_share_canonical_form(left, right):
+    assert canonical_expression(left).key == canonical_expression(right).key
+    assert canonical_expression(left).text == canonical_expression(right).text
+
+
+def test_different_expressions_have_different_keys():
+    assert canonical_expression('x**2').key != canonical_expression('x**3').key
+    assert canonical_expression('x - 1').key != canonical_expression('1 - x').key
@@ -0,0 +1,26 @@
+import pytest
+
+from services.integral_service import IntegralService
+
+
+@pytest.fixture(scope='module')
+def service():
+    return IntegralService()
+
+
+def test_divergent_item_fails_even_with_an_antiderivative(service):
+    outcome = service.calculate_definite_integral_batch(['1/x**2'], [(-1, 1), (1, 2)])
+    divergent, finite = outcome['results']
+    assert not divergent['success']
+    assert 'not finite' in divergent['error']
+    assert finite['success']
+    assert finite['numerical_value'] == pytest.approx(0.5)
+    assert finite['method'] == 'antiderivative'
+
+
+def test_batch_matches_single_integrals(service):
+    outcome = service.calculate_definite_integral_batch(['x**2', 'sin(x)'], [(0, 3), (0, 1)])
+    for item in outcome['results']:
+        single = service.calculate_definite_integral(item['function'], *item['bounds'].values())
+        assert item['success']
+        assert item['numerical_value'] == pytest.approx(single['numerical_value'], abs=1e-6)
@@ -0,0 +1,49 @@
+import pytest
+import sympy as sp
+
+from services import integration_cache as module
+from services.integration_cache import IntegrationCache, IntegrationFailed
+
+x = sp.Symbol('x')
+
+
+@pytest.fixture
+def failing_integrate(monkeypatch):
+    calls = []
+
+    def integrate(*args):
+        calls.append(args)
+        raise NotImplementedError('no rule for this integrand')
+
+    monkeypatch.setattr(module.sp, 'integrate', integrate)
+    return calls
+
+
+def test_failure_is_cached_as_tombstone(failing_integrate):
+    cache = IntegrationCache(time_budget=1.0)
+    for _ in range(3):
+        with pytest.raises(IntegrationFailed, match='no rule for this integrand'):
+            cache.antiderivative(x**2, x)
+    assert len(failing_integrate) == 1
+    stats = cache.stats()
+    assert stats['tombstones'] == 1
+    assert stats['hits'] == 2
+
+
+def test_failure_is_a_value_error(failing_integrate):
+    cache = IntegrationCache(time_budget=1.0)
+    with pytest.raises(ValueError):
+        cache.definite(x, x, 0, 1, budget=0.5)
+    with pytest.raises(ValueError):
+        cache.definite(x, x, 0, 1)
+    assert len(failing_integrate) == 1
+
+
+def test_results_and_no_closed_form_are_cached():
+    cache = IntegrationCache(time_budget=5.0)
+    assert cache.antiderivative(x**2, x) == x**3 / 3
+    assert cache.antiderivative(x**2, x) == x**3 / 3
+    assert cache.antiderivative(x**x, x).has(sp.Integral)
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['tombstones'] == 1
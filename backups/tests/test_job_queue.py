@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.executor import ExecutorBusy
+from services.job_queue import DirectoryJobStore, JobQueue, JobStore, MemoryJobStore
+
+
+def record(job_id, status='queued', finished_at=None, **fields):
+    return {'id': job_id, 'status': status, 'finished_at': finished_at, 'version': 0, **fields}
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
+
+    class Incomplete(JobStore):
+        def put(self, job):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_memory_store_evicts_oldest_finished_jobs_only():
+    store = MemoryJobStore(max_entries=3)
+    now = time.time()
+    store.put(record('running', status='running'))
+    store.put(record('done-1', status='succeeded', finished_at=now))
+    store.put(record('done-2', status='failed', finished_at=now))
+    store.put(record('queued'))
+
+    assert store.get('running') is not None
+    assert store.get('done-1') is None
+    assert store.get('done-2') is not None
+    assert store.get('queued') is not None
+
+
+def test_memory_store_refuses_new_jobs_when_all_are_unfinished():
+    store = MemoryJobStore(max_entries=2)
+    store.put(record('a'))
+    store.put(record('b', status='running'))
+    with pytest.raises(ExecutorBusy):
+        store.put(record('c'))
+    # Updates of jobs already stored always go through
+    store.put(record('a', status='running'))
+    assert store.get('a')['status'] == 'running'
+    assert store.stats()['entries'] == 2
+
+
+def test_memory_store_expires_finished_jobs_after_ttl():
+    store = MemoryJobStore(max_entries=10, ttl=60)
+    store.put(record('old', status='succeeded', finished_at=time.time() - 120))
+    store.put(record('live', status='running'))
+    assert store.get('old') is None
+    assert store.get('live') is not None
+
+
+def test_directory_store_round_trip(tmp_path):
+    store = DirectoryJobStore(str(tmp_path))
+    job_id = 'ab' * 16
+    store.put(record(job_id, status='succeeded', finished_at=1.0,
+                     result={'inverse': np.eye(2), 'eigenvalues': np.array([1j, -1j])}))
+    job = store.get(job_id)
+    assert job['result']['inverse'] == [[1.0, 0.0], [0.0, 1.0]]
+    assert job['result']['eigenvalues'] == [{'real': 0.0, 'imag': 1.0}, {'real': 0.0, 'imag': -1.0}]
+    assert store.get('../etc/passwd') is None
+    assert store.get('cd' * 16) is None
+    assert store.stats()['entries'] == 1
+
+
+@pytest.mark.parametrize('service, method', [
+    ('integral', 'parse_function'),
+    ('integral', 'compile_function'),
+    ('integral', 'evaluate_function'),
+    ('linear_algebra', 'parse_matrix'),
+    ('math', '__init__'),
+    ('math', 'calculate_definite_integral'),
+    ('volume_visualization', 'create_2d_plot'),
+])
+def test_submit_rejects_methods_outside_the_allowlist(service, method):
+    queue = JobQueue(MemoryJobStore(), workers=0)
+    with pytest.raises(ValueError):
+        queue.submit(service, method, [], {})
+
+
+def test_submit_queues_allowed_methods():
+    async def submit():
+        queue = JobQueue(MemoryJobStore(), workers=0, max_queued=1)
+        queue.start()
+        job = queue.submit('integral', 'calculate_definite_integral', ['x**2', 0, 1], {})
+        with pytest.raises(ExecutorBusy):
+            queue.submit('algebra', 'solve_linear', [1, 2], {})
+        return job, queue.stats()
+
+    job, stats = asyncio.run(submit())
+    assert job['status'] == 'queued'
+    assert job['position'] == 0
+    assert stats['rejected'] == 1
+
+
+def test_submit_refused_when_store_is_full_of_live_jobs():
+    async def submit():
+        queue = JobQueue(MemoryJobStore(max_entries=1), workers=0)
+        queue.start()
+        queue.submit('math', 'calculate_volume', ['x', 0, 1], {})
+        with pytest.raises(ExecutorBusy):
+            queue.submit('math', 'calculate_volume', ['x', 0, 2], {})
+        return queue.stats()
+
+    assert asyncio.run(submit())['rejected'] == 1
+
+
+class FakeExecutor:
+    """Stands in for executor.run_cpu in the job consumers"""
+
+    async def run_cpu(self, service, method, *args, timeout=None, **kwargs):
+        await asyncio.sleep(0.01)
+        return {'service': service.name, 'method': method, 'args': list(args)}
+
+
+def test_job_routes_run_a_job_through_the_app(monkeypatch):
+    import httpx
+
+    import main
+    from services import job_queue as module
+
+    queue = JobQueue(MemoryJobStore(), workers=1)
+    monkeypatch.setattr(module, 'executor', FakeExecutor())
+    monkeypatch.setattr(main, 'job_queue', queue)
+    submit = queue.submit
+
+    def submit_on_loop(*args):
+        # A sync route would run this in a worker thread, and the job would never start
+        assert threading.current_thread() is threading.main_thread()
+        return submit(*args)
+
+    monkeypatch.setattr(queue, 'submit', submit_on_loop)
+
+    async def scenario():
+        queue.start()
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                response = await client.post('/api/jobs', json={
+                    'service': 'integral', 'method': 'calculate_definite_integral', 'args': ['x**2', 0, 1]
+                })
+                assert response.status_code == 202, response.text
+                status_url = response.json()['status_url']
+                for _ in range(100):
+                    job = (await client.get(status_url)).json()
+                    if job['status'] in ('succeeded', 'failed'):
+                        return job
+                    await asyncio.sleep(0.01)
+                return job
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario(), debug=True)
+    assert job['status'] == 'succeeded'
+    assert job['result'] == {'service': 'integral', 'method': 'calculate_definite_integral',
+                             'args': ['x**2', 0, 1]}
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from services import quadrature
+from services.expression_parser import compile_numpy, parse_expression
+
+
+def integrate(function, lower, upper):
+    return quadrature.integrate(compile_numpy(parse_expression(function)), lower, upper)
+
+
+@pytest.mark.parametrize('function, lower, upper, expected', [
+    ('x**2', 0, 3, 9.0),
+    ('sin(x)', 0, math.pi, 2.0),
+    ('sin(50*x)', 0, 2, (1 - math.cos(100)) / 50),
+    ('sqrt(1 - x**2)', -1, 1, math.pi / 2),
+    ('x**2', 3, 0, -9.0),
+    ('x', 2, 2, 0.0),
+])
+def test_smooth_integrands(function, lower, upper, expected):
+    outcome = integrate(function, lower, upper)
+    assert outcome['converged']
+    assert outcome['value'] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('function, lower, upper, expected', [
+    ('exp(-x)', 0, 10000, 1.0),
+    ('exp(x)', -10000, 0, 1.0),
+    ('exp(-((x - 2500)/10)**2)', 0, 10000, 10 * math.sqrt(math.pi)),
+    ('1/(1 + (x - 300)**2)', 0, 10000, math.atan(9700) + math.atan(300)),
+])
+def test_narrow_peak_on_wide_interval(function, lower, upper, expected):
+    outcome = integrate(function, lower, upper)
+    assert outcome['converged']
+    assert outcome['value'] == pytest.approx(expected, rel=1e-8)
+
+
+@pytest.mark.parametrize('function, lower, upper, expected', [
+    ('x**(-0.9)', 0, 1, 10.0),
+    ('1/sqrt(x)', 0, 1, 2.0),
+    ('log(x)', 0, 1, -1.0),
+    ('log(x)/sqrt(x)', 0, 1, -4.0),
+    ('1/sqrt(1 - x)', 0, 1, 2.0),
+])
+def test_integrable_endpoint_singularities(function, lower, upper, expected):
+    outcome = integrate(function, lower, upper)
+    assert outcome['converged'], quadrature.failure_message(outcome)
+    assert outcome['value'] == pytest.approx(expected, rel=1e-7)
+
+
+@pytest.mark.parametrize('function, lower, upper', [
+    ('1/x', 0, 1),
+    ('x**(-1.01)', 0, 1),
+    ('1/x**2', -1, 1),
+    ('1/x', -1, 1),
+    ('tan(x)', 0, 2),
+])
+def test_divergent_integrals_do_not_converge(function, lower, upper):
+    assert not integrate(function, lower, upper)['converged']
+
+
+def test_non_real_integrand_reports_singular_points():
+    outcome = integrate('sqrt(x)', -1, 0)
+    assert not outcome['converged']
+    assert outcome['singular_points']
+    assert 'not finite' in quadrature.failure_message(outcome)
+
+
+def test_many_intervals_at_once():
+    func = compile_numpy(parse_expression('x**(-0.9)'))
+    result = quadrature.integrate_intervals(func, [0, 0, 1], [1, 2, 2])
+    assert result.converged.all()
+    np.testing.assert_allclose(result.value, [10, 10 * 2 ** 0.1, 10 * (2 ** 0.1 - 1)], rtol=1e-7)
+
+
+def test_check_mode():
+    assert quadrature.check_mode('numeric') == 'numeric'
+    with pytest.raises(ValueError):
+        quadrature.check_mode('fast')
@@ -0,0 +1,65 @@
+import pytest
+from pydantic import ValidationError
+
+import main
+
+BOUNDS = {'lower_bound': 0, 'upper_bound': 1}
+FUNCTION_MODELS = [
+    (main.VolumeRequest, BOUNDS),
+    (main.IndefiniteIntegralRequest, {}),
+    (main.DefiniteIntegralRequest, BOUNDS),
+    (main.CalculationModeRequest, BOUNDS),
+    (main.RiemannRequest, BOUNDS),
+    (main.Visualize3DRequest, BOUNDS),
+    (main.IntegralStepsRequest, {}),
+]
+
+
+@pytest.mark.parametrize('model, fields', FUNCTION_MODELS)
+@pytest.mark.parametrize('function', ['', '   ', 'foo(', 'y + 1', '__import__("os")', 'x +', 'x+' * 499 + 'x'])
+def test_invalid_functions_fail_validation(model, fields, function):
+    with pytest.raises(ValidationError):
+        model(function=function, **fields)
+
+
+@pytest.mark.parametrize('function', ['', 'x +', 'sin(y)'])
+def test_invalid_batch_functions_fail_validation(function):
+    with pytest.raises(ValidationError):
+        main.DefiniteIntegralBatchRequest(functions=['x**2', function], bounds=[{'lower': 0, 'upper': 1}])
+
+
+@pytest.mark.parametrize('model, fields', FUNCTION_MODELS)
+def test_valid_functions_pass(model, fields):
+    model(function='e^x + sqrt(x)', **fields)
+
+
+def test_validate_endpoint_model_accepts_anything():
+    assert main.FunctionValidationRequest(function='foo(').function == 'foo('
+
+
+def test_validators_keep_the_submitted_text():
+    request = main.DefiniteIntegralRequest(function=' x * x ', **BOUNDS)
+    assert request.function == ' x * x '
+    assert main.canonical_params(request.model_dump())['function'] == 'x**2'
+
+
+def test_equivalent_spellings_share_canonical_params():
+    spellings = ['x^2', 'x**2', ' x * x ']
+    params = {main.request_key(main.canonical_params({'function': f, **BOUNDS})) for f in spellings}
+    assert len(params) == 1
+
+
+def test_echo_functions_restores_the_callers_text():
+    computed = {'original_function': 'x^2', 'function': 'x^2', 'numerical_value': 1.0}
+    request = main.DefiniteIntegralRequest(function='x*x', **BOUNDS)
+    assert main.echo_functions(computed, request) == {
+        'original_function': 'x*x', 'function': 'x*x', 'numerical_value': 1.0
+    }
+    assert computed['function'] == 'x^2'
+
+
+def test_echo_functions_in_batch_results():
+    request = main.DefiniteIntegralBatchRequest(functions=['x^2', 'x*x'], bounds=[{'lower': 0, 'upper': 1}])
+    computed = {'results': [{'function_index': i, 'function': 'x**2'} for i in range(2)]}
+    echoed = main.echo_functions(computed, request)
+    assert [item['function'] for item in echoed['results']] == ['x^2', 'x*x']
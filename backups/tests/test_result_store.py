@@ -0,0 +1,58 @@
+import numpy as np
+
+import main
+from services.result_store import ResultStore, approximate_size
+
+MB = 2**20
+
+
+def test_arrays_are_sized_by_their_buffer():
+    assert approximate_size(np.zeros((100, 100))) == 80000
+    assert approximate_size({'matrix': np.zeros(1000)}) > 8000
+    assert approximate_size([[1.0] * 100] * 10) > 8000
+
+
+def test_oversized_entry_is_not_kept():
+    store = ResultStore(max_bytes=10 * MB, max_entry_bytes=MB)
+    assert store.put('inverse', {'matrix': np.zeros((512, 512))}, {}) is None
+    assert store.put('inverse', {'matrix': np.zeros((16, 16))}, {}) is not None
+    stats = store.stats()
+    assert stats['entries'] == 1
+    assert stats['rejected'] == 1
+
+
+def test_least_recently_used_entries_are_dropped_beyond_max_bytes():
+    store = ResultStore(max_bytes=3 * MB, max_entry_bytes=2 * MB)
+    ids = [store.put('determinant', {'matrix': np.zeros((400, 400))}, {}) for _ in range(3)]
+    assert store.get(ids[0]) is None
+    assert store.get(ids[1]) is not None
+    assert store.get(ids[2]) is not None
+    assert store.stats()['bytes'] <= 3 * MB
+
+
+def test_rendered_plots_count_towards_the_entry():
+    store = ResultStore(max_bytes=10 * MB, max_entry_bytes=MB)
+    entry = store.get(store.put('volume', {'function': 'x'}, {'volume_numerical': 1.0}))
+    before = store.stats()['bytes']
+    store.add_visualizations(entry, {'plot_2d': 'x' * 1000})
+    assert entry['visualizations'] == {'plot_2d': 'x' * 1000}
+    assert store.stats()['bytes'] > before + 1000
+    store.add_visualizations(entry, {'plot_3d': 'x' * MB})
+    assert 'plot_3d' not in entry['visualizations']
+
+
+def test_plot_inputs_keep_only_what_the_plots_read():
+    matrix = [[float(i == j) for j in range(4)] for i in range(4)]
+    result = {'eigenvalues': np.ones(4), 'eigenvectors': np.eye(4), 'eigen_pairs': [{}] * 4, 'trace': 4.0}
+    params, kept = main.plot_inputs('eigenvalues', {'matrix': matrix}, result)
+    assert isinstance(params['matrix'], np.ndarray)
+    assert kept == {}
+
+    params, kept = main.plot_inputs('eigenvalues', {'matrix': matrix[:2]}, result)
+    assert set(kept) == {'eigen_pairs', 'eigenvectors'}
+
+    _, kept = main.plot_inputs('inverse', {'matrix': matrix}, {'inverse': np.eye(4), 'determinant': 1.0})
+    assert set(kept) == {'inverse'}
+
+    result = {'numerical_value': 0.5}
+    assert main.plot_inputs('definite_integral', {'function': 'x'}, result) == ({'function': 'x'}, result)
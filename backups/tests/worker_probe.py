@@ -0,0 +1,26 @@
+"""Service used by test_executor; importing it registers it for worker processes too"""
+import os
+import signal
+import time
+
+from services import dependencies
+
+dependencies.SERVICES['probe'] = (__name__, 'Probe', 'probe')
+dependencies._NAMES[(__name__, 'Probe')] = 'probe'
+
+
+class Probe:
+    def pid(self):
+        return os.getpid()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        return os.getpid()
+
+    def stuck(self, seconds):
+        # Stands in for C code that never returns to the interpreter
+        signal.signal(signal.SIGALRM, signal.SIG_IGN)
+        time.sleep(seconds)
+
+    def crash(self):
+        os._exit(1)